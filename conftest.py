@@ -0,0 +1 @@
+# Makes the root of the repository importable by the tests (the package "src")
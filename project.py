@@ -1,8 +1,16 @@
 import argparse
 import os
+import signal
+import sys
 from pathlib import Path
 from src import Manager
 from src.classes.Parameters import Parameters
+from src.tools import ImagePrefetcher
+from src.tools.Sharding import Sharding
+from src.tools import ResultsWriter, CheckpointLog, ImageStore, WatchState
+from src.regression import Presets
+from src.tools.DatasetGenerator import GenerationSettings
+from src.tools.ImageArchive import ImageArchive
 
 
 
@@ -17,6 +25,26 @@ DEFAULT_FILE_GROUND_TRUTH_PATH = os.path.join(Path(__file__).parent, 'data', 'de
 """Path to the file containing the ground truth for each image to evaluate
 (can contain ground truth for other images, but they won't be considered)"""
 
+INCOMPATIBLE_OPTIONS = {
+    "--cacheDir": ("The memoization of the stages", ["--timeBudget", "--batchClassification"]),
+    "--engines": ("The comparison of engines", ["--timeBudget", "--adaptiveResolution", "--cacheDir", "--features", "--batchClassification",
+                                                "--shardOutput", "--results", "--coinDetails", "--checkpoint"]),
+    "--workers": ("The pool of workers", ["--timeBudget", "--cacheDir", "--features", "--batchClassification", "--engines"]),
+    "--verifyThreshold": ("The verification of the circles", ["--timeBudget", "--cacheDir", "--classifyOnly", "--engines", "--countOnly"]),
+    "--foregroundRegions": ("The detection in the foreground regions", ["--timeBudget", "--adaptiveResolution", "--cacheDir", "--classifyOnly", 
+                                                                        "--engines", "--countOnly"]),
+    "--countOnly": ("The count-only mode", ["--timeBudget", "--adaptiveResolution", "--cacheDir", "--features", "--classifyOnly", 
+                                            "--batchClassification", "--engines", "--workers", "--shardOutput", "--coinDetails", "--checkpoint"]),
+    "--profile": ("The profiling of the stages", ["--timeBudget", "--cacheDir", "--features", "--classifyOnly", "--batchClassification", 
+                                                  "--engines", "--workers", "--countOnly"]),
+    "--trackMemory": ("The memory tracking", ["--profile", "--timeBudget", "--cacheDir", "--features", "--classifyOnly", 
+                                              "--batchClassification", "--engines", "--countOnly"]),
+    "--watch": ("The watch", ["--shard", "--shardOutput", "--checkpoint", "--resume", "--engines", "--features", "--classifyOnly", 
+                              "--countOnly", "--indexFile", "--profile"])
+}
+"""Options of a run which can't be combined with other options : key = option, value = tuple[description of the option, 
+options it can't be combined with] (an option is used when its value isn't None or False)"""
+
 
 
 def parse_arguments() -> Parameters:
@@ -28,7 +56,10 @@ def parse_arguments() -> Parameters:
     """
 
     parser = argparse.ArgumentParser(prog="Project Image Analysis",
-                description="Make a regression prediction based on given images")
+                description="Make a regression prediction based on given images",
+                epilog="Use 'python project.py merge {file_shardResults} ...' to merge the results of several shards, "
+                     + "'python project.py ingest {directory_store} ...' to decode the images once into an image store, "
+                     + "and 'python project.py generate {directory_dataset} ...' to generate a synthetic dataset")
 
     # Arguments for files to process.
     #   There are default files and directory, but the user can present different ones.
@@ -44,6 +75,33 @@ def parse_arguments() -> Parameters:
                         default = None,
                         metavar = 'file_groundTruth',
                         help = "file containing the ground truth for the images to evaluate (relative path)")
+    parser.add_argument("--glob",
+                        default = None,
+                        nargs = '+',
+                        metavar = 'pattern',
+                        help = "glob patterns selecting the images to evaluate in the image directory, instead of the file "
+                             + "containing a list of images' names (for example 'gp1/*.png' ; '*' also matches sub-directories)")
+    parser.add_argument("--indexFile",
+                        default = None,
+                        metavar = 'file_index',
+                        help = "file persisting the index of the image directory (built with one scan of the directory if it doesn't exist yet)")
+    parser.add_argument("--imageStore",
+                        default = None,
+                        metavar = 'directory_store',
+                        help = "image store filled by the 'ingest' command : the decoded images and their detection level are read from it "
+                             + "with a memory map, instead of being decoded (the images not stored, or modified since, are still decoded)")
+    parser.add_argument("--watch",
+                        default = None,
+                        metavar = 'file_watchState',
+                        help = "watch the image directory : scan it periodically and process only its new or changed images "
+                             + "(selected with '--glob', every image with a ground truth by default), the processed images and the running "
+                             + "evaluation being saved in this file, so that a restarted watch doesn't process them again")
+    parser.add_argument("--watchInterval",
+                        default = WatchState.DEFAULT_POLL_INTERVAL,
+                        type = float,
+                        metavar = 'nb_seconds',
+                        help = "interval between two scans of the watched directory "
+                             + f"(0 = a single scan ; default : {WatchState.DEFAULT_POLL_INTERVAL})")
     
     # Optional additional arguments
     parser.add_argument('-e', '--evaluationType',
@@ -62,12 +120,155 @@ def parse_arguments() -> Parameters:
                         action="store_true",
                         help = "print details about the regression predictions and ground truth for each file (default: False)")
     
+    parser.add_argument("--preset",
+                        choices = list(Presets.PRESETS),
+                        default = Presets.DEFAULT_PRESET,
+                        type = str.lower,
+                        help = "point of the latency/accuracy curve, setting all the tuning knobs of the pipeline consistently "
+                             + "(detection resolution, Hough transform, blur, radius refinement, crop of the coins) : "
+                             + f"{', '.join(Presets.PRESETS)} (default : {Presets.DEFAULT_PRESET} ; the calibrated presets are opt-in, see the README)")
+    parser.add_argument("--timeBudget",
+                        default = None,
+                        type = float,
+                        metavar = 'seconds',
+                        help = "time budget of the circle detection for one image : beyond it, the detection is cancelled "
+                             + "and a cheaper fallback detection (lower resolution) is used instead (default : no budget)")
+    parser.add_argument("--adaptiveResolution",
+                        action = "store_true",
+                        help = "adapt the detection resolution and the searched radiuses to each image, "
+                             + "from a cheap pre-pass estimating the size of the coins (default: False)")
+    parser.add_argument("--foregroundRegions",
+                        action = "store_true",
+                        help = "only detect the circles inside the foreground regions of each image, found by a cheap pre-segmentation "
+                             + "(the whole image is searched when the regions cover most of it) (default: False)")
+    parser.add_argument("--verifyThreshold",
+                        default = None,
+                        type = float,
+                        metavar = 'score',
+                        help = "smallest verification score (between 0 and 1) of a detected circle, from its edge support, "
+                             + "its interior/exterior contrast and its saturation profile : the weaker circles are dropped "
+                             + "before their analysis, 0.3 being a good start (default : no verification)")
+    parser.add_argument("--cacheDir",
+                        default = None,
+                        metavar = 'directory_cache',
+                        help = "directory where the results of each stage of the algorithm are memoized : "
+                             + "a new run only recomputes the stages whose parameters or code version changed")
+    parser.add_argument("--engines",
+                        choices = ['hough', 'binary', 'fused'],
+                        nargs = '+',
+                        default = None,
+                        type = str.lower,
+                        help = "compare several engines side by side (accuracy and time), each image being decoded and pre-treated once : "
+                             + "'hough' (Hough transform on the gray-scale image), 'binary' (Hough transform on the binarized image), "
+                             + "'fused' (the circles of both, merged)")
+    parser.add_argument("--features",
+                        default = None,
+                        metavar = 'file_features',
+                        help = "columnar file where the features of each coin (circle, refined radius, hue features) are stored, "
+                             + "to classify the coins again without detecting them (see '--classifyOnly')")
+    parser.add_argument("--classifyOnly",
+                        action = "store_true",
+                        help = "only classify the coins from the feature store (option '--features') of a previous run, "
+                             + "without decoding the images nor detecting the coins")
+    parser.add_argument("--batchClassification",
+                        default = None,
+                        type = int,
+                        metavar = 'nb_images',
+                        help = "classify the coins of several images together : each coin is resampled to a fixed-size patch of a coin atlas, "
+                             + "and the patches are classified with vectorized operations (default : each image is classified alone)")
+
+    parser.add_argument("--countOnly",
+                        action = "store_true",
+                        help = "only count the coins, without their monetary values : the images are decoded in gray-scale "
+                             + "at a reduced resolution, only the circles are detected, and only the number of coins is evaluated")
+
+    parser.add_argument("--workers",
+                        default = None,
+                        type = int,
+                        metavar = 'nb_workers',
+                        help = "apply the regression algorithm in a pool of worker processes, the decoded images being handed to them "
+                             + "through shared memory (default : the images are processed in the main process)")
+    parser.add_argument("--timingHistory",
+                        default = None,
+                        metavar = 'file_timings',
+                        help = "dispatch the images to the workers longest first, their costs being estimated from their dimensions "
+                             + "(read in the headers of the files) and from the timings of the previous runs, saved in this file")
+
+    parser.add_argument("--profile",
+                        default = None,
+                        metavar = 'directory_profile',
+                        help = "profile the stages of the algorithm (get_circles, update_radiuses, update_coins_types, update_coins_values), "
+                             + "and write in this directory a pstats file per stage and the sampled stacks in the collapsed format "
+                             + "of the flamegraph tools (a summary of the hotspots is printed at the end of the run)")
+    parser.add_argument("--profileImages",
+                        default = None,
+                        nargs = '+',
+                        metavar = 'pattern',
+                        help = "glob patterns selecting the names of the profiled images (with '--profile' ; default : every image)")
+    parser.add_argument("--trackMemory",
+                        action = 'store_true',
+                        help = "track the peak allocated bytes (tracemalloc) and the RSS delta of each stage of the algorithm, on each image "
+                             + "(printed with the details, written in the results files, and summarized at the end of the run)")
+
+    parser.add_argument("--shard",
+                        default = None,
+                        metavar = 'i/n',
+                        help = "process only the shard i among n shards (0 <= i < n), the images being split by a stable hash of their names")
+    parser.add_argument("--shardOutput",
+                        default = None,
+                        metavar = 'file_shardResults',
+                        help = "file where the predictions and the mergeable evaluation state are written (to be merged with the 'merge' command)")
+
+    parser.add_argument("--results",
+                        default = None,
+                        metavar = 'file_results',
+                        help = "file where the results of each image are streamed (CSV if the file name ends with '.csv', JSON lines otherwise)")
+    parser.add_argument("--coinDetails",
+                        default = None,
+                        metavar = 'file_coinDetails',
+                        help = "binary columnar file where the data of each coin (circle, radiuses, type and value) are streamed")
+    parser.add_argument("--resultsBatchSize",
+                        default = ResultsWriter.DEFAULT_BATCH_SIZE,
+                        type = int,
+                        metavar = 'nb_images',
+                        help = "number of images whose results are buffered before being written to the results files "
+                             + f"(default : {ResultsWriter.DEFAULT_BATCH_SIZE})")
+
+    parser.add_argument("--checkpoint",
+                        default = None,
+                        metavar = 'file_checkpoint',
+                        help = "checkpoint log where each completed image is appended, to resume the run after a crash (see '--resume')")
+    parser.add_argument("--checkpointBatchSize",
+                        default = CheckpointLog.DEFAULT_BATCH_SIZE,
+                        type = int,
+                        metavar = 'nb_images',
+                        help = "number of completed images appended together to the checkpoint log "
+                             + f"(default : {CheckpointLog.DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--resume",
+                        action = "store_true",
+                        help = "skip the images already completed according to the checkpoint log, and evaluate them from the log")
+
+    parser.add_argument("--prefetchDepth",
+                        default = ImagePrefetcher.DEFAULT_QUEUE_DEPTH,
+                        type = int,
+                        metavar = 'nb_images',
+                        help = "number of images read and decoded in advance, in background threads "
+                             + f"(0 = no prefetch ; default : {ImagePrefetcher.DEFAULT_QUEUE_DEPTH})")
+    parser.add_argument("--prefetchMemory",
+                        default = ImagePrefetcher.DEFAULT_MAX_BYTES,
+                        type = int,
+                        metavar = 'nb_bytes',
+                        help = "memory ceiling, in bytes, of the decoded images waiting in the prefetch queue "
+                             + f"(default : {ImagePrefetcher.DEFAULT_MAX_BYTES})")
+    
     args = parser.parse_args()
 
 
     # If the files and directory are the default ones, we have to check they exist
     #   -> test for the file containing the images' names to evaluate
-    if (args.fileToEvaluate is None):
+    #       (not necessary if glob patterns select the images)
+    #       (nor for a watch, which selects every image with a ground truth by default)
+    if (args.fileToEvaluate is None and args.glob is None and args.watch is None):
         args.fileToEvaluate = DEFAULT_FILE_IMGS_TO_EVALUATE_PATH
         if (not Path(DEFAULT_FILE_IMGS_TO_EVALUATE_PATH).is_file()):
             parser.error("\nThe default file containing a list of images' names to evaluate "
@@ -89,12 +290,7 @@ def parse_arguments() -> Parameters:
                         + "\nPlease give a substitute file with the option '-g'")
 
     # Choice of the evaluation
-    evaluationList = []
-    for evaluationType in args.evaluationType:
-        match evaluationType:
-            case 'MAE': evaluationList.append(Manager.evaluations.MAE)
-            case 'MSE': evaluationList.append(Manager.evaluations.MSE)
-            case _: pass
+    evaluationList = get_evaluation_list(args.evaluationType)
     
     # Choice of the regression algorithm
     match args.regressionAlgorithm:
@@ -103,22 +299,340 @@ def parse_arguments() -> Parameters:
         case _: regressionAlgo = Manager.regressionAlgorithm.REGRESSION_ALGORITHM_1
 
     
+    # Time budget of the detection
+    if args.timeBudget is not None and args.timeBudget <= 0:
+        parser.error("The time budget (option '--timeBudget') must be strictly positive")
+    if args.verifyThreshold is not None and not 0 <= args.verifyThreshold <= 1:
+        parser.error("The verification threshold (option '--verifyThreshold') must be between 0 and 1")
+
+    # Batched classification
+    if args.batchClassification is not None and args.batchClassification <= 0:
+        parser.error("The number of images classified together (option '--batchClassification') must be strictly positive")
+
+    # Feature store
+    if args.classifyOnly and args.features is None:
+        parser.error("The option '--classifyOnly' needs a feature store (option '--features')")
+    if args.features is not None and not args.classifyOnly and (args.cacheDir is not None or args.batchClassification is not None):
+        parser.error("The feature store (option '--features') can't be written with the options '--cacheDir' and '--batchClassification'")
+
+    # Values of the options of the pool of workers, the profiling and the watch
+    if args.workers is not None and args.workers <= 0:
+        parser.error("The number of workers (option '--workers') must be strictly positive")
+    if args.profileImages is not None and args.profile is None:
+        parser.error("The option '--profileImages' needs a profile directory (option '--profile')")
+    if args.watchInterval < 0:
+        parser.error("The interval between two scans of the watched directory (option '--watchInterval') must be positive")
+    if args.watch is not None and ImageArchive.is_archive(args.dirImages):
+        parser.error("The watch (option '--watch') needs an image directory, not an archive")
+
+    # Options which can't be combined
+    check_incompatible_options(parser, args)
+
+    # Image store
+    if args.imageStore is not None and not Path(args.imageStore, ImageStore.INDEX_FILE_NAME).is_file():
+        parser.error(f"The image store '{args.imageStore}' doesn't exist"
+                     + "\nPlease create it with the command 'python project.py ingest {directory_store}'")
+
+    # Longest-first schedule
+    if args.timingHistory is not None and args.workers is None:
+        parser.error("The longest-first schedule (option '--timingHistory') needs a pool of workers (option '--workers')")
+
+    # Choice of the shard
+    shard = None
+    if args.shard is not None:
+        try:
+            shard = Sharding.parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+
+    # Results files
+    if args.resultsBatchSize <= 0:
+        parser.error("The results batch size (option '--resultsBatchSize') must be strictly positive")
+
+    # Checkpoint log
+    if args.resume and args.checkpoint is None:
+        parser.error("The option '--resume' needs a checkpoint log (option '--checkpoint')")
+    if args.checkpoint is not None and not args.resume and Path(args.checkpoint).exists():
+        parser.error(f"The checkpoint log '{args.checkpoint}' already exists"
+                     + "\nPlease use the option '--resume' to continue its run, or delete it to start again")
+    if args.checkpointBatchSize <= 0:
+        parser.error("The checkpoint batch size (option '--checkpointBatchSize') must be strictly positive")
+
+    # Prefetch of the images
+    if args.prefetchDepth < 0:
+        parser.error("The prefetch depth (option '--prefetchDepth') must be positive")
+    if args.prefetchMemory <= 0:
+        parser.error("The prefetch memory ceiling (option '--prefetchMemory') must be strictly positive")
+
     # Initialization of the parameters
     params = Parameters(evaluatedImages_path = args.fileToEvaluate,
                         imageCollec_path = args.dirImages,
                         groundTruth_path = args.fileGroundTruth,
                         evaluation_types = evaluationList,
                         solution_algo = regressionAlgo,
-                        print_regression_details = args.printDetails)
+                        print_regression_details = args.printDetails,
+                        prefetch_queue_depth = args.prefetchDepth,
+                        prefetch_max_bytes = args.prefetchMemory,
+                        images_glob_patterns = args.glob,
+                        directoryIndex_path = args.indexFile,
+                        shard = shard,
+                        shardResults_path = args.shardOutput,
+                        results_path = args.results,
+                        coinDetails_path = args.coinDetails,
+                        results_batch_size = args.resultsBatchSize,
+                        checkpoint_path = args.checkpoint,
+                        checkpoint_batch_size = args.checkpointBatchSize,
+                        resume_from_checkpoint = args.resume,
+                        detection_time_budget = args.timeBudget,
+                        adaptive_detection = args.adaptiveResolution,
+                        region_detection = args.foregroundRegions,
+                        verify_threshold = args.verifyThreshold,
+                        classification_batch_size = args.batchClassification,
+                        cache_path = args.cacheDir,
+                        featureStore_path = args.features,
+                        classify_only = args.classifyOnly,
+                        engines = list(dict.fromkeys(args.engines)) if args.engines is not None else None,
+                        nb_workers = args.workers,
+                        imageStore_path = args.imageStore,
+                        timingHistory_path = args.timingHistory,
+                        count_only = args.countOnly,
+                        preset = args.preset,
+                        profile_path = args.profile,
+                        profile_images_patterns = args.profileImages,
+                        track_memory = args.trackMemory,
+                        watchState_path = args.watch,
+                        watch_interval = args.watchInterval)
     
     return params
+
+
+def check_incompatible_options(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """Check that the options used in a run can be combined (see INCOMPATIBLE_OPTIONS), 
+    and exit with the usage of the parser otherwise
+
+    Args:
+        parser (argparse.ArgumentParser): the parser of the arguments of the run
+        args (argparse.Namespace): the parsed arguments
+    """
+    def is_used(option: str) -> bool:
+        value = getattr(args, option.lstrip("-"))
+        return value is not None and value is not False
+
+    for (option, (description, incompatibleOptions)) in INCOMPATIBLE_OPTIONS.items():
+        if not is_used(option):
+            continue
+        usedOptions = [incompatibleOption for incompatibleOption in incompatibleOptions if is_used(incompatibleOption)]
+        if len(usedOptions) > 0:
+            parser.error(f"{description} (option '{option}') can't be combined with the options " + ", ".join(usedOptions))
+
+
+def parse_merge_arguments(arguments: list[str]) -> tuple[list[str], list[str], bool]:
+    """Parse the arguments of the 'merge' command (merging the results of several shards)
+
+    Args:
+        arguments (list[str]): the arguments from the command line, after 'merge'
+
+    Returns:
+        filePaths_shardResults,_evaluations,_printDetails (tuple[list[str], list[str], bool]): 
+                the shard results files, the evaluations to apply, and the option to print details
+    """
+    parser = argparse.ArgumentParser(prog="Project Image Analysis - merge",
+                description="Merge the results of several shards into one global evaluation")
+
+    parser.add_argument("shardResults",
+                        nargs = '+',
+                        metavar = 'file_shardResults',
+                        help = "files written with the option '--shardOutput'")
+    parser.add_argument('-e', '--evaluationType',
+                        choices = ['MAE', 'MSE'],
+                        nargs = '*',
+                        default = ['MSE'],
+                        type = str.upper,
+                        help = 'option to choose the evaluation to apply (default : MSE)')
+    parser.add_argument("-p", "--printDetails",
+                        action="store_true",
+                        help = "print details about the regression predictions and ground truth for each file (default: False)")
+
+    args = parser.parse_args(arguments)
+
+    return (args.shardResults, get_evaluation_list(args.evaluationType), args.printDetails)
+
+
+def parse_ingest_arguments(arguments: list[str]) -> tuple[str, str | None, str, str, list[str] | None, str | None, bool, str]:
+    """Parse the arguments of the 'ingest' command (decoding the images once into an image store)
+
+    Args:
+        arguments (list[str]): the arguments from the command line, after 'ingest'
+
+    Returns:
+        directoryPath_store,_filePath_imagesToEvaluate,_directoryPath_images,_filePath_groundTruth,_globPatterns,_filePath_index,_printDetails,_preset 
+                (tuple[str, str | None, str, str, list[str] | None, str | None, bool, str]): the directory of the image store, 
+                the selection of the images (as for a run), the option to print details, and the preset of the runs using the store
+    """
+    parser = argparse.ArgumentParser(prog="Project Image Analysis - ingest",
+                description="Decode the images once into an image store (raw pixels read with a memory map by the option '--imageStore')")
+
+    parser.add_argument("imageStore",
+                        metavar = 'directory_store',
+                        help = "directory of the image store (created if it doesn't exist ; only the new or modified images are decoded)")
+    parser.add_argument("-f", "--fileToEvaluate",
+                        default = None,
+                        metavar = 'file_imagesToEvaluate',
+                        help = "file name that contains a list of images' names to ingest (relative path)")
+    parser.add_argument("-d", "--dirImages",
+                        default = DEFAULT_DIRECTORY_IMG_COLLECTION_PATH,
+                        metavar = 'directory_images',
+                        help = "directory containing the images (relative path)")
+    parser.add_argument("-g", "--fileGroundTruth",
+                        default = DEFAULT_FILE_GROUND_TRUTH_PATH,
+                        metavar = 'file_groundTruth',
+                        help = "file containing the ground truth for the images (relative path)")
+    parser.add_argument("--glob",
+                        default = None,
+                        nargs = '+',
+                        metavar = 'pattern',
+                        help = "glob patterns selecting the images to ingest in the image directory")
+    parser.add_argument("--indexFile",
+                        default = None,
+                        metavar = 'file_index',
+                        help = "file persisting the index of the image directory")
+    parser.add_argument("-p", "--printDetails",
+                        action="store_true",
+                        help = "print each image decoded (default: False)")
+    parser.add_argument("--preset",
+                        choices = list(Presets.PRESETS),
+                        default = Presets.DEFAULT_PRESET,
+                        type = str.lower,
+                        help = "preset of the runs using the store (the detection level is stored at its detection resolution ; "
+                             + f"default : {Presets.DEFAULT_PRESET})")
+
+    args = parser.parse_args(arguments)
+    if args.fileToEvaluate is None and args.glob is None:
+        args.fileToEvaluate = DEFAULT_FILE_IMGS_TO_EVALUATE_PATH
+
+    return (args.imageStore, args.fileToEvaluate, args.dirImages, args.fileGroundTruth, args.glob, args.indexFile, args.printDetails,
+            args.preset)
+
+
+def parse_generate_arguments(arguments: list[str]) -> tuple[str, GenerationSettings, bool]:
+    """Parse the arguments of the 'generate' command (generating a synthetic dataset)
+
+    Args:
+        arguments (list[str]): the arguments from the command line, after 'generate'
+
+    Returns:
+        directoryPath_dataset,_settings,_printDetails (tuple[str, GenerationSettings, bool]): 
+                the directory of the dataset, the settings of the generation, and the option to print details
+    """
+    parser = argparse.ArgumentParser(prog="Project Image Analysis - generate",
+                description="Generate a synthetic dataset of coin photos, with its image list and its ground truth (deterministic for a seed)")
+
+    parser.add_argument("dataset",
+                        metavar = 'directory_dataset',
+                        help = "directory of the dataset (created if it doesn't exist)")
+    parser.add_argument("-n", "--nbImages",
+                        required = True,
+                        type = int,
+                        metavar = 'nb_images',
+                        help = "number of images to generate")
+    parser.add_argument("--seed",
+                        default = 0,
+                        type = int,
+                        metavar = 'seed',
+                        help = "seed of the generation : the same seed and options always give the same dataset (default : 0)")
+    parser.add_argument("--coins",
+                        default = [1, 12],
+                        nargs = 2,
+                        type = int,
+                        metavar = ('min', 'max'),
+                        help = "minimum and maximum numbers of coins in an image (default : 1 12)")
+    parser.add_argument("--overlap",
+                        default = 0.0,
+                        type = float,
+                        metavar = 'ratio',
+                        help = "maximum overlap between two coins, as a ratio of the sum of their radiuses, in [0, 1[ (default : 0, no contact)")
+    parser.add_argument("--resolution",
+                        default = 1000,
+                        type = int,
+                        metavar = 'nb_pixels',
+                        help = "length of the shortest side of the images, in pixels (default : 1000)")
+    parser.add_argument("--noise",
+                        default = 4.0,
+                        type = float,
+                        metavar = 'std_deviation',
+                        help = "standard deviation of the Gaussian noise added to the images, in gray levels (default : 4)")
+    parser.add_argument("--groups",
+                        default = 1,
+                        type = int,
+                        metavar = 'nb_groups',
+                        help = "number of groups of images, each one in its sub-directory (default : 1)")
+    parser.add_argument("-p", "--printDetails",
+                        action="store_true",
+                        help = "print each image generated (default: False)")
+
+    args = parser.parse_args(arguments)
+    try:
+        settings = GenerationSettings(args.nbImages, args.seed, tuple(args.coins), args.overlap, args.resolution, args.noise, args.groups)
+    except ValueError as e:
+        parser.error(str(e))
+
+    return (args.dataset, settings, args.printDetails)
+
+
+def get_evaluation_list(evaluationTypes: list[str]) -> list[str]:
+    """Get the list of evaluations to apply, from their names on the command line
+
+    Args:
+        evaluationTypes (list[str]): the names of the evaluations (MAE, MSE)
+
+    Returns:
+        list[str]: the evaluations to apply, in that order
+    """
+    evaluationList = []
+    for evaluationType in evaluationTypes:
+        match evaluationType:
+            case 'MAE': evaluationList.append(Manager.evaluations.MAE)
+            case 'MSE': evaluationList.append(Manager.evaluations.MSE)
+            case _: pass
+    return evaluationList
     
 
 
 if __name__ == "__main__":
-    params = parse_arguments()
+    if len(sys.argv) > 1 and sys.argv[1] == "merge":
+        (filePaths_shardResults, evaluationList, printDetails) = parse_merge_arguments(sys.argv[2:])
 
-    try:
-        Manager.Manager.general_manager(params)
-    except Exception as e:
-        print(f"Error : {e}")
+        try:
+            Manager.Manager.merge_manager(filePaths_shardResults, evaluationList, printDetails)
+        except Exception as e:
+            print(f"Error : {e}")
+
+    elif len(sys.argv) > 1 and sys.argv[1] == "ingest":
+        ingestArguments = parse_ingest_arguments(sys.argv[2:])
+
+        try:
+            Manager.Manager.ingest_manager(*ingestArguments)
+        except Exception as e:
+            print(f"Error : {e}")
+
+    elif len(sys.argv) > 1 and sys.argv[1] == "generate":
+        (directoryPath_dataset, settings, printDetails) = parse_generate_arguments(sys.argv[2:])
+
+        try:
+            Manager.Manager.generate_manager(directoryPath_dataset, settings, printDetails)
+        except Exception as e:
+            print(f"Error : {e}")
+
+    else:
+        params = parse_arguments()
+
+        # A termination request (for example a preemption) stops the run like an error,
+        #   so that the results files and the checkpoint log are flushed
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+        try:
+            Manager.Manager.general_manager(params)
+        except Exception as e:
+            print(f"Error : {e}")
+            if params.checkpoint_filePath is not None:
+                print(f"The completed images are saved in '{params.checkpoint_filePath}' : use the option '--resume' to continue the run")
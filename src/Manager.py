@@ -1,3 +1,4 @@
+import os
 import types
 import cv2 as cv
 import time
@@ -5,8 +6,31 @@ from .classes.Parameters import Parameters
 from .tools.DataExtractor import DataExtractor
 from .classes.ImageData import ImageData
 from .classes.ResultsToEvaluate import ResultsToEvaluate
-from .regression.RegressionAlgorithm1 import RegressionAlgorithm1
+from .regression.RegressionAlgorithm1 import RegressionAlgorithm1, STAGE_NAMES
+from .regression.CoinCounter import CoinCounter
+from .regression.PredictMonetaryValue import get_total_monetary_value_of_coins
+from .regression.TimeBudgetedDetector import TimeBudgetedDetector
+from .regression.BatchedCoinClassification import CoinAtlas
+from .regression.Pipeline import Pipeline, MemoStore
+from .regression.MultiEngine import get_coins_data_of_engines
+from .regression.RegressionWorkerPool import RegressionWorkerPool
+from .regression.Presets import get_active_preset, set_active_preset, DEFAULT_PRESET
+from .tools.ImagePrefetcher import ImagePrefetcher
+from .tools.ImageReader import ImageReader
 from .evaluation.evaluation import Evaluation
+from .evaluation.EvaluationState import EvaluationState
+from .tools.Sharding import Sharding
+from .tools.ResultsWriter import ResultsWriter
+from .tools.CheckpointLog import CheckpointLog
+from .tools.FeatureStore import FeatureStore
+from .tools.ImageStore import ImageStore
+from .tools.CostScheduler import CostScheduler, TimingHistory
+from .tools.StageProfiler import StageProfiler
+from .tools.MemoryTracker import MemoryTracker, format_bytes
+from .tools.DatasetGenerator import DatasetGenerator, GenerationSettings
+from .tools.DirectoryIndex import DirectoryIndex
+from .tools.FileParser import FileParser
+from .tools.WatchState import WatchState, SETTLE_TIME, FULL_SCAN_INTERVAL
 
 # The list of possible regression algorithms to apply
 regressionAlgorithm = types.SimpleNamespace()
@@ -18,6 +42,111 @@ evaluations = types.SimpleNamespace()
 evaluations.MAE = "mae"
 evaluations.MSE = "mse"
 
+class RegressionSession():
+    """Resources of the regression, opened once and reused for every image : the results files, the feature store, 
+    the checkpoint log, the pool of workers, the detector, the session of the algorithm, ... They can be kept open 
+    across several calls of 'Manager._manage_regression' (for example for the batches of a watch)."""
+
+    pipeline: Pipeline | None
+    """The algorithm as a pipeline of memoized stages (None = no memoization store)"""
+
+    imageStore: ImageStore | None
+    """The store of the decoded images (None = the images are decoded)"""
+
+    checkpointLog: CheckpointLog | None
+    """The log of the completed images (None = no checkpoint)"""
+
+    resultsWriter: ResultsWriter | None
+    """The writer of the results files (None = no results file)"""
+
+    featureStore: FeatureStore | None
+    """The store of the features of the coins (None = no feature store)"""
+
+    detector: TimeBudgetedDetector | None
+    """The detector with a time budget (None = no time budget)"""
+
+    workerPool: RegressionWorkerPool | None
+    """The pool of worker processes (None = the images are processed in the main process)"""
+
+    coinCounter: CoinCounter
+    """The session of the algorithm, in the main process"""
+
+    memoryTracker: MemoryTracker | None
+    """The tracker of the memory of the stages, in the main process (None = no memory tracking in the main process)"""
+
+    profiler: StageProfiler | None
+    """The profiler of the stages (None = no profiling)"""
+
+    timingHistory: TimingHistory | None
+    """The history of the timings of the images (None = no timing history)"""
+
+    def __init__(self, parameters: Parameters):
+        """Open the resources of the regression
+
+        Args:
+            parameters (Parameters): the parameters from the command line (memoization store, image store, checkpoint log, results files, 
+                    feature store, time budget, workers, preset, memory tracking, profiling, timing history, watch)
+        """
+        # With a memoization store, the algorithm runs as a pipeline of memoized stages
+        self.pipeline = None
+        if parameters.cache_directoryPath is not None:
+            self.pipeline = RegressionAlgorithm1.get_pipeline(MemoStore(parameters.cache_directoryPath), parameters.adaptive_detection)
+
+        self.imageStore = ImageStore(parameters.imageStore_directoryPath) if parameters.imageStore_directoryPath is not None else None
+        self.checkpointLog = None
+        if parameters.checkpoint_filePath is not None:
+            self.checkpointLog = CheckpointLog(parameters.checkpoint_filePath, parameters.checkpoint_batch_size)
+        # With a checkpoint log, the results files and the feature store are only flushed at each checkpoint : 
+        #   the images written to them are then the images completed in the log (resumed without duplicates)
+        #   With a watch, they are flushed when the watch state is saved.
+        isWatched = parameters.watchState_filePath is not None
+        resultsBatchSize = parameters.results_batch_size if self.checkpointLog is None and not isWatched else None
+        self.resultsWriter = None
+        if parameters.results_filePath is not None or parameters.coinDetails_filePath is not None:
+            self.resultsWriter = ResultsWriter(parameters.results_filePath, parameters.coinDetails_filePath, 
+                                               resultsBatchSize, 
+                                               append = parameters.resume_from_checkpoint or isWatched,
+                                               memory_stages = STAGE_NAMES if parameters.track_memory else None)
+        self.featureStore = None
+        if parameters.featureStore_filePath is not None:
+            self.featureStore = FeatureStore(parameters.featureStore_filePath, resultsBatchSize, 
+                                             append = parameters.resume_from_checkpoint)
+        self.detector = None
+        if parameters.detection_time_budget is not None:
+            self.detector = TimeBudgetedDetector(parameters.detection_time_budget, parameters.adaptive_detection)
+        self.workerPool = None
+        if parameters.nb_workers is not None:
+            self.workerPool = RegressionWorkerPool(parameters.nb_workers, parameters.adaptive_detection, parameters.track_memory, 
+                                                   parameters.region_detection, parameters.verify_threshold)
+        self.coinCounter = CoinCounter(parameters.preset, parameters.adaptive_detection, parameters.region_detection, 
+                                       parameters.verify_threshold)
+        # The allocations of every thread are traced : in the main process, the images aren't decoded in advance while tracking the memory
+        self.memoryTracker = MemoryTracker() if parameters.track_memory and parameters.nb_workers is None else None
+        self.profiler = None
+        if parameters.profile_directoryPath is not None:
+            self.profiler = StageProfiler(parameters.profile_directoryPath, parameters.profile_images_patterns)
+        self.timingHistory = None
+        if parameters.timingHistory_filePath is not None:
+            self.timingHistory = TimingHistory(parameters.timingHistory_filePath)
+
+    def __enter__(self) -> "RegressionSession":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Flush and close the files, stop the workers and the detector, and save the timing history"""
+        if self.resultsWriter is not None: self.resultsWriter.close()
+        if self.featureStore is not None: self.featureStore.close()
+        if self.checkpointLog is not None: self.checkpointLog.close()
+        if self.detector is not None: self.detector.close()
+        if self.workerPool is not None: self.workerPool.close()
+        if self.timingHistory is not None: self.timingHistory.save()
+        if self.profiler is not None: self.profiler.close()
+        if self.memoryTracker is not None: self.memoryTracker.close()
+
+
 class Manager():
     """Manage the parameters, the data extraction, the regression prediction and the evaluation"""
 
@@ -27,90 +156,609 @@ class Manager():
         Args:
             parameters (Parameters): the parameters from the command line
         """
+        set_active_preset(parameters.preset)
+
+        # Watch of the image directory (the new or changed images are processed as they arrive)
+        if parameters.watchState_filePath is not None:
+            Manager._manage_watch(parameters)
+            return
         
         # Data extraction
         img_data = DataExtractor.get_data_for_regression_and_evaluation(
             parameters.evaluatedImages_filePath,
             parameters.imageCollection_directoryPath,
             parameters.groundTruth_filePath,
+            parameters.images_glob_patterns,
+            parameters.directoryIndex_filePath,
+            parameters.shard
         )
 
-        # Regression process
-        regression_results = Manager._manage_regression(img_data, parameters.regression_algorithm, parameters.print_regression_details)
+        # Images already completed by an interrupted run
+        completed_results = []
+        if parameters.resume_from_checkpoint:
+            (img_data, completed_results) = Manager._get_images_to_resume(img_data, parameters.checkpoint_filePath)
+            # The rows written after the last checkpoint (images processed again) are removed from the results files
+            ResultsWriter.keep_only_images(parameters.results_filePath, parameters.coinDetails_filePath, 
+                                           set(result.image_name for result in CheckpointLog.read(parameters.checkpoint_filePath)))
+
+        # Comparison of several engines (instead of the regression process and its evaluation)
+        if parameters.engines is not None:
+            Manager._manage_engines_comparison(img_data, parameters)
+            return
+
+        # Regression process (or only the classification of the coins from their stored features)
+        if parameters.count_only:
+            regression_results = completed_results + Manager._manage_count_only(img_data, parameters)
+        elif parameters.classify_only:
+            regression_results = completed_results + Manager._manage_classification_only(img_data, parameters)
+        else:
+            regression_results = completed_results + Manager._manage_regression(img_data, parameters)
+
+        # Results of the shard (merged later with the other shards)
+        if parameters.shardResults_filePath is not None:
+            Sharding.write_shard_results(parameters.shardResults_filePath, parameters.shard, regression_results)
 
         # Evaluation
-        Manager._manage_evaluation(regression_results, parameters.evaluation_types)
+        Manager._manage_evaluation(regression_results, parameters.evaluation_types, parameters.count_only)
+
+    def merge_manager(filePaths_shardResults: list[str], evaluations_list: list[str], printDetails: bool = False):
+        """Merge the results of several shards, and do the evaluation of all their images
+
+        Args:
+            filePaths_shardResults (list[str]): paths to the shard results files
+            evaluations_list (list[str]): the list of evaluations to do, in that order
+            printDetails (bool, optional): print the predictions and ground truths of every image. Defaults to False.
+        """
+        (results, evaluationState, missingShards) = Sharding.merge_shards_results(filePaths_shardResults)
+
+        if len(missingShards) > 0:
+            print("Warning : missing shards {} (the evaluation only covers the given shards)\n"
+                  .format(", ".join(str(shardIndex) for shardIndex in missingShards)))
+
+        if printDetails: Manager._print_details(results)
+
+        Manager._print_evaluation(evaluationState, evaluations_list)
     
-    def _manage_regression(image_data: list[ImageData], regressionAlgo: str, printDetails: bool = False) -> list[ResultsToEvaluate]:
-        """Apply a regression algorithm on each image, and return results that can be immediately evaluated
+    def ingest_manager(directoryPath_store: str, filePath_evaluatedImages: str | None, directoryPath_imageCollection: str, 
+                       filePath_groundTruth: str, imagesGlobPatterns: list[str] | None = None, filePath_directoryIndex: str | None = None,
+                       printDetails: bool = False, preset: str = DEFAULT_PRESET):
+        """Decode the images to evaluate once, and store them (with their detection level) in an image store
+
+        Args:
+            directoryPath_store (str): path to the directory of the image store (created if it doesn't exist)
+            filePath_evaluatedImages (str | None): path to the file containing the list of image names (None if glob patterns are given)
+            directoryPath_imageCollection (str): path to the directory containing all the images
+            filePath_groundTruth (str): path to the file containing the ground truth for the images
+            imagesGlobPatterns (list[str] | None, optional): glob patterns selecting the images in the directory. Defaults to None.
+            filePath_directoryIndex (str | None, optional): path to the file persisting the index of the directory. Defaults to None.
+            printDetails (bool, optional): print each image decoded. Defaults to False.
+            preset (str, optional): the preset of the runs using the store (the detection level is stored at its detection resolution).
+                    Defaults to DEFAULT_PRESET.
+        """
+        set_active_preset(preset)
+        img_data = DataExtractor.get_data_for_regression_and_evaluation(
+            filePath_evaluatedImages,
+            directoryPath_imageCollection,
+            filePath_groundTruth,
+            imagesGlobPatterns,
+            filePath_directoryIndex
+        )
+
+        startingTime = time.time()
+        (nbDecoded, nbReused) = ImageStore(directoryPath_store, create = True).ingest(img_data, printDetails)
+        print("Image store '{}' : {} image(s) decoded and stored, {} image(s) already stored ({:.3f}s)"
+              .format(directoryPath_store, nbDecoded, nbReused, time.time() - startingTime))
+
+    def generate_manager(directoryPath_dataset: str, settings: GenerationSettings, printDetails: bool = False):
+        """Generate a synthetic dataset (images, image list and ground truth), to evaluate the project at any scale
+
+        Args:
+            directoryPath_dataset (str): path to the directory of the dataset (created if it doesn't exist)
+            settings (GenerationSettings): the settings of the dataset (number of images, seed, coins, overlap, resolution, noise)
+            printDetails (bool, optional): print each image generated. Defaults to False.
+        """
+        startingTime = time.time()
+        (directoryPath_images, filePath_imageList, filePath_groundTruth) = DatasetGenerator.generate_dataset(
+            directoryPath_dataset, settings, printDetails)
+        print("Synthetic dataset '{}' : {} image(s) generated ({:.3f}s)\nEvaluate it with : -d {} -f {} -g {}"
+              .format(directoryPath_dataset, settings.nb_images, time.time() - startingTime,
+                      directoryPath_images, filePath_imageList, filePath_groundTruth))
+
+    def _manage_regression(image_data: list[ImageData], parameters: Parameters, 
+                           session: RegressionSession | None = None) -> list[ResultsToEvaluate]:
+        """Apply a regression algorithm on each image, and return results that can be immediately evaluated.
+        The next images are read and decoded in background threads while the current image is processed,
+        and the results of each image can be streamed to machine-readable files.
+        The coins can also be classified by batches of images (see CoinAtlas), or the images processed by a pool of worker processes
+        (see RegressionWorkerPool), the longest images first (see CostScheduler). The stages of the algorithm can be profiled 
+        on a subset of the images (see StageProfiler), and their peak memory tracked on every image (see MemoryTracker).
 
         Args:
             image_data (list[ImageData]): the data for each image we try to regress and evaluate
-            regressionAlgo (str): the regression algorithm to use
+            parameters (Parameters): the parameters from the command line (regression algorithm, details printing, prefetch, results files, 
+                    batched classification, workers, timing history, profiling, memory tracking)
+            session (RegressionSession | None, optional): the resources of the regression, kept open by the caller. 
+                    Defaults to None (the resources are opened for these images only).
 
         Returns:
             resultsForEvaluation (list[ResultsToEvaluate]): the results that can be immediately send for the evaluation
         """
         results = []
+        regressionAlgo = parameters.regression_algorithm
+        printDetails = parameters.print_regression_details
+        isOwnSession = session is None
+        if isOwnSession:
+            session = RegressionSession(parameters)
+        pipeline = session.pipeline
+        imageStore = session.imageStore
+        checkpointLog = session.checkpointLog
+        resultsWriter = session.resultsWriter
+        featureStore = session.featureStore
+        detector = session.detector
+        workerPool = session.workerPool
+        coinCounter = session.coinCounter # session of the algorithm, reused for every image
+        memoryTracker = session.memoryTracker
+        profiler = session.profiler
+        timingHistory = session.timingHistory
+
+        # With a timing history, the images are dispatched to the workers longest first (estimated from their sizes and past timings)
+        if timingHistory is not None:
+            megapixels = CostScheduler.get_images_megapixels(image_data)
+            costs = {data.name: timingHistory.estimate_cost(data.name, megapixels[data.name]) for data in image_data}
+            scheduledImages = CostScheduler.schedule_longest_first(image_data, costs)
+            if printDetails:
+                print("Longest-first schedule on {} workers : estimated makespan of {:.3f}s ({:.3f}s in the order of the names)\n"
+                      .format(parameters.nb_workers, CostScheduler.get_makespan(scheduledImages, costs, parameters.nb_workers),
+                              CostScheduler.get_makespan(image_data, costs, parameters.nb_workers)))
+            image_data = scheduledImages
 
         # Start of printing details
         if printDetails: imageNamePadding = Manager.print_details_gradually_part1([data.name for data in image_data])
         totalTime = 0
 
-        for data in image_data:
+        prefetcher = Manager._get_prefetcher(image_data, parameters, imageStore, noPrefetch = memoryTracker is not None, 
+                                             pipeline = pipeline)
+        peakMemory = {} # key = name of the stage, value = tuple[highest peak of allocated bytes, name of its image]
 
-            startingTime = time.time() # timer start
-
-            match regressionAlgo:
-                case regressionAlgorithm.REGRESSION_ALGORITHM_1:
-                    (nbCoins_predict, totalValue_predict) = RegressionAlgorithm1.get_nbCoins_and_totalMonetaryValue(data.image_path)
-                case regressionAlgorithm.REGRESSION_ALGORITHM_2:
-                    raise Exception("Regression algorithm n°2 not implemented")
-                case _:
-                    (nbCoins_predict, totalValue_predict) = RegressionAlgorithm1.get_nbCoins_and_totalMonetaryValue(data.image_path)
+        # With the batched classification, the coins of several images are located first, then classified together
+        coinAtlas = CoinAtlas() if parameters.classification_batch_size is not None else None
+        pendingImages = [] # (image data, fallback used, time spent) of the images waiting for the classification
 
+        def complete_image(data: ImageData, coinData_list: list, usedFallback: bool, timeDuration: float, 
+                           memory: dict[str, tuple[int, int]] | None = None):
+            nonlocal totalTime
             img_result = ResultsToEvaluate(
                 name = data.name,
-                nbCoins_prediction = nbCoins_predict,
+                nbCoins_prediction = len(coinData_list),
                 nbCoins_groundTruth = data.nbCoins_groundTruth,
-                totalValue_prediction = totalValue_predict,
-                totalValue_groundTruth = data.totalValue_groundTruth
+                totalValue_prediction = get_total_monetary_value_of_coins(coinData_list),
+                totalValue_groundTruth = data.totalValue_groundTruth,
+                usedFallback = usedFallback
             )
             results.append(img_result)
 
-            timeDuration = time.time() - startingTime # timer end
             totalTime += timeDuration
-            if printDetails: Manager.print_details_gradually_part2(img_result, imageNamePadding, timeDuration)
+            if timingHistory is not None: timingHistory.update(data.name, megapixels[data.name], timeDuration)
+            if memory is not None:
+                for (stageName, (peakBytes, _)) in memory.items():
+                    if stageName not in peakMemory or peakBytes > peakMemory[stageName][0]:
+                        peakMemory[stageName] = (peakBytes, data.name)
+            if printDetails: Manager.print_details_gradually_part2(img_result, imageNamePadding, timeDuration, memory = memory)
+            if resultsWriter is not None: resultsWriter.write(img_result, coinData_list, timeDuration, memory)
+
+            # The completed images are saved in the checkpoint log 
+            #   (after the results files, so that a completed image is never missing from them)
+            if checkpointLog is not None:
+                checkpointLog.append(img_result)
+                if checkpointLog.is_batch_complete():
+                    if resultsWriter is not None: resultsWriter.flush()
+                    if featureStore is not None: featureStore.flush()
+                    checkpointLog.flush()
+
+        def classify_pending_images():
+            startingTime = time.time()
+            coinData_lists = coinAtlas.classify()
+            classificationTimeByImage = (time.time() - startingTime) / max(1, len(pendingImages))
+            for ((data, usedFallback, timeDuration), coinData_list) in zip(pendingImages, coinData_lists):
+                complete_image(data, coinData_list, usedFallback, timeDuration + classificationTimeByImage)
+            pendingImages.clear()
+
+        try:
+            # With a pool of workers, the images are handed to the worker processes through shared memory
+            if workerPool is not None:
+                if regressionAlgo == regressionAlgorithm.REGRESSION_ALGORITHM_2:
+                    raise Exception("Regression algorithm n°2 not implemented")
+                for (data, (coinData_list, timeDuration, memory)) in zip(image_data, workerPool.map(prefetcher)):
+                    complete_image(data, coinData_list, False, timeDuration, memory)
+            else:
+                for (data, (_, img)) in zip(image_data, prefetcher):
+
+                    startingTime = time.time() # timer start
+                    usedFallback = False
+                    memory = None
+                    classifyCoins = coinAtlas is None and featureStore is None
+                    resized = (imageStore.read_detection_level(data.name, data.image_path) 
+                               if imageStore is not None and pipeline is None else None) # the pipeline doesn't use it
+
+                    match regressionAlgo:
+                        case regressionAlgorithm.REGRESSION_ALGORITHM_2:
+                            raise Exception("Regression algorithm n°2 not implemented")
+                        case _ if pipeline is not None:
+                            coinData_list = RegressionAlgorithm1.get_coins_data_with_pipeline(pipeline, data.image_path, img)
+                        case _ if detector is not None:
+                            (coinData_list, usedFallback) = RegressionAlgorithm1.get_coins_data_from_image_with_time_budget(
+                                img, detector, classifyCoins, resized)
+                        case _ if profiler is not None and profiler.is_profiled(data.name):
+                            with profiler.profile_image():
+                                coinData_list = coinCounter.process_in_stages(img, profiler.stage, resized)
+                        case _ if memoryTracker is not None:
+                            memoryTracker.start_image()
+                            coinData_list = coinCounter.process_in_stages(img, memoryTracker.stage, resized)
+                            memory = memoryTracker.image_memory
+                        case _:
+                            coinData_list = coinCounter.process(img, classifyCoins, resized)
+
+                    if featureStore is not None:
+                        features = coinCounter.classify_coins(img, coinData_list)
+                        featureStore.write(data.name, coinData_list, features)
+
+                    if coinAtlas is None:
+                        complete_image(data, coinData_list, usedFallback, time.time() - startingTime, memory) # timer end
+                        continue
+
+                    coinAtlas.add_image(img, coinData_list)
+                    pendingImages.append((data, usedFallback, time.time() - startingTime)) # timer end (before the classification)
+                    if len(coinAtlas) >= parameters.classification_batch_size:
+                        classify_pending_images()
+
+            if pendingImages:
+                classify_pending_images()
+        finally:
+            if isOwnSession: session.close()
 
         if printDetails: print("\t\t\t\t\t\t\t\t\t(total : {:.3f}s)".format(totalTime))
+        if printDetails and pipeline is not None:
+            print("Memoized stages : " + ", ".join("{} ({} reused, {} computed)".format(stageName, pipeline.nbReused[stageName], nbComputed)
+                                                   for (stageName, nbComputed) in pipeline.nbComputed.items()
+                                                   if pipeline.stages[stageName].memoized) + "\n")
+        if profiler is not None: print(profiler.get_summary() + "\n")
+        if peakMemory:
+            print("Peak memory by stage : " + ", ".join("{} {} ({})".format(stageName, format_bytes(peakBytes), imageName)
+                                                       for (stageName, (peakBytes, imageName)) in peakMemory.items()) + "\n")
+
+        return results
+
+    def _manage_watch(parameters: Parameters):
+        """Watch the image directory : scan it periodically, and process only the new or changed images (size or modification time) 
+        since the last scan, by batches. Every FULL_SCAN_INTERVAL seconds, the scan is a full one (one 'os.scandir' pass, see DirectoryIndex) ;
+        in between, only the directories whose modification time changed are listed again, and the images not settled yet are checked 
+        again (see 'DirectoryIndex.rescan'). The results files are appended (a changed image gets a new row, its last row being the current one), 
+        and the evaluation of all the processed images is updated incrementally (see WatchState). 
+        The changes of the watch state are saved after each batch, together with the sizes of the results files (flushed at the same time), 
+        so that a restarted watch doesn't process the same images again, and removes the rows written after the last saved state.
+        The resources of the regression (results files, workers, ...) are kept open for the whole watch.
+
+        Args:
+            parameters (Parameters): the parameters from the command line (the selection of the images, the watch state and interval, 
+                    and the options of the regression)
+        """
+        watchState = WatchState(parameters.watchState_filePath, parameters.imageCollection_directoryPath)
+        globPatterns = parameters.images_glob_patterns or ["*"]
+        listedImages = None
+        if parameters.evaluatedImages_filePath is not None:
+            listedImages = set(DataExtractor._get_list_of_images_to_evaluate(parameters.evaluatedImages_filePath))
+        print("Watching '{}' ({} image(s) already processed ; Ctrl+C to stop)\n".format(watchState.root_path, len(watchState)))
+        # The images whose rows were written after the last saved state aren't in the state : they are processed again
+        ResultsWriter.truncate_files(watchState.results_file_sizes)
+
+        data_groundTruth = {}
+        groundTruthInfo = None # size and modification time of the ground truth file when it was read
+        directoryIndex = None
+        fullScanTime = None
+        unsettledImages = [] # images selected by the last scan, but still being written
+        try:
+            with RegressionSession(parameters) as session:
+                while True:
+                    # The ground truth is read again when its file changes (the results already processed get the new ground truth)
+                    stat = os.stat(parameters.groundTruth_filePath)
+                    if (stat.st_size, stat.st_mtime) != groundTruthInfo:
+                        data_groundTruth = FileParser.excel_file_reading_and_parsing_ground_truth(parameters.groundTruth_filePath)
+                        groundTruthInfo = (stat.st_size, stat.st_mtime)
+                        nbUpdated = watchState.update_ground_truth(data_groundTruth)
+                        if nbUpdated > 0:
+                            watchState.save()
+                            print(f"Ground truth changed for {nbUpdated} processed image(s)\n")
+
+                    # The selected images with a ground truth, once they are not modified anymore
+                    scanTime = time.time()
+                    if directoryIndex is None or scanTime - fullScanTime >= FULL_SCAN_INTERVAL:
+                        directoryIndex = DirectoryIndex.build(parameters.imageCollection_directoryPath)
+                        fullScanTime = scanTime
+                    else:
+                        directoryIndex = directoryIndex.rescan(unsettledImages)
+                    fileInfos = {name: directoryIndex.entries[name] for name in directoryIndex.select(globPatterns)
+                                 if name in data_groundTruth and (listedImages is None or name in listedImages)}
+                    deletedImages = [name for name in watchState.images if name not in fileInfos]
+                    imagesToProcess = []
+                    unsettledImages = []
+                    for name in watchState.get_images_to_process(fileInfos):
+                        (imagesToProcess if scanTime - fileInfos[name][1] >= SETTLE_TIME else unsettledImages).append(name)
+
+                    for name in deletedImages:
+                        watchState.forget(name)
+                    if deletedImages: watchState.save()
+
+                    for batchStart in range(0, len(imagesToProcess), parameters.results_batch_size):
+                        batchImages = imagesToProcess[batchStart:batchStart + parameters.results_batch_size]
+                        image_data = DataExtractor._create_image_data({name: data_groundTruth[name] for name in batchImages},
+                                                                      directoryIndex.resolve(batchImages))
+                        for result in Manager._manage_regression(image_data, parameters, session):
+                            watchState.update(fileInfos[result.image_name], result)
+                        # The results of the batch are flushed, and their file sizes saved with the state
+                        watchState.save(session.resultsWriter.get_file_sizes() if session.resultsWriter is not None else None)
+
+                    if imagesToProcess or deletedImages:
+                        print("{} : {} new or changed image(s) processed, {} deleted image(s) forgotten, {} image(s) evaluated"
+                              .format(time.strftime("%H:%M:%S"), len(imagesToProcess), len(deletedImages), len(watchState)))
+                        if len(watchState) > 0:
+                            Manager._print_evaluation(watchState.evaluation_state, parameters.evaluation_types)
+
+                    if parameters.watch_interval == 0:
+                        return
+                    time.sleep(parameters.watch_interval)
+        except KeyboardInterrupt:
+            print(f"Watch stopped ({len(watchState)} image(s) processed)")
+
+    def _manage_classification_only(image_data: list[ImageData], parameters: Parameters) -> list[ResultsToEvaluate]:
+        """Classify the coins of each image from their features stored by a previous run (without detecting them again),
+        and return results that can be immediately evaluated
+
+        Args:
+            image_data (list[ImageData]): the data for each image we try to regress and evaluate
+            parameters (Parameters): the parameters from the command line (feature store, details printing, results files)
+
+        Raises:
+            Exception: some images aren't in the feature store
+
+        Returns:
+            resultsForEvaluation (list[ResultsToEvaluate]): the results that can be immediately send for the evaluation
+        """
+        startingTime = time.time() # timer start
+        coinData_lists = RegressionAlgorithm1.get_coins_data_from_feature_store(parameters.featureStore_filePath)
+
+        missingImages = [data.name for data in image_data if data.name not in coinData_lists]
+        if len(missingImages) > 0:
+            raise Exception(f"{len(missingImages)} image(s) aren't in the feature store '{parameters.featureStore_filePath}' "
+                            + f"(for example '{missingImages[0]}')")
+
+        results = [ResultsToEvaluate(
+                        name = data.name,
+                        nbCoins_prediction = len(coinData_lists[data.name]),
+                        nbCoins_groundTruth = data.nbCoins_groundTruth,
+                        totalValue_prediction = get_total_monetary_value_of_coins(coinData_lists[data.name]),
+                        totalValue_groundTruth = data.totalValue_groundTruth
+                    ) for data in image_data]
+        totalTime = time.time() - startingTime # timer end
+        timeByImage = totalTime / max(1, len(results))
+
+        if parameters.results_filePath is not None or parameters.coinDetails_filePath is not None:
+            with ResultsWriter(parameters.results_filePath, parameters.coinDetails_filePath, parameters.results_batch_size) as resultsWriter:
+                for result in results:
+                    resultsWriter.write(result, coinData_lists[result.image_name], timeByImage)
+
+        if parameters.print_regression_details:
+            imageNamePadding = Manager.print_details_gradually_part1([data.name for data in image_data])
+            for result in results:
+                Manager.print_details_gradually_part2(result, imageNamePadding, timeByImage)
+            print("\t\t\t\t\t\t\t\t\t(total : {:.3f}s)".format(totalTime))
+
+        return results
+
+    def _manage_count_only(image_data: list[ImageData], parameters: Parameters) -> list[ResultsToEvaluate]:
+        """Only count the coins of each image (see 'RegressionAlgorithm1.get_nbCoins') : the images are decoded in gray-scale
+        at a reduced resolution (or read at the detection resolution from the image store), and only the circles are detected.
+        The results have no predicted monetary value (NaN), so only the number of coins can be evaluated.
+
+        Args:
+            image_data (list[ImageData]): the data for each image we try to regress and evaluate
+            parameters (Parameters): the parameters from the command line (prefetch, image store, details printing, results file)
+
+        Returns:
+            resultsForEvaluation (list[ResultsToEvaluate]): the results that can be immediately send for the evaluation
+        """
+        imageStore = ImageStore(parameters.imageStore_directoryPath) if parameters.imageStore_directoryPath is not None else None
+        namesByPath = {data.image_path: data.name for data in image_data}
+        shortestSideLength = get_active_preset().shortest_side_length
+
+        def read_image(img_path: str):
+            resized = imageStore.read_detection_level(namesByPath[img_path], img_path) if imageStore is not None else None
+            return resized if resized is not None else ImageReader.read_reduced_gray_image_from_path(img_path, shortestSideLength)
+
+        prefetcher = ImagePrefetcher([data.image_path for data in image_data],
+                                     queue_depth = parameters.prefetch_queue_depth,
+                                     max_bytes = parameters.prefetch_max_bytes,
+                                     read_image = read_image)
+        resultsWriter = None
+        if parameters.results_filePath is not None:
+            resultsWriter = ResultsWriter(parameters.results_filePath, None, parameters.results_batch_size)
+
+        if parameters.print_regression_details:
+            imageNamePadding = Manager.print_details_gradually_part1([data.name for data in image_data], nbCoinsOnly = True)
+            totalTime = 0
+
+        results = []
+        try:
+            for (data, (_, img)) in zip(image_data, prefetcher):
+                startingTime = time.time() # timer start
+                nbCoins = RegressionAlgorithm1.get_nbCoins_from_image(img)
+                timeDuration = time.time() - startingTime # timer end
+
+                img_result = ResultsToEvaluate(
+                    name = data.name,
+                    nbCoins_prediction = nbCoins,
+                    nbCoins_groundTruth = data.nbCoins_groundTruth,
+                    totalValue_prediction = float("nan"),
+                    totalValue_groundTruth = data.totalValue_groundTruth
+                )
+                results.append(img_result)
+                if resultsWriter is not None: resultsWriter.write(img_result, [], timeDuration)
+
+                if parameters.print_regression_details:
+                    Manager.print_details_gradually_part2(img_result, imageNamePadding, timeDuration, nbCoinsOnly = True)
+                    totalTime += timeDuration
+        finally:
+            if resultsWriter is not None: resultsWriter.close()
+
+        if parameters.print_regression_details:
+            print("\t\t\t\t\t\t(total : {:.3f}s)".format(totalTime))
 
         return results
 
-    def _manage_evaluation(results: list[ResultsToEvaluate], evaluations_list: list[str]):
+    def _manage_engines_comparison(image_data: list[ImageData], parameters: Parameters):
+        """Apply several engines on each image (decoded, resized and gray-scaled only once for all of them), 
+        and print their evaluations and times side by side
+
+        Args:
+            image_data (list[ImageData]): the data for each image we try to regress and evaluate
+            parameters (Parameters): the parameters from the command line (engines, details printing, prefetch)
+        """
+        engines_list = parameters.engines
+        evaluationStates = {engine: EvaluationState() for engine in engines_list}
+        totalTimes = {engine: 0.0 for engine in engines_list}
+        totalSharedTime = 0.0
+
+        imageStore = ImageStore(parameters.imageStore_directoryPath) if parameters.imageStore_directoryPath is not None else None
+        prefetcher = Manager._get_prefetcher(image_data, parameters, imageStore)
+        for (data, (_, img)) in zip(image_data, prefetcher):
+            (coinData_byEngine, sharedTime) = get_coins_data_of_engines(img, engines_list)
+            totalSharedTime += sharedTime
+
+            predictions = []
+            for engine in engines_list:
+                (coinData_list, timeDuration) = coinData_byEngine[engine]
+                img_result = ResultsToEvaluate(
+                    name = data.name,
+                    nbCoins_prediction = len(coinData_list),
+                    nbCoins_groundTruth = data.nbCoins_groundTruth,
+                    totalValue_prediction = get_total_monetary_value_of_coins(coinData_list),
+                    totalValue_groundTruth = data.totalValue_groundTruth
+                )
+                evaluationStates[engine].add(img_result)
+                totalTimes[engine] += timeDuration
+                predictions.append("{} : {} / {}".format(engine, img_result.nbCoins_predicted, img_result.totalMonetaryValue_predicted))
+
+            if parameters.print_regression_details:
+                print("{} :\t{}\t(ground truth : {} / {})".format(data.name, " | ".join(predictions),
+                                                                   data.nbCoins_groundTruth, data.totalValue_groundTruth))
+
+        if parameters.print_regression_details: print()
+        Manager._print_engines_comparison(evaluationStates, totalTimes, totalSharedTime)
+
+    def _print_engines_comparison(evaluationStates: dict[str, EvaluationState], totalTimes: dict[str, float], totalSharedTime: float):
+        """Print the evaluations and times of several engines side by side
+
+        Args:
+            evaluationStates (dict[str, EvaluationState]): the evaluation state of each engine
+            totalTimes (dict[str, float]): the time spent by each engine on all the images (without the shared pre-treatment)
+            totalSharedTime (float): the time spent on the pre-treatment shared by the engines
+        """
+        headers = ["Engine", "Perfect nb coins", "MAE nb coins", "MSE nb coins", "Perfect value", "MAE value", "MSE value", "Time / image"]
+        lines = []
+        for (engine, state) in evaluationStates.items():
+            nbResults = max(1, state.nbResults)
+            (mae_nbCoins, mae_value) = Evaluation.MAE_from_state(state)
+            (mse_nbCoins, mse_value) = Evaluation.MSE_from_state(state)
+            lines.append([engine, 
+                          "{:.2%}".format(state.nbPerfect_nbCoins / nbResults), "{:.2f}".format(mae_nbCoins), "{:.2f}".format(mse_nbCoins),
+                          "{:.2%}".format(state.nbPerfect_value / nbResults), "{:.2f}".format(mae_value), "{:.2f}".format(mse_value),
+                          "{:.3f}s".format(totalTimes[engine] / nbResults)])
+
+        widths = [max(len(header), *(len(line[i]) for line in lines)) for (i, header) in enumerate(headers)]
+        print("Engines comparison")
+        print("\t" + " | ".join(("{:^"+str(width)+"}").format(header) for (header, width) in zip(headers, widths)))
+        for line in lines:
+            print("\t" + " | ".join(("{:^"+str(width)+"}").format(value) for (value, width) in zip(line, widths)))
+
+        nbImages = max(1, max(state.nbResults for state in evaluationStates.values()))
+        print("\t(shared pre-treatment : {:.3f}s / image, not included in the engines times)".format(totalSharedTime / nbImages))
+
+    def _get_prefetcher(image_data: list[ImageData], parameters: Parameters, imageStore: ImageStore | None = None, 
+                        noPrefetch: bool = False, pipeline: Pipeline | None = None) -> ImagePrefetcher:
+        """Get the prefetcher reading and decoding the images in advance (from the image store when there is one)
+
+        Args:
+            image_data (list[ImageData]): the data for each image, in the order they are processed
+            parameters (Parameters): the parameters from the command line (prefetch)
+            imageStore (ImageStore | None, optional): the store of the decoded images. Defaults to None (the images are decoded).
+            noPrefetch (bool, optional): read each image only when it's reached, whatever the prefetch parameters. Defaults to False.
+            pipeline (Pipeline | None, optional): the pipeline of the algorithm, when the images are only used by it :
+                    the images whose results are all in its store aren't decoded (given as None). Defaults to None.
+
+        Returns:
+            ImagePrefetcher: the prefetcher of the images
+        """
+        read_image = ImageReader.read_image_from_path
+        if imageStore is not None:
+            namesByPath = {data.image_path: data.name for data in image_data}
+            read_image = lambda img_path: imageStore.read_image(namesByPath[img_path], img_path)
+        if pipeline is not None:
+            read_decoded_image = read_image
+            read_image = lambda img_path: (read_decoded_image(img_path) 
+                                           if RegressionAlgorithm1.is_decoding_needed_with_pipeline(pipeline, img_path) else None)
+
+        return ImagePrefetcher([data.image_path for data in image_data],
+                               queue_depth = 0 if noPrefetch else parameters.prefetch_queue_depth,
+                               max_bytes = parameters.prefetch_max_bytes,
+                               read_image = read_image)
+
+    def _get_images_to_resume(image_data: list[ImageData], filePath_checkpoint: str) -> tuple[list[ImageData], list[ResultsToEvaluate]]:
+        """Separate the images already completed according to a checkpoint log, from the images still to process
+
+        Args:
+            image_data (list[ImageData]): the data for each image of the run
+            filePath_checkpoint (str): path to the checkpoint log
+
+        Returns:
+            imagesToProcess,_completedResults (tuple[list[ImageData], list[ResultsToEvaluate]]): 
+                    the images still to process, and the results of the images already completed
+        """
+        imagesNames = set(data.name for data in image_data)
+        completedResults = {}
+        for result in CheckpointLog.read(filePath_checkpoint):
+            if result.image_name in imagesNames:
+                completedResults[result.image_name] = result
+
+        imagesToProcess = [data for data in image_data if data.name not in completedResults]
+        return (imagesToProcess, list(completedResults.values()))
+
+    def _manage_evaluation(results: list[ResultsToEvaluate], evaluations_list: list[str], nbCoinsOnly: bool = False):
         """Evaluate some results from regression prediction. The evaluations is done in the order of the list of evaluations.
 
         Args:
             results (list[ResultsToEvaluate]): the results to evaluate
             evaluations_list (list[str]): the list of evaluations to do, in that order
+            nbCoinsOnly (bool, optional): only evaluate the number of coins (count-only mode). Defaults to False.
+        """
+        Manager._print_evaluation(EvaluationState.from_results(results), evaluations_list, nbCoinsOnly)
+
+    def _print_evaluation(evaluationState: EvaluationState, evaluations_list: list[str], nbCoinsOnly: bool = False):
+        """Print the evaluations of some results, from their evaluation state. The evaluations is done in the order of the list of evaluations.
+
+        Args:
+            evaluationState (EvaluationState): the evaluation state of the results to evaluate
+            evaluations_list (list[str]): the list of evaluations to do, in that order
+            nbCoinsOnly (bool, optional): only print the evaluations of the number of coins (count-only mode). Defaults to False.
         """
         
         for evaluation in evaluations_list:
             match evaluation:
                 case evaluations.MAE:
-                    (linesMAE_nbCoins, linesMAE_monetaryValue) = Evaluation.get_strings_MAE(results)
-                    # (mae_nbCoins, mae_value) = Evaluation.MAE(results)
-                    # print("MAE number of coins = {:.3f}".format(mae_nbCoins))
-                    # print("MAE monetary value = {:.3f}".format(mae_value))
-                    # print()
+                    (linesMAE_nbCoins, linesMAE_monetaryValue) = Evaluation.get_strings_MAE_from_state(evaluationState)
                 case evaluations.MSE:
-                    (linesMSE_nbCoins, linesMSE_monetaryValue) = Evaluation.get_strings_MSE(results)
-                    # (mse_nbCoins, mse_value) = Evaluation.MSE(results)
-                    # print("MSE number of coins = {:.3f}".format(mse_nbCoins))
-                    # print("MSE monetary value = {:.3f}".format(mse_value))
-                    # print()
+                    (linesMSE_nbCoins, linesMSE_monetaryValue) = Evaluation.get_strings_MSE_from_state(evaluationState)
 
         # For nb coins evaluation
-        linesProportionsNbCoins = Evaluation.get_string_proportions_nb_coins_predictions(results)
+        linesProportionsNbCoins = Evaluation.get_string_proportions_nb_coins_predictions_from_state(evaluationState)
         print("Number of coins")
         print("\t"+ str.replace(linesProportionsNbCoins, "\t", "\t\t"))
 
@@ -120,7 +768,9 @@ class Manager():
                 case evaluations.MSE: print("\t" + str.replace(linesMSE_nbCoins, "\t", "\t\t"))
 
         # For monetary value evaluation
-        linesProportionsMonetaryValue = Evaluation.get_string_proportions_monetary_value(results)
+        if nbCoinsOnly:
+            return
+        linesProportionsMonetaryValue = Evaluation.get_string_proportions_monetary_value_from_state(evaluationState)
         print("\nMonetary value")
         print("\t"+ str.replace(linesProportionsMonetaryValue, "\t", "\t\t"))
         
@@ -186,7 +836,7 @@ class Manager():
         
         print(constructedLines)
 
-    def print_details_gradually_part1(listNames: list[str]) -> int:
+    def print_details_gradually_part1(listNames: list[str], nbCoinsOnly: bool = False) -> int:
         # 1) Get the maximum lengths of the parameters to print
         len_name = 0
         for name in listNames:
@@ -202,21 +852,24 @@ class Manager():
         # Line 1
         constructedLines = " "*len_name 
         constructedLines += ("{:^"+str(len_nbC_pred+len_nbC_GT+3)+"}").format("Number of coins")
-        constructedLines += " "*space_in_between
-        constructedLines += ("{:^"+str(len_value_pred+len_value_GT+3)+"}").format("Monetary value")
+        if not nbCoinsOnly:
+            constructedLines += " "*space_in_between
+            constructedLines += ("{:^"+str(len_value_pred+len_value_GT+3)+"}").format("Monetary value")
         constructedLines += "\n"
 
         # Line 2
         constructedLines += " "*len_name
         constructedLines += ("{:^"+str(len_nbC_pred+len_nbC_GT+3)+"}").format("Prediction / Ground Truth")
-        constructedLines += " "*space_in_between
-        constructedLines += ("{:^"+str(len_value_pred+len_value_GT+3)+"}").format("Prediction / Ground Truth")
+        if not nbCoinsOnly:
+            constructedLines += " "*space_in_between
+            constructedLines += ("{:^"+str(len_value_pred+len_value_GT+3)+"}").format("Prediction / Ground Truth")
         constructedLines += "\n"
 
         print(constructedLines)
         return len_name
 
-    def print_details_gradually_part2(data: ResultsToEvaluate, fileNamePadding: int, timeDuration: float):
+    def print_details_gradually_part2(data: ResultsToEvaluate, fileNamePadding: int, timeDuration: float, nbCoinsOnly: bool = False,
+                                      memory: dict[str, tuple[int, int]] | None = None):
         len_name = fileNamePadding
         len_nbC_pred = max(len("100"), len("Prediction"))
         len_nbC_GT = max(len("100"), len("Ground Truth"))
@@ -230,12 +883,19 @@ class Manager():
         constructedLine += " / "
         constructedLine += ("{:<"+str(len_nbC_GT)+"}").format(data.nbCoins_groundTruth)
 
-        constructedLine += ("{:^"+str(space_in_between)+"}").format("|")
+        if not nbCoinsOnly:
+            constructedLine += ("{:^"+str(space_in_between)+"}").format("|")
 
-        constructedLine += ("{:>"+str(len_value_pred)+"}").format(data.totalMonetaryValue_predicted)
-        constructedLine += " / "
-        constructedLine += ("{:<"+str(len_value_GT)+"}").format(data.totalMonetaryValue_groundTruth)
+            constructedLine += ("{:>"+str(len_value_pred)+"}").format(data.totalMonetaryValue_predicted)
+            constructedLine += " / "
+            constructedLine += ("{:<"+str(len_value_GT)+"}").format(data.totalMonetaryValue_groundTruth)
 
         constructedLine += "\t({:.3f}s)".format(timeDuration)
+        if memory:
+            # The stage with the highest peak of allocated bytes, and the RSS delta of the whole image
+            (peakStage, (peakBytes, _)) = max(memory.items(), key=lambda item: item[1][0])
+            constructedLine += " (peak {} in {}, RSS {:+.1f} MiB)".format(format_bytes(peakBytes), peakStage,
+                                                                        sum(rssDelta for (_, rssDelta) in memory.values()) / 1024**2)
+        if data.usedFallback: constructedLine += " (fallback detection)"
 
         print(constructedLine)
\ No newline at end of file
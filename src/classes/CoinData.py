@@ -36,6 +36,7 @@ class CoinData():
     xCenter: float
     yCenter: float
     radius: float
+    detectedRadius: float
     coinType: CoinType | None
     value: CoinValue | None
 
@@ -43,6 +44,7 @@ class CoinData():
         self.xCenter = xCenter
         self.yCenter = yCenter
         self.radius = radius
+        self.detectedRadius = radius
         self.coinType = None
         self.value = None
 
@@ -0,0 +1,56 @@
+import numpy as np
+from numpy import ndarray
+
+class CoinsFeatures():
+    """The hue features of several coins, from which their types are decided (one line per coin in each array)"""
+
+    hInternal_means: ndarray
+    """The mean hue of the internal region of each coin"""
+
+    hExternal_means: ndarray
+    """The mean hue of the external ring of each coin"""
+
+    weighted_hues: ndarray
+    """The mean hue of the internal region of each coin, weighted by saturation"""
+
+    hue_hists: ndarray
+    """The hue histogram of the internal region of each coin, in a (N,180) matrix"""
+
+    def __init__(self, hInternal_means: ndarray, hExternal_means: ndarray, weighted_hues: ndarray, hue_hists: ndarray):
+        self.hInternal_means = hInternal_means
+        self.hExternal_means = hExternal_means
+        self.weighted_hues = weighted_hues
+        self.hue_hists = hue_hists
+
+    def __len__(self) -> int:
+        """Number of coins"""
+        return len(self.hInternal_means)
+
+    def subset(self, coinIndexes: slice | ndarray) -> "CoinsFeatures":
+        """Get the features of some of the coins
+
+        Args:
+            coinIndexes (slice | ndarray): the indexes (or boolean mask) of the coins to keep
+
+        Returns:
+            CoinsFeatures: the features of these coins
+        """
+        return CoinsFeatures(self.hInternal_means[coinIndexes], self.hExternal_means[coinIndexes],
+                             self.weighted_hues[coinIndexes], self.hue_hists[coinIndexes])
+
+    def concatenate(features_list: list["CoinsFeatures"], nbBins: int = 180) -> "CoinsFeatures":
+        """Concatenate the features of several groups of coins
+
+        Args:
+            features_list (list[CoinsFeatures]): the features of each group
+            nbBins (int, optional): number of bins of the hue histograms (for an empty list). Defaults to 180.
+
+        Returns:
+            CoinsFeatures: the features of all the coins, in the order of the groups
+        """
+        if not features_list:
+            return CoinsFeatures(np.zeros(0), np.zeros(0), np.zeros(0), np.zeros((0, nbBins), dtype=np.int64))
+        return CoinsFeatures(np.concatenate([features.hInternal_means for features in features_list]),
+                             np.concatenate([features.hExternal_means for features in features_list]),
+                             np.concatenate([features.weighted_hues for features in features_list]),
+                             np.concatenate([features.hue_hists for features in features_list]))
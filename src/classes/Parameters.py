@@ -1,8 +1,10 @@
+from ..regression.Presets import DEFAULT_PRESET
+
 class Parameters():
     """Contains parameters (defined by arguments on program's execution)"""
 
-    evaluatedImages_filePath: str
-    """Path to the file containing the list of images names to be evaluated"""
+    evaluatedImages_filePath: str | None
+    """Path to the file containing the list of images names to be evaluated (optional if glob patterns select the images)"""
 
     imageCollection_directoryPath: str
     """Path to the directory containing all the image to be evaluated"""
@@ -18,13 +20,151 @@ class Parameters():
 
     print_regression_details: bool
     """Show regression predictions"""
+
+    images_glob_patterns: list[str] | None
+    """Glob patterns selecting the images to evaluate in the image directory (None = no selection by patterns)"""
+
+    directoryIndex_filePath: str | None
+    """Path to the file persisting the index of the image directory (None = index only kept in memory)"""
+
+    shard: tuple[int, int] | None
+    """The shard to process (shard number, number of shards), or None to process every image"""
+
+    shardResults_filePath: str | None
+    """Path to the file where the predictions and the mergeable evaluation state are written (None = not written)"""
+
+    results_filePath: str | None
+    """Path to the file where the results of each image are streamed ('.csv' for CSV, JSONL otherwise ; None = not written)"""
+
+    coinDetails_filePath: str | None
+    """Path to the binary columnar file where the data of each coin are streamed (None = not written)"""
+
+    results_batch_size: int
+    """Number of images whose results are buffered before being flushed to the results files"""
+
+    checkpoint_filePath: str | None
+    """Path to the checkpoint log, where each completed image is appended (None = no checkpoint)"""
+
+    checkpoint_batch_size: int
+    """Number of completed images appended together to the checkpoint log"""
+
+    resume_from_checkpoint: bool
+    """Skip the images already completed according to the checkpoint log"""
+
+    detection_time_budget: float | None
+    """Time budget (in seconds) of the circle detection for one image, before using the fallback detection (None = no budget)"""
+
+    adaptive_detection: bool
+    """Adapt the detection resolution and the searched radiuses to each image, from a pre-pass estimating the coin size"""
+
+    region_detection: bool
+    """Only detect the circles inside the foreground regions of each image, found by a cheap pre-segmentation"""
+
+    verify_threshold: float | None
+    """Smallest verification score of a detected circle, the weaker circles being dropped before their analysis (None = no verification)"""
+
+    imageStore_directoryPath: str | None
+    """Directory of the image store, from which the decoded images and their detection level are read (None = the images are decoded)"""
+
+    cache_directoryPath: str | None
+    """Directory of the memoized results of the pipeline stages (None = no memoization)"""
+
+    engines: list[str] | None
+    """Engines compared side by side on each image (None = the regression algorithm only)"""
+
+    featureStore_filePath: str | None
+    """Path to the per-coin feature store (written during the run, or read with 'classify_only')"""
+
+    classify_only: bool
+    """Only classify the coins from the feature store, without detecting them"""
+
+    profile_directoryPath: str | None
+    """Directory where the profiles of the stages are written (None = no profiling)"""
+
+    profile_images_patterns: list[str] | None
+    """Glob patterns selecting the names of the profiled images (None = every image)"""
+
+    watchState_filePath: str | None
+    """Path to the watch state : the image directory is watched, and only its new or changed images are processed (None = no watch)"""
+
+    watch_interval: float
+    """Interval (in seconds) between two scans of the watched directory (0 = a single scan)"""
+
+    track_memory: bool
+    """Track the peak allocated bytes and the RSS delta of each stage of the algorithm, on each image (see 'MemoryTracker')"""
+
+    preset: str
+    """Name of the preset setting the tuning knobs of the whole pipeline (see 'Presets')"""
+
+    count_only: bool
+    """Only count the coins (decoded at a reduced resolution, no valuation), and only evaluate the number of coins"""
+
+    classification_batch_size: int | None
+    """Number of images whose coins are classified together in a coin atlas (None = each image is classified alone)"""
+
+    nb_workers: int | None
+    """Number of worker processes applying the regression algorithm, the images being handed to them through shared memory
+    (None = the images are processed in the main process)"""
+
+    timingHistory_filePath: str | None
+    """Path to the timing history, from which the images are scheduled across the workers longest first (None = order of the names)"""
+
+    prefetch_queue_depth: int
+    """Number of images read and decoded in advance, in background threads (0 = no prefetch)"""
+
+    prefetch_max_bytes: int
+    """Memory ceiling (in bytes) of the decoded images waiting in the prefetch queue"""
     
     def __init__(self, evaluatedImages_path: str, imageCollec_path: str, 
-                 groundTruth_path: str, evaluation_types: list[str], solution_algo: str, print_regression_details: bool):
+                 groundTruth_path: str, evaluation_types: list[str], solution_algo: str, print_regression_details: bool,
+                 prefetch_queue_depth: int = 4, prefetch_max_bytes: int = 1024**3,
+                 images_glob_patterns: list[str] | None = None, directoryIndex_path: str | None = None,
+                 shard: tuple[int, int] | None = None, shardResults_path: str | None = None,
+                 results_path: str | None = None, coinDetails_path: str | None = None, results_batch_size: int = 64,
+                 checkpoint_path: str | None = None, checkpoint_batch_size: int = 1, resume_from_checkpoint: bool = False,
+                 detection_time_budget: float | None = None, adaptive_detection: bool = False,
+                 region_detection: bool = False, verify_threshold: float | None = None,
+                 classification_batch_size: int | None = None, cache_path: str | None = None,
+                 featureStore_path: str | None = None, classify_only: bool = False, engines: list[str] | None = None,
+                 nb_workers: int | None = None, imageStore_path: str | None = None,
+                 timingHistory_path: str | None = None, count_only: bool = False,
+                 preset: str = DEFAULT_PRESET, profile_path: str | None = None, profile_images_patterns: list[str] | None = None,
+                 track_memory: bool = False, watchState_path: str | None = None, watch_interval: float = 5.0):
         
         self.evaluatedImages_filePath = evaluatedImages_path
         self.imageCollection_directoryPath = imageCollec_path
         self.groundTruth_filePath = groundTruth_path
         self.evaluation_types = evaluation_types
         self.regression_algorithm = solution_algo
-        self.print_regression_details = print_regression_details
\ No newline at end of file
+        self.print_regression_details = print_regression_details
+        self.prefetch_queue_depth = prefetch_queue_depth
+        self.prefetch_max_bytes = prefetch_max_bytes
+        self.images_glob_patterns = images_glob_patterns
+        self.directoryIndex_filePath = directoryIndex_path
+        self.shard = shard
+        self.shardResults_filePath = shardResults_path
+        self.results_filePath = results_path
+        self.coinDetails_filePath = coinDetails_path
+        self.results_batch_size = results_batch_size
+        self.checkpoint_filePath = checkpoint_path
+        self.checkpoint_batch_size = checkpoint_batch_size
+        self.resume_from_checkpoint = resume_from_checkpoint
+        self.detection_time_budget = detection_time_budget
+        self.adaptive_detection = adaptive_detection
+        self.region_detection = region_detection
+        self.verify_threshold = verify_threshold
+        self.classification_batch_size = classification_batch_size
+        self.cache_directoryPath = cache_path
+        self.featureStore_filePath = featureStore_path
+        self.classify_only = classify_only
+        self.engines = engines
+        self.nb_workers = nb_workers
+        self.imageStore_directoryPath = imageStore_path
+        self.timingHistory_filePath = timingHistory_path
+        self.count_only = count_only
+        self.preset = preset
+        self.profile_directoryPath = profile_path
+        self.profile_images_patterns = profile_images_patterns
+        self.track_memory = track_memory
+        self.watchState_filePath = watchState_path
+        self.watch_interval = watch_interval
@@ -1,3 +1,5 @@
+import math
+
 class ResultsToEvaluate():
     """Structure containing the results to evaluate : the prediction compared to the ground truth"""
 
@@ -16,10 +18,69 @@ class ResultsToEvaluate():
     totalMonetaryValue_groundTruth: float
     """The ground truth of the total monetary value"""
 
+    usedFallback: bool
+    """True if the prediction comes from the fallback detection (the normal detection exceeded its time budget)"""
+
     def __init__(self, name: str, nbCoins_prediction: int, nbCoins_groundTruth: int,
-                 totalValue_prediction: float, totalValue_groundTruth: float):
+                 totalValue_prediction: float, totalValue_groundTruth: float, usedFallback: bool = False):
         self.image_name = name
         self.nbCoins_predicted = nbCoins_prediction
         self.nbCoins_groundTruth = nbCoins_groundTruth
         self.totalMonetaryValue_predicted = totalValue_prediction
         self.totalMonetaryValue_groundTruth = totalValue_groundTruth
+        self.usedFallback = usedFallback
+
+    def to_dict(self) -> dict[str, str | int | float]:
+        """Convert the results to a dictionary (to be saved in a file). A missing monetary value (NaN) is converted to None,
+        so that the dictionary is written as strict JSON (null)
+
+        Returns:
+            dict[str, str | int | float]: key = attribute name, value = attribute value
+        """
+        return {
+            "image_name": self.image_name,
+            "nbCoins_predicted": int(self.nbCoins_predicted),
+            "nbCoins_groundTruth": int(self.nbCoins_groundTruth),
+            "totalMonetaryValue_predicted": _get_missing_as_none(float(self.totalMonetaryValue_predicted)),
+            "totalMonetaryValue_groundTruth": _get_missing_as_none(float(self.totalMonetaryValue_groundTruth)),
+            "usedFallback": bool(self.usedFallback)
+        }
+
+    def from_dict(data: dict[str, str | int | float]) -> "ResultsToEvaluate":
+        """Create results from a dictionary created with 'to_dict' (a missing monetary value, None or NaN, is converted to NaN)
+
+        Args:
+            data (dict[str, str | int | float]): the dictionary
+
+        Returns:
+            ResultsToEvaluate: the results
+        """
+        return ResultsToEvaluate(name = data["image_name"],
+                                 nbCoins_prediction = data["nbCoins_predicted"],
+                                 nbCoins_groundTruth = data["nbCoins_groundTruth"],
+                                 totalValue_prediction = _get_none_as_missing(data["totalMonetaryValue_predicted"]),
+                                 totalValue_groundTruth = _get_none_as_missing(data["totalMonetaryValue_groundTruth"]),
+                                 usedFallback = data.get("usedFallback", False))
+
+
+def _get_missing_as_none(value: float) -> float | None:
+    """Replace a missing monetary value (NaN) with None
+
+    Args:
+        value (float): the monetary value
+
+    Returns:
+        float | None: the value, or None if it was NaN
+    """
+    return None if math.isnan(value) else value
+
+def _get_none_as_missing(value: float | None) -> float:
+    """Replace a missing monetary value written as None with NaN
+
+    Args:
+        value (float | None): the monetary value read from a file
+
+    Returns:
+        float: the value, or NaN if it was None
+    """
+    return math.nan if value is None else value
@@ -0,0 +1,168 @@
+import math
+from ..classes.ResultsToEvaluate import ResultsToEvaluate
+
+class EvaluationState():
+    """Mergeable state of the evaluation : the sums and counts from which every evaluation is computed.
+    States computed on separate parts of the results (for example, on several shards) can be merged
+    to get the same evaluation as on all the results at once."""
+
+    nbResults: int
+    """The number of results"""
+
+    sumAbsoluteError_nbCoins: float
+    """Sum of the absolute errors on the number of coins"""
+
+    sumSquaredError_nbCoins: float
+    """Sum of the squared errors on the number of coins"""
+
+    sumAbsoluteError_value: float
+    """Sum of the absolute errors on the monetary value (the invalid ground truths, and the missing predictions, are ignored)"""
+
+    sumSquaredError_value: float
+    """Sum of the squared errors on the monetary value (the invalid ground truths, and the missing predictions, are ignored)"""
+
+    nbNotPerfect_nbCoins: int
+    """The number of results with a wrong number of coins"""
+
+    sumAbsoluteError_nbCoins_notPerfect: float
+    """Sum of the absolute errors on the number of coins, for the results with a wrong number of coins"""
+
+    sumSquaredError_nbCoins_notPerfect: float
+    """Sum of the squared errors on the number of coins, for the results with a wrong number of coins"""
+
+    nbPerfect_nbCoins: int
+    """The number of results with a perfect number of coins"""
+
+    sumAbsoluteError_value_perfectNbCoins: float
+    """Sum of the absolute errors on the monetary value, for the results with a perfect number of coins"""
+
+    sumSquaredError_value_perfectNbCoins: float
+    """Sum of the squared errors on the monetary value, for the results with a perfect number of coins"""
+
+    nbNearPerfect_nbCoins: int
+    """The number of results with a difference of 1 or 2 on the number of coins"""
+
+    nbNotGood_nbCoins: int
+    """The number of results with a difference of more than 2 on the number of coins"""
+
+    nbPerfect_value: int
+    """The number of results with a perfect monetary value"""
+
+    nbPerfectValue_withPerfectNbCoins: int
+    """The number of results with both a perfect number of coins and a perfect monetary value"""
+
+    def __init__(self):
+        self.nbResults = 0
+        self.sumAbsoluteError_nbCoins = 0.0
+        self.sumSquaredError_nbCoins = 0.0
+        self.sumAbsoluteError_value = 0.0
+        self.sumSquaredError_value = 0.0
+        self.nbNotPerfect_nbCoins = 0
+        self.sumAbsoluteError_nbCoins_notPerfect = 0.0
+        self.sumSquaredError_nbCoins_notPerfect = 0.0
+        self.nbPerfect_nbCoins = 0
+        self.sumAbsoluteError_value_perfectNbCoins = 0.0
+        self.sumSquaredError_value_perfectNbCoins = 0.0
+        self.nbNearPerfect_nbCoins = 0
+        self.nbNotGood_nbCoins = 0
+        self.nbPerfect_value = 0
+        self.nbPerfectValue_withPerfectNbCoins = 0
+
+    def from_results(results: list[ResultsToEvaluate]) -> "EvaluationState":
+        """Compute the evaluation state of a list of results
+
+        Args:
+            results (list[ResultsToEvaluate]): the results to evaluate
+
+        Returns:
+            EvaluationState: the evaluation state of the results
+        """
+        state = EvaluationState()
+        for result in results:
+            state.add(result)
+        return state
+
+    def add(self, result: ResultsToEvaluate):
+        """Add a result to the evaluation state
+
+        Args:
+            result (ResultsToEvaluate): the result to add
+        """
+        differenceNbCoins = float(result.nbCoins_predicted) - float(result.nbCoins_groundTruth)
+        isPerfectNbCoins = differenceNbCoins == 0
+
+        self.nbResults += 1
+        self.sumAbsoluteError_nbCoins += abs(differenceNbCoins)
+        self.sumSquaredError_nbCoins += differenceNbCoins**2
+
+        if isPerfectNbCoins:
+            self.nbPerfect_nbCoins += 1
+        else:
+            self.nbNotPerfect_nbCoins += 1
+            self.sumAbsoluteError_nbCoins_notPerfect += abs(differenceNbCoins)
+            self.sumSquaredError_nbCoins_notPerfect += differenceNbCoins**2
+            if abs(differenceNbCoins) <= 2:
+                self.nbNearPerfect_nbCoins += 1
+            else:
+                self.nbNotGood_nbCoins += 1
+
+        if math.isnan(float(result.totalMonetaryValue_groundTruth)):
+            return # ignore the invalid ground truth
+        if math.isnan(float(result.totalMonetaryValue_predicted)):
+            return # no monetary value predicted (count-only mode)
+
+        differenceValue = float(result.totalMonetaryValue_predicted) - float(result.totalMonetaryValue_groundTruth)
+        self.sumAbsoluteError_value += abs(differenceValue)
+        self.sumSquaredError_value += differenceValue**2
+        if isPerfectNbCoins:
+            self.sumAbsoluteError_value_perfectNbCoins += abs(differenceValue)
+            self.sumSquaredError_value_perfectNbCoins += differenceValue**2
+        if differenceValue == 0:
+            self.nbPerfect_value += 1
+            if isPerfectNbCoins:
+                self.nbPerfectValue_withPerfectNbCoins += 1
+
+    def remove(self, result: ResultsToEvaluate):
+        """Remove a result previously added to the evaluation state (for example, to replace it with the result of a new version of its image)
+
+        Args:
+            result (ResultsToEvaluate): the result to remove (with the same values as when it was added)
+        """
+        for (attribute, value) in vars(EvaluationState.from_results([result])).items():
+            setattr(self, attribute, getattr(self, attribute) - value)
+
+    def merge(self, other: "EvaluationState"):
+        """Merge another evaluation state into this one (all sums and counts are added)
+
+        Args:
+            other (EvaluationState): the evaluation state to merge
+        """
+        for (attribute, value) in vars(other).items():
+            setattr(self, attribute, getattr(self, attribute) + value)
+
+    def to_dict(self) -> dict[str, int | float]:
+        """Convert the evaluation state to a dictionary (to be saved in a file)
+
+        Returns:
+            dict[str, int | float]: key = name of the sum or count, value = its value
+        """
+        return dict(vars(self))
+
+    def from_dict(data: dict[str, int | float]) -> "EvaluationState":
+        """Create an evaluation state from a dictionary created with 'to_dict'
+
+        Args:
+            data (dict[str, int | float]): the dictionary
+
+        Raises:
+            ValueError: the dictionary doesn't describe an evaluation state
+
+        Returns:
+            EvaluationState: the evaluation state
+        """
+        state = EvaluationState()
+        if set(data.keys()) != set(vars(state).keys()):
+            raise ValueError("The data doesn't describe an evaluation state.")
+        for (attribute, value) in data.items():
+            setattr(state, attribute, value)
+        return state
@@ -1,4 +1,5 @@
 from ..classes.ResultsToEvaluate import ResultsToEvaluate
+from .EvaluationState import EvaluationState
 import math
 
 class Evaluation():
@@ -14,18 +15,21 @@ class Evaluation():
         Returns:
             MAE_nbCoins,MAE_value (tuple[float, float]): MAE for number of coins, MAE for monetary value 
         """
-        if len(results) == 0:
+        return Evaluation.MAE_from_state(EvaluationState.from_results(results))
+
+    def MAE_from_state(state: EvaluationState) -> tuple[float, float]:
+        """Compute the Mean Absolute Error (MAE) from an evaluation state,
+        for both the number of coins and the monetary value (separately)
+
+        Args:
+            state (EvaluationState): the evaluation state of the results
+
+        Returns:
+            MAE_nbCoins,MAE_value (tuple[float, float]): MAE for number of coins, MAE for monetary value 
+        """
+        if state.nbResults == 0:
             return (0,0)
-        sum_nbCoins = 0
-        sum_value = 0
-        for i in range(len(results)):
-            sum_nbCoins += abs(float(results[i].nbCoins_predicted) - float(results[i].nbCoins_groundTruth))
-            if str(results[i].totalMonetaryValue_groundTruth) == "nan":
-                continue # ignore the invalid ground truth
-            sum_value += abs(float(results[i].totalMonetaryValue_predicted) - float(results[i].totalMonetaryValue_groundTruth))
-        sum_nbCoins /= len(results)
-        sum_value /= len(results)
-        return (sum_nbCoins, sum_value)
+        return (state.sumAbsoluteError_nbCoins / state.nbResults, state.sumAbsoluteError_value / state.nbResults)
     
     def MSE(results: list[ResultsToEvaluate]) -> tuple[float, float]:
         """Compute the Mean Squared Error (MSE),
@@ -38,18 +42,21 @@ class Evaluation():
         Returns:
             MSE_nbCoins,MSE_value (tuple[float, float]): MSE for number of coins, MSE for monetary value 
         """
-        if len(results) == 0:
+        return Evaluation.MSE_from_state(EvaluationState.from_results(results))
+
+    def MSE_from_state(state: EvaluationState) -> tuple[float, float]:
+        """Compute the Mean Squared Error (MSE) from an evaluation state,
+        for both the number of coins and the monetary value (separately)
+
+        Args:
+            state (EvaluationState): the evaluation state of the results
+
+        Returns:
+            MSE_nbCoins,MSE_value (tuple[float, float]): MSE for number of coins, MSE for monetary value 
+        """
+        if state.nbResults == 0:
             return (0,0)
-        sum_nbCoins = 0
-        sum_value = 0
-        for i in range(len(results)):
-            sum_nbCoins += (float(results[i].nbCoins_predicted) - float(results[i].nbCoins_groundTruth))**2
-            if str(results[i].totalMonetaryValue_groundTruth) == "nan":
-                continue # ignore the invalid ground truth
-            sum_value += (float(results[i].totalMonetaryValue_predicted) - float(results[i].totalMonetaryValue_groundTruth))**2
-        sum_nbCoins /= len(results)
-        sum_value /= len(results)
-        return (sum_nbCoins, sum_value)
+        return (state.sumSquaredError_nbCoins / state.nbResults, state.sumSquaredError_value / state.nbResults)
 
     def get_number_perfect_nb_coins_prediction(results: list[ResultsToEvaluate]) -> tuple[int, int, int]:
         """Gets the number of perfect predictions (and other statistics) concerning the number of coins in the images.
@@ -85,14 +92,25 @@ class Evaluation():
         Returns:
             str: the string describing the proportions
         """
-        (nbPerfectPredictions, nbNearPerfectPredictions, nbNotGoodPredictions) = Evaluation.get_number_perfect_nb_coins_prediction(results)
+        return Evaluation.get_string_proportions_nb_coins_predictions_from_state(EvaluationState.from_results(results))
+
+    def get_string_proportions_nb_coins_predictions_from_state(state: EvaluationState) -> str:
+        """String containing the proportions of good and bad predictions for the number of coins, from an evaluation state
+
+        Args:
+            state (EvaluationState): the evaluation state of the results
+
+        Returns:
+            str: the string describing the proportions
+        """
+        nbResults = state.nbResults
 
         lines = "• Results proportions\n"
         lines += "\tPerfect prediction | Difference of 1 or 2 | Difference > 2\n"
 
-        lines += ("\t{:^"+str(len("Perfect prediction"))+".2%}").format(nbPerfectPredictions / len(results))
-        lines += (" | {:^"+str(len("Difference of 1 or 2"))+".2%}").format(nbNearPerfectPredictions / len(results))
-        lines += (" | {:^"+str(len("Difference > 2"))+".2%}").format(nbNotGoodPredictions / len(results))
+        lines += ("\t{:^"+str(len("Perfect prediction"))+".2%}").format(state.nbPerfect_nbCoins / nbResults)
+        lines += (" | {:^"+str(len("Difference of 1 or 2"))+".2%}").format(state.nbNearPerfect_nbCoins / nbResults)
+        lines += (" | {:^"+str(len("Difference > 2"))+".2%}").format(state.nbNotGood_nbCoins / nbResults)
 
         return lines
     
@@ -115,16 +133,35 @@ class Evaluation():
         return (nbPerfect_nbCoins, nbPerfect_monetaryValue, nbPerfectValue_withPerfectNbCoins)
 
     def get_string_proportions_monetary_value(results: list[ResultsToEvaluate]) -> str:
-        (nbPerfect_nbCoins, nbPerfect_monetaryValue, nbPerfectValue_withPerfectNbCoins) = Evaluation.get_number_perfect_monetary_value_prediction(results)
+        """String containing the proportions of perfect predictions for the monetary value
+
+        Args:
+            results (list[ResultsToEvaluate]): the results to evaluate
+
+        Returns:
+            str: the string describing the proportions
+        """
+        return Evaluation.get_string_proportions_monetary_value_from_state(EvaluationState.from_results(results))
+
+    def get_string_proportions_monetary_value_from_state(state: EvaluationState) -> str:
+        """String containing the proportions of perfect predictions for the monetary value, from an evaluation state
+
+        Args:
+            state (EvaluationState): the evaluation state of the results
+
+        Returns:
+            str: the string describing the proportions
+        """
+        proportionPerfectValue_withPerfectNbCoins = (state.nbPerfectValue_withPerfectNbCoins / state.nbPerfect_nbCoins 
+                                                     if state.nbPerfect_nbCoins > 0 else 0)
 
         lines = "• Results proportions\n"
         lines += "\tPerfect value | Perfect value knowing perfect nb coins\n"
 
-        lines += ("\t{:^"+str(len("Perfect value"))+".2%}").format(nbPerfect_monetaryValue / len(results))
-        lines += (" | {:^"+str(len("Perfect value knowing perfect nb coins"))+".2%}").format(nbPerfectValue_withPerfectNbCoins / nbPerfect_nbCoins)
+        lines += ("\t{:^"+str(len("Perfect value"))+".2%}").format(state.nbPerfect_value / state.nbResults)
+        lines += (" | {:^"+str(len("Perfect value knowing perfect nb coins"))+".2%}").format(proportionPerfectValue_withPerfectNbCoins)
 
         return lines
-        pass
 
     def get_strings_MAE(results: list[ResultsToEvaluate]) -> tuple[str, str]:
         """Strings containing the MAE evaluation concerning the results to evaluate
@@ -135,15 +172,26 @@ class Evaluation():
         Returns:
             string_MAE_nbCoins,_string_MAE_monetaryValue (tuple[str, str]): one string for the MAE about the number of coins, another string for the MAE about the monetary value
         """
-        (global_nbCoins_MAE, global_monetaryValue_MAE) = Evaluation.MAE(results)
+        return Evaluation.get_strings_MAE_from_state(EvaluationState.from_results(results))
+
+    def get_strings_MAE_from_state(state: EvaluationState) -> tuple[str, str]:
+        """Strings containing the MAE evaluation, from the evaluation state of the results
+
+        Args:
+            state (EvaluationState): the evaluation state of the results
+
+        Returns:
+            string_MAE_nbCoins,_string_MAE_monetaryValue (tuple[str, str]): one string for the MAE about the number of coins, another string for the MAE about the monetary value
+        """
+        (global_nbCoins_MAE, global_monetaryValue_MAE) = Evaluation.MAE_from_state(state)
 
         # Only not perfect nb coins predictions
-        listNotPerfectNbCoinsPrediction = [result for result in results if result.nbCoins_groundTruth != result.nbCoins_predicted]
-        (notPerfect_nbCoins_MAE, _) = Evaluation.MAE(listNotPerfectNbCoinsPrediction)
+        notPerfect_nbCoins_MAE = (state.sumAbsoluteError_nbCoins_notPerfect / state.nbNotPerfect_nbCoins
+                                  if state.nbNotPerfect_nbCoins > 0 else 0)
 
         # Only perfect nb coins predictions
-        listPerfectNbCoinsPrediction = [result for result in results if result.nbCoins_groundTruth == result.nbCoins_predicted]
-        (_, perfectNbCoins_monetaryValue_MAE) = Evaluation.MAE(listPerfectNbCoinsPrediction)
+        perfectNbCoins_monetaryValue_MAE = (state.sumAbsoluteError_value_perfectNbCoins / state.nbPerfect_nbCoins
+                                            if state.nbPerfect_nbCoins > 0 else 0)
 
         # For number of coins
         linesNbCoins = "• MAE\n"
@@ -165,19 +213,30 @@ class Evaluation():
         Args:
             results (list[ResultsToEvaluate]): the results to evaluate
 
+        Returns:
+            string_MSE_nbCoins,_string_MSE_monetaryValue (tuple[str, str]): one string for the MSE about the number of coins, another string for the MSE about the monetary value
+        """
+        return Evaluation.get_strings_MSE_from_state(EvaluationState.from_results(results))
+
+    def get_strings_MSE_from_state(state: EvaluationState) -> tuple[str, str]:
+        """Strings containing the MSE evaluation, from the evaluation state of the results
+
+        Args:
+            state (EvaluationState): the evaluation state of the results
+
         Returns:
             string_MSE_nbCoins,_string_MSE_monetaryValue (tuple[str, str]): one string for the MSE about the number of coins, another string for the MSE about the monetary value
         """
         # All predictions
-        (global_nbCoins_MSE, global_monetaryValue_MSE) = Evaluation.MSE(results)
+        (global_nbCoins_MSE, global_monetaryValue_MSE) = Evaluation.MSE_from_state(state)
 
         # Only not perfect nb coins predictions
-        listNotPerfectNbCoinsPrediction = [result for result in results if result.nbCoins_groundTruth != result.nbCoins_predicted]
-        (notPerfect_nbCoins_MSE, _) = Evaluation.MSE(listNotPerfectNbCoinsPrediction)
+        notPerfect_nbCoins_MSE = (state.sumSquaredError_nbCoins_notPerfect / state.nbNotPerfect_nbCoins
+                                  if state.nbNotPerfect_nbCoins > 0 else 0)
 
         # Only perfect nb coins predictions
-        listPerfectNbCoinsPrediction = [result for result in results if result.nbCoins_groundTruth == result.nbCoins_predicted]
-        (_, perfectNbCoins_monetaryValue_MSE) = Evaluation.MSE(listPerfectNbCoinsPrediction)
+        perfectNbCoins_monetaryValue_MSE = (state.sumSquaredError_value_perfectNbCoins / state.nbPerfect_nbCoins
+                                            if state.nbPerfect_nbCoins > 0 else 0)
 
         # For number of coins
         linesNbCoins = "• MSE\n"
@@ -192,4 +251,3 @@ class Evaluation():
         linesMonetaryValue += (" | {:^"+str(len("Only perfect number of coins predictions"))+".2f}").format(perfectNbCoins_monetaryValue_MSE)
 
         return (linesNbCoins, linesMonetaryValue)
-
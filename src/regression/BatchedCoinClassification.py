@@ -0,0 +1,186 @@
+import numpy as np
+from numpy import ndarray
+import cv2 as cv
+
+from .HistogramStatistics import NB_BINS_HUE
+from .PredictMonetaryValue import update_coins_types_from_features, update_coins_values
+from .Presets import Preset, get_active_preset
+from ..classes.CoinData import CoinData
+from ..classes.CoinsFeatures import CoinsFeatures
+
+ATLAS_PATCH_SIZE = 64
+"""Side length (in pixels) of the square patch each coin is resampled to in the atlas"""
+
+
+def _get_patch_masks(coinCropFactor: float, patch_size: int = ATLAS_PATCH_SIZE) -> tuple[ndarray, ndarray]:
+    """Get the masks of the internal region and of the external ring of the coin in a patch
+    (same proportions as 'get_internal_and_external_ring_masks')
+
+    Args:
+        coinCropFactor (float): size of the crop of the patch, as a factor of the radius of the coin (see 'Preset.coin_crop_factor')
+        patch_size (int, optional): side length of the patch. Defaults to ATLAS_PATCH_SIZE.
+
+    Returns:
+        internalMask,_externalRingMask (tuple[ndarray, ndarray]): the internal mask, and the external ring mask
+    """
+    center = patch_size // 2
+    radius = patch_size / 2 / coinCropFactor
+    Y, X = np.ogrid[:patch_size, :patch_size]
+    squaredDistances = (Y - center)**2 + (X - center)**2
+
+    internal_mask = squaredDistances <= (radius * 0.6)**2
+    external_ring_mask = (squaredDistances <= (radius * 0.85)**2) ^ (squaredDistances <= (radius * 0.7)**2)
+    return (internal_mask, external_ring_mask)
+
+
+class CoinAtlas():
+    """Atlas of the coins of several images, each coin resampled to a fixed-size square patch.
+    The coins of all the images are then classified together with a few vectorized operations
+    (gray world, HSV conversion and hue features), and only the Otsu threshold between copper and gold cents
+    is computed per image.
+
+    The patches are extracted as soon as an image is added, so the images themselves aren't kept."""
+
+    def __init__(self, preset: Preset | None = None):
+        """Create an empty atlas
+
+        Args:
+            preset (Preset | None, optional): the preset giving the crop of the coins. Defaults to None (the active preset).
+        """
+        self._coinCropFactor = (preset or get_active_preset()).coin_crop_factor
+        self._patches = []
+        self._coinData_lists = []
+
+    def __len__(self) -> int:
+        """Number of images in the atlas"""
+        return len(self._coinData_lists)
+
+    def add_image(self, img: ndarray, coinData_list: list[CoinData]):
+        """Add the coins of an image to the atlas (their circles and refined radiuses must be known)
+
+        Args:
+            img (ndarray): the image containing the coins
+            coinData_list (list[CoinData]): the data of each coin of the image
+        """
+        for coinData in coinData_list:
+            self._patches.append(_get_coin_patch(img, coinData.xCenter, coinData.yCenter, coinData.radius, self._coinCropFactor))
+        self._coinData_lists.append(coinData_list)
+
+    def classify(self) -> list[list[CoinData]]:
+        """Decide the type and the value of every coin in the atlas, then empty the atlas
+
+        Returns:
+            coinData_lists (list[list[CoinData]]): the data of each coin, for each image (in the order they were added)
+        """
+        coinData_lists = self._coinData_lists
+        if self._patches:
+            atlas = np.stack(self._patches)
+            features = get_coins_features(atlas, self._coinCropFactor)
+        self._patches = []
+        self._coinData_lists = []
+
+        firstCoinIndex = 0
+        for coinData_list in coinData_lists:
+            coinIndexes = slice(firstCoinIndex, firstCoinIndex + len(coinData_list))
+            firstCoinIndex += len(coinData_list)
+            if not coinData_list:
+                continue
+
+            update_coins_types_from_features(coinData_list, features.subset(coinIndexes))
+            update_coins_values(coinData_list)
+
+        return coinData_lists
+
+
+def _get_coin_patch(img: ndarray, coinCenterX: float, coinCenterY: float, radius: float, coinCropFactor: float) -> ndarray:
+    """Get the square patch of a coin : the crop of 'get_zoomed_coin' around the circle, resampled to ATLAS_PATCH_SIZE pixels
+    (the parts outside the image are filled by replicating its border).
+    The resampling takes the nearest pixels : the normalization of 'normalize_hsv_rescaled' stretches the hue and the saturation
+    between their extreme values, which an averaging resampling would pull in (then the features would differ more)
+
+    Args:
+        img (ndarray): the original image containing the coin
+        coinCenterX (float): the X center of the coin
+        coinCenterY (float): the Y center of the coin
+        radius (float): the radius of the coin
+        coinCropFactor (float): half the size of the crop, as a factor of the radius (see 'Preset.coin_crop_factor')
+
+    Returns:
+        patch (ndarray): the patch of the coin (ATLAS_PATCH_SIZE x ATLAS_PATCH_SIZE x 3)
+    """
+    halfSize = max(1, int(coinCropFactor * radius))
+    (xMin, yMin) = (int(coinCenterX) - halfSize, int(coinCenterY) - halfSize)
+    (xMax, yMax) = (int(coinCenterX) + halfSize, int(coinCenterY) + halfSize)
+
+    square = img[max(0, yMin):min(yMax, img.shape[0]), max(0, xMin):min(xMax, img.shape[1])]
+    if square.shape[0] != 2*halfSize or square.shape[1] != 2*halfSize:
+        square = cv.copyMakeBorder(square, max(0, -yMin), max(0, yMax - img.shape[0]), max(0, -xMin), max(0, xMax - img.shape[1]),
+                                   cv.BORDER_REPLICATE)
+
+    return cv.resize(square, (ATLAS_PATCH_SIZE, ATLAS_PATCH_SIZE), interpolation=cv.INTER_NEAREST)
+
+
+def get_coins_features(atlas: ndarray, coinCropFactor: float) -> CoinsFeatures:
+    """Compute the hue features of every coin of an atlas, with the same steps as 'update_coins_types'
+    (gray world, HSV conversion, normalization) applied to all the patches at once.
+    The statistics of these steps (channel means, extreme hues and saturations) are those of the resampled patch, 
+    not of the crop at the resolution of the image : the features are close to those of 'update_coins_types', 
+    but a coin near the threshold between two types may get another type (see the README)
+
+    Args:
+        atlas (ndarray): the N patches of the coins, in a (N, ATLAS_PATCH_SIZE, ATLAS_PATCH_SIZE, 3) matrix (BGR)
+        coinCropFactor (float): half the size of the crop of the patches, as a factor of the radius of the coins
+
+    Returns:
+        CoinsFeatures: the hue features of each coin
+    """
+    nbCoins = atlas.shape[0]
+
+    # Gray world (channel means of each patch)
+    patches = atlas.astype(np.float32)
+    channelMeans = patches.mean(axis=(1, 2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scales = channelMeans.mean(axis=1, keepdims=True) / channelMeans
+    gw_atlas = np.clip(patches * scales[:, None, None, :], 0, 255).astype(np.uint8)
+
+    # HSV conversion of all the patches (stacked in one image)
+    hsv_atlas = cv.cvtColor(gw_atlas.reshape(-1, ATLAS_PATCH_SIZE, 3), cv.COLOR_BGR2HSV).reshape(atlas.shape)
+
+    # Normalization of the hue and saturation of each patch (see 'normalize_hsv_rescaled')
+    hue = _normalize_and_rescale_patches(hsv_atlas[..., 0], 179)
+    saturation = _normalize_and_rescale_patches(hsv_atlas[..., 1], 255)
+
+    # Features of the internal region and of the external ring
+    (internal_mask, external_ring_mask) = _get_patch_masks(coinCropFactor)
+    hInternal_data = hue[:, internal_mask]
+    sInternal_data = saturation[:, internal_mask].astype(np.float64)
+    hInternal_means = hInternal_data.mean(axis=1)
+    hExternal_means = hue[:, external_ring_mask].mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weighted_hues = (hInternal_data * sInternal_data).sum(axis=1) / sInternal_data.sum(axis=1)
+
+    # Hue histogram of the internal region of each coin (one bincount for all the coins)
+    coinOffsets = np.arange(nbCoins)[:, None] * NB_BINS_HUE
+    hue_hists = np.bincount((coinOffsets + np.minimum(hInternal_data, NB_BINS_HUE - 1)).ravel(),
+                            minlength=nbCoins * NB_BINS_HUE).reshape(nbCoins, NB_BINS_HUE)
+
+    return CoinsFeatures(hInternal_means, hExternal_means, weighted_hues, hue_hists)
+
+
+def _normalize_and_rescale_patches(channel: ndarray, maxValue: int) -> ndarray:
+    """Normalize a channel of each patch (zero mean, unit variance), then rescale it to [0;maxValue]
+
+    Args:
+        channel (ndarray): the channel of the N patches, in a (N, height, width) matrix
+        maxValue (int): the maximum value after rescaling
+
+    Returns:
+        ndarray: the rescaled channel of each patch (uint8)
+    """
+    channel = channel.astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normalized = (channel - channel.mean(axis=(1, 2), keepdims=True)) / channel.std(axis=(1, 2), keepdims=True)
+        minimums = normalized.min(axis=(1, 2), keepdims=True)
+        maximums = normalized.max(axis=(1, 2), keepdims=True)
+        rescaled = np.nan_to_num((normalized - minimums) / (maximums - minimums))
+    return (rescaled * maxValue).astype(np.uint8)
@@ -0,0 +1,105 @@
+import numpy as np
+from numpy import ndarray
+import cv2 as cv
+from .DetectCoinsForm import _resize_lowest_side_of_image
+from .Presets import Preset, get_active_preset
+
+NB_SAMPLES = 64
+"""Number of angles at which each circle is sampled"""
+
+SAMPLE_DIRECTIONS = np.stack([np.cos(np.linspace(0, 2*np.pi, NB_SAMPLES, endpoint=False)),
+                              np.sin(np.linspace(0, 2*np.pi, NB_SAMPLES, endpoint=False))], axis=-1)
+"""Unit vectors (x, y) of the sampled angles, in a (NB_SAMPLES,2) matrix (precomputed once for every circle)"""
+
+INTERIOR_RADIUS_FACTOR = 0.75
+"""Radius of the interior samples of a circle, as a factor of its radius"""
+
+EXTERIOR_RADIUS_FACTOR = 1.25
+"""Radius of the exterior samples of a circle, as a factor of its radius"""
+
+MIN_EDGE_GRADIENT = 20.0
+"""Smallest gradient magnitude (Sobel of the blurred gray-scale image) of a circumference sample supporting the circle"""
+
+MIN_RADIAL_ALIGNMENT = 0.7
+"""Smallest absolute cosine between the gradient and the radius of a circumference sample supporting the circle"""
+
+CONTRAST_SCALE = 40.0
+"""Interior/exterior contrast (in gray levels) from which a circle gets the full contrast score"""
+
+SATURATION_SCALE = 40.0
+"""Interior/exterior saturation difference from which a circle gets the full saturation score"""
+
+SCORE_WEIGHTS = (0.5, 0.25, 0.25)
+"""Weights of the edge support, the interior/exterior contrast and the saturation profile in the score of a circle"""
+
+
+def get_circles_scores(img: ndarray, circles: ndarray, resized: ndarray | None = None, preset: Preset | None = None) -> ndarray:
+    """Score detected circles at once, from cheap samples at the detection resolution : the edge support along the circumference
+    (fraction of the samples with a strong gradient, aligned with the radius), the contrast between the interior and the exterior
+    of the circle, and the difference between the saturations of the interior and the exterior (a coin is a uniform metal disc)
+
+    Args:
+        img (ndarray): the image with coins (BGR)
+        circles (ndarray): the N circles in a (1,N,3) matrix, at the resolution of the image
+        resized (ndarray | None, optional): the image already resized at the detection resolution. Defaults to None (the image is resized).
+        preset (Preset | None, optional): the preset giving the detection resolution. Defaults to None (the active preset).
+
+    Returns:
+        ndarray: the N scores, between 0 (background texture) and 1 (clear coin outline)
+    """
+    if resized is None:
+        resized = _resize_lowest_side_of_image(img, (preset or get_active_preset()).shortest_side_length)
+    gray = cv.GaussianBlur(cv.cvtColor(resized, cv.COLOR_BGR2GRAY), (5,5), 0)
+    saturation = cv.cvtColor(resized, cv.COLOR_BGR2HSV)[:, :, 1]
+    (height, width) = gray.shape
+
+    # Circles at the detection resolution
+    scale = width / img.shape[1]
+    centers = circles[0, :, :2].astype(np.float64) * scale # (N,2)
+    radiuses = circles[0, :, 2].astype(np.float64) * scale # (N,)
+
+    def get_samples_coordinates(radiusFactor: float) -> tuple[ndarray, ndarray]:
+        points = centers[:, None, :] + (radiusFactor * radiuses)[:, None, None] * SAMPLE_DIRECTIONS[None, :, :] # (N,NB_SAMPLES,2)
+        xs = np.clip(np.rint(points[:, :, 0]).astype(np.intp), 0, width - 1)
+        ys = np.clip(np.rint(points[:, :, 1]).astype(np.intp), 0, height - 1)
+        return (xs, ys)
+
+    # Edge support : strong gradient along the radius, on the circumference
+    gradX = cv.Sobel(gray, cv.CV_32F, 1, 0, ksize=3)
+    gradY = cv.Sobel(gray, cv.CV_32F, 0, 1, ksize=3)
+    (xs, ys) = get_samples_coordinates(1.0)
+    (gx, gy) = (gradX[ys, xs], gradY[ys, xs])
+    magnitudes = np.hypot(gx, gy)
+    alignments = np.abs(gx * SAMPLE_DIRECTIONS[:, 0] + gy * SAMPLE_DIRECTIONS[:, 1]) / np.maximum(magnitudes, 1e-6)
+    edgeSupport = np.mean((magnitudes >= MIN_EDGE_GRADIENT) & (alignments >= MIN_RADIAL_ALIGNMENT), axis=1)
+
+    # Interior/exterior contrast and saturation profile
+    (xsIn, ysIn) = get_samples_coordinates(INTERIOR_RADIUS_FACTOR)
+    (xsOut, ysOut) = get_samples_coordinates(EXTERIOR_RADIUS_FACTOR)
+    contrast = np.abs(gray[ysIn, xsIn].mean(axis=1) - gray[ysOut, xsOut].mean(axis=1))
+    saturationDifference = np.abs(saturation[ysIn, xsIn].mean(axis=1) - saturation[ysOut, xsOut].mean(axis=1))
+
+    (edgeWeight, contrastWeight, saturationWeight) = SCORE_WEIGHTS
+    return (edgeWeight * edgeSupport
+            + contrastWeight * np.minimum(1.0, contrast / CONTRAST_SCALE)
+            + saturationWeight * np.minimum(1.0, saturationDifference / SATURATION_SCALE))
+
+
+def verify_circles(img: ndarray, circles: ndarray | None, threshold: float, resized: ndarray | None = None, 
+                   preset: Preset | None = None) -> ndarray | None:
+    """Drop the detected circles whose score is below a threshold (see 'get_circles_scores'), before their costly analysis
+
+    Args:
+        img (ndarray): the image with coins (BGR)
+        circles (ndarray | None): the N circles in a (1,N,3) matrix (None if no circle was detected)
+        threshold (float): the smallest score of a kept circle (between 0 and 1 ; higher = fewer false positives, more missed coins)
+        resized (ndarray | None, optional): the image already resized at the detection resolution. Defaults to None (the image is resized).
+        preset (Preset | None, optional): the preset giving the detection resolution. Defaults to None (the active preset).
+
+    Returns:
+        ndarray | None: the kept circles in a (1,M,3) matrix, in the same order (None if no circle is kept)
+    """
+    if circles is None:
+        return None
+    isKept = get_circles_scores(img, circles, resized, preset) >= threshold
+    return circles[:, isKept] if isKept.any() else None
@@ -0,0 +1,197 @@
+from collections import OrderedDict
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+import cv2 as cv
+import numpy as np
+from numpy import ndarray
+from .DetectCoinsForm import get_circles, get_circles_adaptive, get_circles_in_regions
+from .CircleVerification import verify_circles
+from .PredictMonetaryValue import init_CoinData_struct, get_saturation_image, _refine_radius_with_s_profile
+from .PredictMonetaryValue import update_coins_types, update_coins_values, get_total_monetary_value_of_coins
+from .Presets import Preset, PRESETS, get_active_preset
+from ..classes.CoinData import CoinData
+from ..classes.CoinsFeatures import CoinsFeatures
+
+
+class CoinCounter():
+    """Session of the algorithm n°1, constructed once and called for each image with 'process' : it owns its configuration
+    (preset, adaptive detection, OpenCV settings) and the state amortized across the images, instead of rebuilding it at each call
+    (the masks of the coins, the tables of the rays refining the radiuses, and the scratch buffers of the saturation).
+
+    The preset of the session is given to the functions of the algorithm (the active preset of the process isn't changed),
+    so sessions with different presets can be used in the same process. A session isn't thread-safe, and the OpenCV settings
+    (number of threads, optimized code) are set for the whole process."""
+
+    preset: Preset
+    """Preset applied by the session (given to the functions of the algorithm at each call)"""
+
+    adaptive_detection: bool
+    """Adapt the detection resolution and the searched radiuses to each image (see 'get_circles_adaptive')"""
+
+    region_detection: bool
+    """Only detect the circles inside the foreground regions of each image (see 'get_circles_in_regions')"""
+
+    verify_threshold: float | None
+    """Smallest verification score of a detected circle (see 'get_circles_scores' ; None = no verification)"""
+
+    nb_threads: int | None
+    """Number of threads used by OpenCV (None = the OpenCV default)"""
+
+    nb_images: int
+    """Number of images processed by the session"""
+
+    def __init__(self, preset: str | None = None, adaptive_detection: bool = False, region_detection: bool = False, 
+                 verify_threshold: float | None = None, nb_threads: int | None = None):
+        """Create a session
+
+        Args:
+            preset (str | None, optional): the name of the preset (see PRESETS). Defaults to None (the active preset).
+            adaptive_detection (bool, optional): adapt the detection resolution and the searched radiuses to each image. Defaults to False.
+            region_detection (bool, optional): only detect the circles inside the foreground regions of each image 
+                    (not combined with the adaptive detection). Defaults to False.
+            verify_threshold (float | None, optional): smallest verification score of a detected circle, the weaker circles
+                    being dropped before their analysis. Defaults to None (no verification).
+            nb_threads (int | None, optional): the number of threads used by OpenCV, set for the whole process.
+                    Defaults to None (unchanged).
+
+        Raises:
+            ValueError: unknown preset
+        """
+        if preset is not None and preset not in PRESETS:
+            raise ValueError(f"Unknown preset '{preset}' (choose between {', '.join(PRESETS)}).")
+        self.preset = PRESETS[preset] if preset is not None else get_active_preset()
+        self.adaptive_detection = adaptive_detection
+        self.region_detection = region_detection
+        self.verify_threshold = verify_threshold
+        self.nb_threads = nb_threads
+        self.nb_images = 0
+        self._maskCache = OrderedDict() # see 'get_internal_and_external_ring_masks'
+        self._rayTables = {} # see '_refine_radius_with_s_profile'
+        self._buffers = {} # key = name of the buffer, value = the buffer (reallocated when the shape of the images changes)
+
+        cv.setUseOptimized(True)
+        if nb_threads is not None:
+            cv.setNumThreads(nb_threads)
+
+    def process(self, img: ndarray, classify_coins: bool = True, resized: ndarray | None = None) -> list[CoinData]:
+        """Get the data of each coin (circle, refined radius, type and value) of a decoded image
+
+        Args:
+            img (ndarray): the image containing coins (BGR)
+            classify_coins (bool, optional): decide the type and value of each coin
+                    (False when they are decided later, for several images at once with a CoinAtlas). Defaults to True.
+            resized (ndarray | None, optional): the image already resized at the detection resolution, for example from an ImageStore
+                    (not used by the adaptive detection). Defaults to None.
+
+        Returns:
+            coinData_list (list[CoinData]): the data of each coin detected in the image
+        """
+        if classify_coins:
+            return self.process_in_stages(img, lambda name: nullcontext(), resized)
+
+        self.nb_images += 1
+        return self.locate_coins(img, self._detect_circles(img, resized))
+
+    def process_in_stages(self, img: ndarray, stage: Callable[[str], AbstractContextManager], resized: ndarray | None = None) -> list[CoinData]:
+        """Get the data of each coin of a decoded image (as 'process'), each named stage of the algorithm running inside a context
+        given by the caller, for example to profile it or to measure its memory
+
+        Args:
+            img (ndarray): the image containing coins (BGR)
+            stage (Callable[[str], AbstractContextManager]): gives the context of a stage from its name (see STAGE_NAMES)
+            resized (ndarray | None, optional): the image already resized at the detection resolution (not used by the adaptive detection).
+                    Defaults to None.
+
+        Returns:
+            coinData_list (list[CoinData]): the data of each coin detected in the image
+        """
+        self.nb_images += 1
+        with stage("get_circles"):
+            circles = self._detect_circles(img, resized)
+        with stage("update_radiuses"):
+            coinData_list = self.locate_coins(img, circles)
+        with stage("update_coins_types"):
+            update_coins_types(img, coinData_list, maskCache=self._maskCache, preset=self.preset)
+        with stage("update_coins_values"):
+            update_coins_values(coinData_list)
+        return coinData_list
+
+    def get_nbCoins_and_totalMonetaryValue(self, img: ndarray) -> tuple[int, float]:
+        """Get the number of coins, and the monetary value of a decoded image
+
+        Args:
+            img (ndarray): the image containing coins (BGR)
+
+        Returns:
+            nbCoins,_totalMonetaryValue (tuple[int, float]): the number of coins, and the total monetary value
+        """
+        coinData_list = self.process(img)
+        return (len(coinData_list), get_total_monetary_value_of_coins(coinData_list))
+
+    def locate_coins(self, img: ndarray, circles: ndarray | None) -> list[CoinData]:
+        """Get the data of the coins of detected circles, with only their location (circle and refined radius)
+
+        Args:
+            img (ndarray): the image containing coins (BGR)
+            circles (ndarray | None): the N circles in a (1,N,3) matrix (None if no circle was detected)
+
+        Returns:
+            coinData_list (list[CoinData]): the data of each coin (without type and value)
+        """
+        coinData_list = init_CoinData_struct(circles)
+        if coinData_list:
+            img_saturation = get_saturation_image(img, self._get_buffer("hsv", img.shape, np.uint8),
+                                                  self._get_buffer("saturation", img.shape[:2], np.float64))
+            _refine_radius_with_s_profile(coinData_list, img_saturation, self.preset.radius_refinement_angles, rayTables=self._rayTables)
+        return coinData_list
+
+    def classify_coins(self, img: ndarray, coinData_list: list[CoinData]) -> CoinsFeatures:
+        """Decide the type and the value of coins already located in an image
+
+        Args:
+            img (ndarray): the image containing the coins (BGR)
+            coinData_list (list[CoinData]): the data of each coin. Will update the 'coinType' and 'value' attributes.
+
+        Returns:
+            CoinsFeatures: the hue features of the coins, from which their types were decided
+        """
+        features = update_coins_types(img, coinData_list, maskCache=self._maskCache, preset=self.preset)
+        update_coins_values(coinData_list)
+        return features
+
+    def _detect_circles(self, img: ndarray, resized: ndarray | None) -> ndarray | None:
+        """Detect the circles around the coins of an image (with the preset of the session)
+
+        Args:
+            img (ndarray): the image containing coins (BGR)
+            resized (ndarray | None): the image already resized at the detection resolution, or None
+
+        Returns:
+            ndarray | None: the N circles in a (1,N,3) matrix (None if no circle was detected)
+        """
+        if self.adaptive_detection:
+            (circles, nbCircles) = get_circles_adaptive(img, self.preset)
+        elif self.region_detection:
+            (circles, nbCircles) = get_circles_in_regions(img, resized, self.preset)
+        else:
+            (circles, nbCircles) = get_circles(img, resized=resized, preset=self.preset)
+        if self.verify_threshold is not None:
+            circles = verify_circles(img, circles, self.verify_threshold, resized, self.preset)
+        return circles
+
+    def _get_buffer(self, name: str, shape: tuple[int, ...], dtype: type) -> ndarray:
+        """Get a scratch buffer of the session, reallocated only when the shape of the images changes
+
+        Args:
+            name (str): the name of the buffer
+            shape (tuple[int, ...]): its shape
+            dtype (type): its type
+
+        Returns:
+            ndarray: the buffer (its content is undefined)
+        """
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer
@@ -1,66 +1,365 @@
 import numpy as np
 from numpy import ndarray
 import cv2 as cv
+from .HistogramStatistics import get_histogram, get_median
+from .Presets import Preset, get_active_preset
 
 SHORTEST_SIDE_LENGTH = 500
+"""Reference detection resolution, at which the radiuses of the coins are expressed (the preset chooses the actual resolution)"""
 
-def get_circles(img: ndarray) -> tuple[ndarray, int]:
+ADAPTIVE_PREPASS_SHORTEST_SIDE_LENGTH = 250
+"""Resolution of the pre-pass estimating the dominant coin radius in 'get_circles_adaptive'"""
+
+MIN_RESOLVABLE_RADIUS = 12
+"""Smallest radius (in pixels, at the detection resolution) of the coins searched by 'get_circles_adaptive'"""
+
+ADAPTIVE_RADIUS_BAND_FACTORS = (0.5, 1.6)
+"""Radius band searched by 'get_circles_adaptive', as factors of the dominant coin radius
+(the diameters of the euro coins range from 16.25mm to 25.75mm, a factor 1.6, plus a margin for the estimation)"""
+
+REGION_SEGMENTATION_SHORTEST_SIDE_LENGTH = SHORTEST_SIDE_LENGTH // 2
+"""Resolution of the segmentation of the foreground in 'get_circles_in_regions', whatever the detection resolution
+(the outlines of the coins stay connected, and its cost doesn't grow with the preset)"""
+
+REGION_THRESHOLD_BLOCK_SIZE = 25
+"""Block size of the adaptive threshold segmenting the foreground in 'get_circles_in_regions', at the resolution 
+REGION_SEGMENTATION_SHORTEST_SIDE_LENGTH (the block of 'get_circles2' at its resolution, halved)"""
+
+REGION_PADDING_FACTOR = 0.25
+"""Padding of each foreground region searched by 'get_circles_in_regions', as a factor of the largest side of its component
+(so that the whole outline of a coin only partly segmented is inside its region)"""
+
+MAX_REGION_COVERAGE = 0.6
+"""Fraction of the image above which the foreground regions are searched as a whole image in 'get_circles_in_regions'
+(a dense scene, where the regions would save little work)"""
+
+def get_circles(img: ndarray, shortest_side_length: int | None = None, param2: float | None = None, 
+                radius_band: tuple[int, int] | None = None, resized: ndarray | None = None, 
+                preset: Preset | None = None) -> tuple[ndarray, int]:
         """Get the circles around the coins in the image, as they are automatically detected
 
         Args:
             img (ndarray): the image with coins
+            shortest_side_length (int | None, optional): length of the shortest side of the image for the detection. 
+                    The radiuses searched are scaled accordingly. Defaults to None (the resolution of the active preset).
+            param2 (float | None, optional): accumulator threshold of the Hough transform (higher = fewer circles). 
+                    Defaults to None (the threshold of the active preset).
+            radius_band (tuple[int, int] | None, optional): minimum and maximum radiuses searched (at the detection resolution), 
+                    instead of the default ones. Defaults to None.
+            resized (ndarray | None, optional): the image already resized at the detection resolution (for example from an ImageStore).
+                    Defaults to None (the image is resized).
+            preset (Preset | None, optional): the preset of the detection. Defaults to None (the active preset).
+
+        Returns:
+            circles,_nb_circles (tuple[ndarray, int]): the N circles are contained in a (1,N,3) matrix 
+                    (each line contains 3 data for a circle : center X and Y coordinates, and radius)
+        """
+
+        # Resize the image to the detection resolution on the shortest side (and equivalent resizing on the other side), then gray-scale
+        gray = get_resized_gray_image(img, shortest_side_length, resized, preset)
+
+        return get_circles_from_gray(gray, img.shape[1], shortest_side_length, param2, radius_band, preset)
+
+
+def get_circles_from_gray(gray: ndarray, original_width: int, shortest_side_length: int | None = None, 
+                          param2: float | None = None, radius_band: tuple[int, int] | None = None, 
+                          preset: Preset | None = None) -> tuple[ndarray, int]:
+        """Get the circles around the coins, from the image already resized and gray-scaled (see 'get_circles')
+
+        Args:
+            gray (ndarray): the gray-scale image, resized with 'get_resized_gray_image'
+            original_width (int): the width of the original image (the circles are resized back to it)
+            shortest_side_length (int | None, optional): length of the shortest side of the gray-scale image. 
+                    Defaults to None (the resolution of the active preset).
+            param2 (float | None, optional): accumulator threshold of the Hough transform (higher = fewer circles). 
+                    Defaults to None (the threshold of the active preset).
+            radius_band (tuple[int, int] | None, optional): minimum and maximum radiuses searched (at the detection resolution), 
+                    instead of the default ones. Defaults to None.
+            preset (Preset | None, optional): the preset of the detection. Defaults to None (the active preset).
 
         Returns:
             circles,_nb_circles (tuple[ndarray, int]): the N circles are contained in a (1,N,3) matrix 
                     (each line contains 3 data for a circle : center X and Y coordinates, and radius)
         """
 
-        # Resize the image to 500px on the shortest side (and equivalent resizing on the other side)
-        resized = _resize_lowest_side_of_image(img, SHORTEST_SIDE_LENGTH)
+        if preset is None:
+            preset = get_active_preset()
+        if shortest_side_length is None:
+            shortest_side_length = preset.shortest_side_length
+        if param2 is None:
+            param2 = preset.hough_param2
 
-        # Pre-treatment : gray-scale + median blur
-        gray = cv.cvtColor(resized, cv.COLOR_BGR2GRAY)
-        grayBlurred = cv.medianBlur(gray, 7)
+        # Pre-treatment : median blur
+        grayBlurred = cv.medianBlur(gray, preset.median_blur_size)
 
         # Choose the Canny's high threshold
         canny_high_threshold = _get_canny_high_threshold(grayBlurred, 1)
         
         # Choose the circle's minimum and maximum radiuses
-        #   values based on personal observations on some images 
-        minRadius = int(50 * 0.66)
-        maxRadius = int(177 * 1.33)
-
-        circles = cv.HoughCircles(
-            grayBlurred, 
-            method = cv.HOUGH_GRADIENT, 
-            dp = 1.2, 
-            minDist = 2*minRadius,
-            param1 = canny_high_threshold+20,
-            param2 = 50,
-            minRadius = minRadius-30,  
-            maxRadius = maxRadius
-        )
+        (minRadius, searchedMinRadius, maxRadius) = _get_searched_radiuses(shortest_side_length, preset, radius_band)
+
+        circles = _get_hough_circles(grayBlurred, canny_high_threshold, param2, minRadius, searchedMinRadius, maxRadius, preset)
         
         # Circles are resized according to the image original sizes
-        circles = _resize_circles_back_to_original_size(circles, gray.shape[1], img.shape[1])
+        circles = _resize_circles_back_to_original_size(circles, gray.shape[1], original_width)
 
         nbCircles = circles.shape[1] if circles is not None else 0
         return (circles, nbCircles)
 
 
-def _get_canny_high_threshold(img: ndarray, canny_threshold_method: int = 1) -> int:
+def get_circles_in_regions(img: ndarray, resized: ndarray | None = None, preset: Preset | None = None) -> tuple[ndarray, int]:
+        """Get the circles around the coins in the image, the Hough transform only voting inside the foreground regions :
+        a cheap pre-segmentation (adaptive threshold and connected components, as in 'get_circles2') finds the components
+        big enough to be coins, and the Hough transform runs in the padded bounding box of each of them, instead of the whole image.
+        When the regions cover most of the image (dense scene, textured background), the whole image is searched as in 'get_circles'.
+
+        Args:
+            img (ndarray): the image with coins
+            resized (ndarray | None, optional): the image already resized at the detection resolution. Defaults to None (the image is resized).
+            preset (Preset | None, optional): the preset of the detection. Defaults to None (the active preset).
+
+        Returns:
+            circles,_nb_circles (tuple[ndarray, int]): the N circles are contained in a (1,N,3) matrix 
+                    (each line contains 3 data for a circle : center X and Y coordinates, and radius)
+        """
+        if preset is None:
+            preset = get_active_preset()
+        gray = get_resized_gray_image(img, None, resized, preset)
+        (minRadius, searchedMinRadius, maxRadius) = _get_searched_radiuses(preset.shortest_side_length, preset)
+
+        regions = _get_foreground_regions(gray, minRadius)
+        coverage = sum((x2 - x1) * (y2 - y1) for (x1, y1, x2, y2) in regions) / (gray.shape[0] * gray.shape[1])
+        if coverage > MAX_REGION_COVERAGE:
+            return get_circles_from_gray(gray, img.shape[1], preset = preset)
+
+        # Median blur and Canny's high threshold on the whole image, as in 'get_circles_from_gray', so that every region has the same edges
+        grayBlurred = cv.medianBlur(gray, preset.median_blur_size)
+        canny_high_threshold = _get_canny_high_threshold(grayBlurred, 1)
+
+        # Hough transform in each region, its circles being moved back to the coordinates of the image
+        circles_list = []
+        for (x1, y1, x2, y2) in regions:
+            regionCircles = _get_hough_circles(grayBlurred[y1:y2, x1:x2], canny_high_threshold, preset.hough_param2, minRadius, searchedMinRadius, 
+                                               max(searchedMinRadius, min(maxRadius, max(x2 - x1, y2 - y1) // 2)), preset)
+            if regionCircles is not None:
+                regionCircles[0, :, 0] += x1
+                regionCircles[0, :, 1] += y1
+                circles_list.append(regionCircles)
+        circles = np.concatenate(circles_list, axis=1) if circles_list else None
+
+        circles = _resize_circles_back_to_original_size(circles, gray.shape[1], img.shape[1])
+        nbCircles = circles.shape[1] if circles is not None else 0
+        return (circles, nbCircles)
+
+
+def get_resized_gray_image(img: ndarray, shortest_side_length: int | None = None, resized: ndarray | None = None, 
+                           preset: Preset | None = None) -> ndarray:
+    """Get the image resized for the detection, in gray-scale (the pre-treatment shared by the detection methods)
+
+    Args:
+        img (ndarray): the image with coins
+        shortest_side_length (int | None, optional): length of the shortest side of the resized image. 
+                Defaults to None (the resolution of the active preset).
+        resized (ndarray | None, optional): the image already resized at this resolution. Defaults to None (the image is resized).
+        preset (Preset | None, optional): the preset giving the default resolution. Defaults to None (the active preset).
+
+    Returns:
+        gray (ndarray): the resized gray-scale image
+    """
+    if resized is None:
+        resized = _resize_lowest_side_of_image(img, shortest_side_length or (preset or get_active_preset()).shortest_side_length)
+    return cv.cvtColor(resized, cv.COLOR_BGR2GRAY)
+
+
+def get_circles_adaptive(img: ndarray, preset: Preset | None = None) -> tuple[ndarray, int]:
+        """Get the circles around the coins in the image, with a detection resolution and a radius band adapted to the image :
+        a cheap pre-pass estimates the dominant coin radius, then the Hough transform runs at the smallest resolution
+        keeping the coins resolvable, and only searches the radiuses of the possible coins around the dominant one.
+        Without an estimation (no coin-like component, or a radius outside the bounds of the preset), 
+        the detection is the same as 'get_circles'.
+
+        Args:
+            img (ndarray): the image with coins
+            preset (Preset | None, optional): the preset of the detection (resolution and accumulator threshold before the adaptation,
+                    blur, Hough resolution, radius bounds without estimation). Defaults to None (the active preset).
+
+        Returns:
+            circles,_nb_circles (tuple[ndarray, int]): the N circles are contained in a (1,N,3) matrix 
+                    (each line contains 3 data for a circle : center X and Y coordinates, and radius)
+        """
+        if preset is None:
+            preset = get_active_preset()
+        dominantRadius = _estimate_dominant_coin_radius(img, preset)
+        if dominantRadius is None:
+            return get_circles(img, preset = preset)
+
+        # Radius band (at the resolution of the preset) : from the smallest coin to the biggest coin, around the dominant one
+        (lowFactor, highFactor) = ADAPTIVE_RADIUS_BAND_FACTORS
+        dominantRadius *= preset.shortest_side_length / SHORTEST_SIDE_LENGTH
+        (minRadius, maxRadius) = (dominantRadius * lowFactor, dominantRadius * highFactor)
+
+        # Smallest resolution keeping the smallest coins resolvable (never above the resolution of the preset)
+        scale = min(1.0, MIN_RESOLVABLE_RADIUS / minRadius)
+        shortest_side_length = int(preset.shortest_side_length * scale)
+
+        # The votes for a circle scale with its perimeter, so the accumulator threshold is scaled like the resolution
+        return get_circles(img, shortest_side_length, preset.hough_param2 * scale, 
+                           radius_band = (int(minRadius * scale), int(np.ceil(maxRadius * scale))), preset = preset)
+
+
+def _estimate_dominant_coin_radius(img: ndarray, preset: Preset) -> float | None:
+    """Estimate the dominant coin radius of an image (at the resolution SHORTEST_SIDE_LENGTH), with a cheap pre-pass :
+    the coins are the disc-like components of an adaptive-threshold binary image (as in 'get_circles2') whose outlines are filled,
+    and the dominant radius is the median of their radiuses weighted by their areas (the many small components of a textured
+    background or of the engravings weigh little)
+
+    Args:
+        img (ndarray): the image with coins
+        preset (Preset): the preset of the detection (its radius bounds)
+
+    Returns:
+        float | None: the estimated radius, or None if no component looks like a coin or if the estimation is outside the radius bounds
+    """
+    resized = _resize_lowest_side_of_image(img, ADAPTIVE_PREPASS_SHORTEST_SIDE_LENGTH)
+    gray = cv.cvtColor(resized, cv.COLOR_BGR2GRAY)
+    blur = cv.GaussianBlur(gray, (5,5), 0)
+    binary = cv.adaptiveThreshold(blur, 255, cv.ADAPTIVE_THRESH_GAUSSIAN_C, cv.THRESH_BINARY_INV, 25, 5)
+
+    # Fill the interior of the outlines : the background is the part reached from the border (padded, so that it's connected)
+    outside = cv.copyMakeBorder(binary, 1, 1, 1, 1, cv.BORDER_CONSTANT, value = 0)
+    cv.floodFill(outside, None, (0, 0), 255)
+    filled = binary | cv.bitwise_not(outside[1:-1, 1:-1])
+
+    # Components like a disc (without the background component) : a square bounding box, with the area of the disc of its size
+    (_, labels, stats, _) = cv.connectedComponentsWithStats(filled)
+    (widths, heights, areas) = (stats[1:, cv.CC_STAT_WIDTH], stats[1:, cv.CC_STAT_HEIGHT], stats[1:, cv.CC_STAT_AREA])
+    radiuses = (widths + heights) / 4
+    candidates = np.flatnonzero((radiuses >= 4) 
+                                & (np.abs(np.log(widths / heights)) < 0.2)
+                                & (np.abs(np.log(areas / (np.pi * radiuses**2))) < 0.25))
+
+    # ... and with the inscribed radius of this disc (not a ring or a cluster) : the largest distance of its pixels to the background
+    distances = cv.distanceTransform(filled, cv.DIST_L2, 5)
+    isDiscLike = np.zeros(len(radiuses), bool)
+    for i in candidates.tolist():
+        (x, y, w, h) = stats[i + 1, :4]
+        inscribedRadius = distances[y:y+h, x:x+w][labels[y:y+h, x:x+w] == i + 1].max()
+        isDiscLike[i] = abs(np.log(radiuses[i] / max(inscribedRadius, 1))) < 0.25
+    if not isDiscLike.any():
+        return None
+
+    # Median of the radiuses weighted by the areas
+    (radiuses, areas) = (radiuses[isDiscLike], areas[isDiscLike])
+    order = np.argsort(radiuses)
+    cumulatedAreas = np.cumsum(areas[order])
+    radius = float(radiuses[order][np.searchsorted(cumulatedAreas, cumulatedAreas[-1] / 2)])
+    radius *= SHORTEST_SIDE_LENGTH / ADAPTIVE_PREPASS_SHORTEST_SIDE_LENGTH
+
+    (minRadius, maxRadius) = preset.radius_bounds
+    return radius if minRadius <= radius <= maxRadius else None
+
+def _get_foreground_regions(gray: ndarray, minRadius: int) -> list[tuple[int, int, int, int]]:
+    """Get the regions of an image which may contain coins : the padded bounding boxes of the connected components 
+    of an adaptive-threshold binary image big enough to be the outline of a coin, the overlapping boxes being merged
+
+    Args:
+        gray (ndarray): the gray-scale image, at the detection resolution
+        minRadius (int): the smallest radius of the searched coins
+
+    Returns:
+        list[tuple[int, int, int, int]]: the regions (x1, y1, x2, y2), with exclusive ends, which don't overlap
+    """
+    # Segmentation at a fixed low resolution (bilinear : the area interpolation is slow at a non-integer factor)
+    scale = min(gray.shape) / REGION_SEGMENTATION_SHORTEST_SIDE_LENGTH
+    small = cv.resize(gray, dsize = (round(gray.shape[1] / scale), round(gray.shape[0] / scale)), interpolation = cv.INTER_LINEAR)
+    blur = cv.GaussianBlur(small, (5,5), 0)
+    binary = cv.adaptiveThreshold(blur, 255, cv.ADAPTIVE_THRESH_GAUSSIAN_C, cv.THRESH_BINARY_INV, REGION_THRESHOLD_BLOCK_SIZE, 5)
+    stats = np.rint(cv.connectedComponentsWithStats(binary)[2][1:] * scale).astype(int) # without the background component, at the resolution of the image
+
+    (height, width) = gray.shape
+    isBigEnough = (stats[:, cv.CC_STAT_WIDTH] >= minRadius) & (stats[:, cv.CC_STAT_HEIGHT] >= minRadius)
+    regions = []
+    for (x, y, w, h) in stats[isBigEnough, :4].tolist():
+        padding = int(REGION_PADDING_FACTOR * max(w, h))
+        regions.append([max(0, x - padding), max(0, y - padding), min(width, x + w + padding), min(height, y + h + padding)])
+
+    # Merge the overlapping regions, until none overlaps (a coin is then searched in a single region)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(len(regions) - 1, i, -1):
+                (a, b) = (regions[i], regions[j])
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    regions[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del regions[j]
+                    merged = True
+    return [tuple(region) for region in regions]
+
+def _get_searched_radiuses(shortest_side_length: int, preset: Preset, radius_band: tuple[int, int] | None = None) -> tuple[int, int, int]:
+    """Get the radiuses of the circles searched by the Hough transform
+
+    Args:
+        shortest_side_length (int): length of the shortest side of the image for the detection
+        preset (Preset): the preset of the detection (its radius bounds)
+        radius_band (tuple[int, int] | None, optional): minimum and maximum radiuses searched (at the detection resolution), 
+                instead of the default ones. Defaults to None.
+
+    Returns:
+        minRadius,_searchedMinRadius,_maxRadius (tuple[int, int, int]): the smallest radius of a coin (half the minimum distance
+                between two centers), the smallest and the largest searched radiuses
+    """
+    #   values based on personal observations on some images (at the resolution SHORTEST_SIDE_LENGTH)
+    if radius_band is not None:
+        return (radius_band[0], radius_band[0], radius_band[1])
+    scale = shortest_side_length / SHORTEST_SIDE_LENGTH
+    minRadius = int(preset.radius_bounds[0] * scale)
+    maxRadius = int(preset.radius_bounds[1] * scale)
+    return (minRadius, max(0, minRadius - int(30 * scale)), maxRadius)
+
+def _get_hough_circles(grayBlurred: ndarray, canny_high_threshold: int, param2: float, 
+                       minRadius: int, searchedMinRadius: int, maxRadius: int, preset: Preset) -> ndarray | None:
+    """Apply the Hough transform of the detection
+
+    Args:
+        grayBlurred (ndarray): the blurred gray-scale image
+        canny_high_threshold (int): the high threshold of the Canny filter (before its margin)
+        param2 (float): accumulator threshold of the Hough transform
+        minRadius (int): the smallest radius of a coin (half the minimum distance between two centers)
+        searchedMinRadius (int): the smallest searched radius
+        maxRadius (int): the largest searched radius
+        preset (Preset): the preset of the detection (its resolution of the accumulator)
+
+    Returns:
+        ndarray | None: the N circles in a (1,N,3) matrix (None if no circle was detected)
+    """
+    return cv.HoughCircles(
+        grayBlurred, 
+        method = cv.HOUGH_GRADIENT, 
+        dp = preset.hough_dp, 
+        minDist = 2*minRadius,
+        param1 = canny_high_threshold+20,
+        param2 = param2,
+        minRadius = searchedMinRadius,  
+        maxRadius = maxRadius
+    )
+
+def _get_canny_high_threshold(img: ndarray, canny_threshold_method: int = 1, hist: ndarray | None = None) -> int:
     """Apply a method to compute a candidate for a high threshold in a canny filter
 
     Args:
         img (ndarray): the image we want to threshold
         canny_threshold_method (int, optional): 2 options (1 = Otsu's method, 2 = median method). Defaults to 1.
+        hist (ndarray | None, optional): the histogram of the image, if already computed (median method). Defaults to None.
 
     Returns:
         high_threshold (int): the high threshold proposed
     """
     match canny_threshold_method:
         case 1: high_thresh, thresh_im = cv.threshold(img, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU) # Otsu's method
-        case 2: high_thresh = min(255, 1.33 * np.median(img)) # 1.33 * median value
+        case 2: # 1.33 * median value
+            hist = hist if hist is not None else get_histogram(img)
+            high_thresh = min(255, 1.33 * get_median(hist))
         case _: pass
     return int(high_thresh)
     
@@ -136,11 +435,23 @@ def get_circles2(img : np.ndarray):
             circles,_nb_circles (tuple[ndarray, int]): the N circles are contained in a (1,N,3) matrix 
                     (each line contains 3 data for a circle : center X and Y coordinates, and radius)
         """
-    #Resize the image to  get consistant values for min and max radiuses during detection
-    resized = _resize_lowest_side_of_image(img, SHORTEST_SIDE_LENGTH)
+    #Resize the image to  get consistant values for min and max radiuses during detection, and gray it
+    gray = get_resized_gray_image(img, SHORTEST_SIDE_LENGTH)
 
-    #Preprocessing grayed, blur and binarization 
-    gray = cv.cvtColor(resized, cv.COLOR_BGR2GRAY)
+    return get_circles2_from_gray(gray, img.shape[1])
+
+def get_circles2_from_gray(gray: np.ndarray, original_width: int):
+    """Get the circles around the coins with binarization, from the image already resized and gray-scaled (see 'get_circles2')
+
+        Args:
+            gray (ndarray): the gray-scale image, resized with 'get_resized_gray_image' (at the resolution SHORTEST_SIDE_LENGTH)
+            original_width (int): the width of the original image (the circles are resized back to it)
+
+        Returns:
+            circles,_nb_circles (tuple[ndarray, int]): the N circles are contained in a (1,N,3) matrix 
+                    (each line contains 3 data for a circle : center X and Y coordinates, and radius)
+        """
+    #Preprocessing blur and binarization 
     blur = cv.GaussianBlur(gray, (7,7), 0) 
 
     binary = cv.adaptiveThreshold(
@@ -172,7 +483,7 @@ def get_circles2(img : np.ndarray):
     minRadius=10,
     maxRadius=70
 )
-    circles = _resize_circles_back_to_original_size(circles, gray.shape[1], img.shape[1])
+    circles = _resize_circles_back_to_original_size(circles, gray.shape[1], original_width)
     nb_circles = circles.shape[1] if circles is not None else 0
     return circles, nb_circles
 
@@ -0,0 +1,89 @@
+import numpy as np
+from numpy import ndarray
+import cv2 as cv
+
+NB_BINS_GRAY = 256
+"""Number of bins of the histogram of a gray-scale (8 bits) image"""
+
+NB_BINS_HUE = 180
+"""Number of bins of the histogram of an OpenCV hue channel (values in [0;179])"""
+
+
+def get_histogram(values: ndarray, nbBins: int = NB_BINS_GRAY, mask: ndarray | None = None) -> ndarray:
+    """Get the histogram of integer values (one bin per value, from 0 to nbBins-1), in O(n) without sorting
+
+    Args:
+        values (ndarray): the integer values (for example an 8 bits image, or a channel of an image)
+        nbBins (int, optional): the number of bins (the values beyond are ignored). Defaults to NB_BINS_GRAY.
+        mask (ndarray | None, optional): boolean mask of the values to count (same shape as the values). Defaults to None.
+
+    Returns:
+        hist (ndarray): the number of values in each bin (int64)
+    """
+    if values.dtype == np.uint8 and values.ndim == 2:
+        # cv.calcHist is the fastest for the 8 bits images
+        cvMask = mask.astype(np.uint8) if mask is not None else None
+        hist = cv.calcHist([values], [0], cvMask, [nbBins], [0, nbBins])
+        return hist.ravel().astype(np.int64)
+
+    values = values[mask] if mask is not None else values
+    return np.bincount(values.ravel(), minlength=nbBins)[:nbBins]
+
+
+def get_quantile(hist: ndarray, quantile: float) -> int:
+    """Get a quantile of values from their histogram (the first bin where the cumulative count exceeds the quantile)
+
+    Args:
+        hist (ndarray): the histogram of the values (one bin per value)
+        quantile (float): the quantile, in [0;1]
+
+    Returns:
+        int: the value of the quantile
+    """
+    cumulativeHist = np.cumsum(hist)
+    index = np.searchsorted(cumulativeHist, quantile * cumulativeHist[-1], side="right")
+    return int(min(index, len(hist) - 1))
+
+
+def get_median(hist: ndarray) -> float:
+    """Get the median of values from their histogram (same result as np.median on the values, without sorting them)
+
+    Args:
+        hist (ndarray): the histogram of the values (one bin per value)
+
+    Returns:
+        float: the median of the values (mean of the two middle values for an even number of values)
+    """
+    cumulativeHist = np.cumsum(hist)
+    nbValues = cumulativeHist[-1]
+    lowMiddle = np.searchsorted(cumulativeHist, (nbValues - 1) // 2, side="right")
+    highMiddle = np.searchsorted(cumulativeHist, nbValues // 2, side="right")
+    return (lowMiddle + highMiddle) / 2
+
+
+def get_otsu_threshold(hist: ndarray) -> float:
+    """Get the Otsu threshold of values from their histogram
+    (same result as skimage.filters.threshold_otsu(hist=hist) : the empty bins at both ends are ignored)
+
+    Args:
+        hist (ndarray): the histogram of the values (one bin per value)
+
+    Returns:
+        float: the threshold (the values above it are the foreground)
+    """
+    nonEmptyBins = np.flatnonzero(hist)
+    (start, end) = (nonEmptyBins[0], nonEmptyBins[-1] + 1)
+    counts = hist[start:end].astype(np.float32)
+    binCenters = np.arange(start, end)
+    if len(counts) == 1:
+        return float(start) # only one value : no separation possible
+
+    # Class weights and means, for each possible threshold
+    weight1 = np.cumsum(counts)
+    weight2 = np.cumsum(counts[::-1])[::-1]
+    mean1 = np.cumsum(counts * binCenters) / weight1
+    mean2 = (np.cumsum((counts * binCenters)[::-1]) / weight2[::-1])[::-1]
+
+    # The threshold maximizes the variance between the two classes
+    variance12 = weight1[:-1] * weight2[1:] * (mean1[:-1] - mean2[1:]) ** 2
+    return float(binCenters[np.argmax(variance12)])
@@ -0,0 +1,93 @@
+import types
+import time
+import numpy as np
+from numpy import ndarray
+
+from .DetectCoinsForm import get_resized_gray_image, get_circles_from_gray, get_circles2_from_gray, SHORTEST_SIDE_LENGTH
+from .PredictMonetaryValue import get_coins_data, get_saturation_image
+from ..classes.CoinData import CoinData
+
+# The list of possible engines (circle detection, then the same valuation of the coins)
+engines = types.SimpleNamespace()
+engines.HOUGH = "hough"     # 'get_circles' : Hough transform on the blurred gray-scale image
+engines.BINARY = "binary"   # 'get_circles2' : Hough transform on the adaptive-threshold binary image
+engines.FUSED = "fused"     # the circles of both engines, merged
+
+FUSION_OVERLAP = 0.5
+"""Two circles of different engines are the same coin if the distance between their centers
+is below this factor of the smallest of their radiuses"""
+
+
+def get_coins_data_of_engines(img: ndarray, engines_list: list[str]) -> tuple[dict[str, tuple[list[CoinData], float]], float]:
+    """Get the data of each coin of an image with several engines, the image being resized and gray-scaled only once for all of them
+
+    Args:
+        img (ndarray): the image containing coins
+        engines_list (list[str]): the engines to apply (see 'engines')
+
+    Returns:
+        coinData_byEngine,_sharedTime (tuple[dict[str, tuple[list[CoinData], float]], float]):
+                for each engine, the data of each coin and the time spent by the engine (its detections and valuation),
+                and the time spent on the pre-treatment shared by the engines
+    """
+    startingTime = time.time()
+    gray = get_resized_gray_image(img)
+    # The binary engine is tuned at the reference resolution, whatever the preset
+    grayBinary = gray
+    if (engines.BINARY in engines_list or engines.FUSED in engines_list) and min(gray.shape) != SHORTEST_SIDE_LENGTH:
+        grayBinary = get_resized_gray_image(img, SHORTEST_SIDE_LENGTH)
+    img_saturation = get_saturation_image(img)
+    sharedTime = time.time() - startingTime
+
+    # Detections (the fused engine needs the circles of both other engines)
+    circles_byEngine = {}
+    detectionTimes = {}
+    for engine in [engines.HOUGH, engines.BINARY]:
+        if engine in engines_list or engines.FUSED in engines_list:
+            startingTime = time.time()
+            match engine:
+                case engines.HOUGH: (circles, _) = get_circles_from_gray(gray, img.shape[1])
+                case engines.BINARY: (circles, _) = get_circles2_from_gray(grayBinary, img.shape[1])
+            circles_byEngine[engine] = circles
+            detectionTimes[engine] = time.time() - startingTime
+
+    if engines.FUSED in engines_list:
+        startingTime = time.time()
+        (circles_byEngine[engines.FUSED], _) = fuse_circles([circles_byEngine[engines.HOUGH], circles_byEngine[engines.BINARY]])
+        detectionTimes[engines.FUSED] = time.time() - startingTime + detectionTimes[engines.HOUGH] + detectionTimes[engines.BINARY]
+
+    # Valuation of the coins found by each engine
+    coinData_byEngine = {}
+    for engine in engines_list:
+        startingTime = time.time()
+        coinData_list = get_coins_data(img, circles_byEngine[engine], img_saturation)
+        coinData_byEngine[engine] = (coinData_list, detectionTimes[engine] + time.time() - startingTime)
+
+    return (coinData_byEngine, sharedTime)
+
+
+def fuse_circles(circles_list: list[ndarray | None]) -> tuple[ndarray | None, int]:
+    """Merge the circles of several engines by non-maximum suppression : the circles are taken in order
+    (the circles of the first engine first, each engine giving its circles by decreasing accumulator votes),
+    and a circle is dropped when it overlaps a circle already kept (see FUSION_OVERLAP)
+
+    Args:
+        circles_list (list[ndarray | None]): the circles of each engine, in (1,N,3) matrices (None if no circle)
+
+    Returns:
+        circles,_nb_circles (tuple[ndarray | None, int]): the merged circles in a (1,N,3) matrix (None if no circle), and their number
+    """
+    candidates = [circles[0] for circles in circles_list if circles is not None]
+    if not candidates:
+        return (None, 0)
+    candidates = np.concatenate(candidates)
+
+    keptIndexes = []
+    for (i, (xCenter, yCenter, radius)) in enumerate(candidates):
+        kept = candidates[keptIndexes]
+        distances = np.hypot(kept[:, 0] - xCenter, kept[:, 1] - yCenter)
+        if not np.any(distances < FUSION_OVERLAP * np.minimum(kept[:, 2], radius)):
+            keptIndexes.append(i)
+
+    circles = candidates[keptIndexes][np.newaxis]
+    return (circles, circles.shape[1])
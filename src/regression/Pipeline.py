@@ -0,0 +1,262 @@
+import copy
+import hashlib
+import json
+import os
+import pickle
+from typing import Any, Callable
+from ..tools.ImageReader import ImageReader
+
+IMAGE_SOURCE = "image_path"
+"""Name of the pipeline input : the path to the image (the first stage decodes it)"""
+
+
+class PipelineStage():
+    """Named stage of a pipeline : a function of the results of other stages (its inputs), with declared parameters.
+    The key of its result is derived from the keys of its inputs, its parameters, its settings and its version,
+    so that a stage is only recomputed when one of them changed."""
+
+    name: str
+    """Name of the stage (the other stages refer to its result with this name)"""
+
+    function: Callable
+    """Function computing the result of the stage : function(*inputs, **params)"""
+
+    inputs: list[str]
+    """Names of the stages whose results are the inputs of the function (or IMAGE_SOURCE)"""
+
+    params: dict[str, Any]
+    """Parameters of the function (JSON-serializable, as they are part of the key of the result)"""
+
+    settings: dict[str, Any]
+    """Settings read by the function outside its parameters, such as the fields of the active preset it uses
+    (JSON-serializable : they are only part of the key of the result, not given to the function)"""
+
+    version: int
+    """Version of the stage, to increase when its code changes (the previous results are then recomputed)"""
+
+    memoized: bool
+    """Keep the results of the stage in the memoization store (False for the results cheaper to recompute than to store)"""
+
+    def __init__(self, name: str, function: Callable, inputs: list[str], params: dict[str, Any] | None = None,
+                 version: int = 1, memoized: bool = True, settings: dict[str, Any] | None = None):
+        self.name = name
+        self.function = function
+        self.inputs = inputs
+        self.params = params if params is not None else {}
+        self.settings = settings if settings is not None else {}
+        self.version = version
+        self.memoized = memoized
+
+
+class MemoStore():
+    """Memoization store of the results of pipeline stages, by key : in memory, or on disk (one pickle file per result)"""
+
+    directoryPath: str | None
+    """Directory of the results on disk (None = results kept in memory)"""
+
+    def __init__(self, directoryPath: str | None = None):
+        self.directoryPath = directoryPath
+        self._results = {}
+        if directoryPath is not None:
+            os.makedirs(directoryPath, exist_ok=True)
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """Get a result from the store
+
+        Args:
+            key (str): the key of the result
+
+        Returns:
+            found,_result (tuple[bool, Any]): True if the result is in the store, and the result (None otherwise)
+        """
+        if self.directoryPath is None:
+            return (key in self._results, self._results.get(key))
+
+        try:
+            with open(self._get_file_path(key), "rb") as file:
+                return (True, pickle.load(file))
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return (False, None)
+
+    def contains(self, key: str) -> bool:
+        """Check if a result is in the store, without reading it
+
+        Args:
+            key (str): the key of the result
+
+        Returns:
+            bool: True if the result is in the store
+        """
+        if self.directoryPath is None:
+            return key in self._results
+        return os.path.isfile(self._get_file_path(key))
+
+    def put(self, key: str, result: Any):
+        """Add a result to the store
+
+        Args:
+            key (str): the key of the result
+            result (Any): the result (picklable, for a store on disk)
+        """
+        if self.directoryPath is None:
+            self._results[key] = result
+            return
+
+        filePath = self._get_file_path(key)
+        os.makedirs(os.path.dirname(filePath), exist_ok=True)
+        temporaryPath = filePath + ".tmp"
+        with open(temporaryPath, "wb") as file:
+            pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaryPath, filePath)
+
+    def _get_file_path(self, key: str) -> str:
+        """Get the path to the file of a result (in a sub-directory named after the first characters of the key)"""
+        return os.path.join(self.directoryPath, key[:2], key + ".pkl")
+
+
+class Pipeline():
+    """Pipeline of named stages, whose results are memoized : when a parameter of a stage changes,
+    only this stage and the stages depending on it are recomputed, the others being reused from the store.
+
+    The results given to a stage are deep copies, so a stage can modify its inputs (for example the CoinData)
+    without altering the stored results."""
+
+    stages: dict[str, PipelineStage]
+    """The stages, by name"""
+
+    memoStore: MemoStore
+    """The store of the results of the memoized stages"""
+
+    nbComputed: dict[str, int]
+    """Number of results computed, for each stage"""
+
+    nbReused: dict[str, int]
+    """Number of results reused from the store, for each stage"""
+
+    def __init__(self, stages: list[PipelineStage], memoStore: MemoStore | None = None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.memoStore = memoStore if memoStore is not None else MemoStore()
+        self.nbComputed = {stage.name: 0 for stage in stages}
+        self.nbReused = {stage.name: 0 for stage in stages}
+
+        for stage in stages:
+            for input in stage.inputs:
+                if input != IMAGE_SOURCE and input not in self.stages:
+                    raise ValueError(f"The input '{input}' of the stage '{stage.name}' isn't a stage of the pipeline.")
+
+    def run(self, target: str, img_path: str, knownResults: dict[str, Any] | None = None) -> Any:
+        """Get the result of a stage for an image, computing only the stages whose results aren't in the store
+
+        Args:
+            target (str): the name of the stage
+            img_path (str): the path to the image
+            knownResults (dict[str, Any] | None, optional): results already known (not memoized),
+                    for example the image already decoded : key = stage name, value = its result. Defaults to None.
+
+        Returns:
+            Any: the result of the stage (a copy that can be modified)
+        """
+        keys = {}
+        results = dict(knownResults) if knownResults is not None else {}
+        results[IMAGE_SOURCE] = img_path
+        return copy.deepcopy(self._get_result(target, img_path, keys, results))
+
+    def needs_result(self, target: str, stageName: str, img_path: str) -> bool:
+        """Check if the result of a stage is needed to get the result of another stage for an image
+        (it isn't when the results of the stages between them are in the store), without computing any result
+
+        Args:
+            target (str): the name of the stage whose result is wanted
+            stageName (str): the name of the stage (for example the stage decoding the image)
+            img_path (str): the path to the image
+
+        Returns:
+            bool: True if the result of the stage would be computed or read when running the pipeline
+        """
+        return self._is_result_needed(target, stageName, img_path, {})
+
+    def _is_result_needed(self, currentStageName: str, stageName: str, img_path: str, keys: dict[str, str]) -> bool:
+        """Check if the result of a stage is needed to get the result of the current stage (see 'needs_result')
+
+        Args:
+            currentStageName (str): the name of the current stage
+            stageName (str): the name of the stage
+            img_path (str): the path to the image
+            keys (dict[str, str]): the keys of the stages already computed for the image
+
+        Returns:
+            bool: True if the result of the stage is needed
+        """
+        if currentStageName == stageName:
+            return True
+        if currentStageName == IMAGE_SOURCE:
+            return False
+
+        stage = self.stages[currentStageName]
+        if stage.memoized and self.memoStore.contains(self._get_key(currentStageName, img_path, keys)):
+            return False
+        return any(self._is_result_needed(inputName, stageName, img_path, keys) for inputName in stage.inputs)
+
+    def _get_result(self, stageName: str, img_path: str, keys: dict[str, str], results: dict[str, Any]) -> Any:
+        """Get the result of a stage, from the results already computed for the image, from the store, or by computing it
+
+        Args:
+            stageName (str): the name of the stage
+            img_path (str): the path to the image
+            keys (dict[str, str]): the keys of the stages already computed for the image
+            results (dict[str, Any]): the results of the stages already obtained for the image
+
+        Returns:
+            Any: the result of the stage (not copied)
+        """
+        if stageName in results:
+            return results[stageName]
+
+        stage = self.stages[stageName]
+        key = self._get_key(stageName, img_path, keys)
+        if stage.memoized:
+            (found, result) = self.memoStore.get(key)
+            if found:
+                self.nbReused[stageName] += 1
+                results[stageName] = result
+                return result
+
+        inputs = []
+        for inputName in stage.inputs:
+            input = self._get_result(inputName, img_path, keys, results)
+            if inputName != IMAGE_SOURCE and self.stages[inputName].memoized:
+                input = copy.deepcopy(input) # the stage can modify it without altering the stored result
+            inputs.append(input)
+        result = stage.function(*inputs, **stage.params)
+        self.nbComputed[stageName] += 1
+
+        if stage.memoized:
+            self.memoStore.put(key, result)
+        results[stageName] = result
+        return result
+
+    def _get_key(self, stageName: str, img_path: str, keys: dict[str, str]) -> str:
+        """Get the key of the result of a stage for an image : a hash of the stage (name, version, parameters, settings)
+        and of the keys of its inputs (the image source being identified by its path, size and modification time)
+
+        Args:
+            stageName (str): the name of the stage
+            img_path (str): the path to the image
+            keys (dict[str, str]): the keys already computed for the image (updated)
+
+        Returns:
+            str: the key of the result
+        """
+        if stageName in keys:
+            return keys[stageName]
+
+        if stageName == IMAGE_SOURCE:
+            (size, mtime_ns) = ImageReader.get_image_file_info(img_path)
+            description = [IMAGE_SOURCE, os.path.abspath(img_path), size, mtime_ns]
+        else:
+            stage = self.stages[stageName]
+            description = [stage.name, stage.version, stage.params, stage.settings,
+                           [self._get_key(input, img_path, keys) for input in stage.inputs]]
+
+        keys[stageName] = hashlib.sha1(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+        return keys[stageName]
@@ -1,10 +1,20 @@
+from collections import OrderedDict
 import numpy as np
 from numpy import ndarray
 import cv2 as cv
-import skimage
 
+from .HistogramStatistics import get_histogram, get_quantile, get_otsu_threshold, NB_BINS_HUE
+from ..classes.CoinsFeatures import CoinsFeatures
+from .Presets import Preset, get_active_preset
 from ..classes.CoinData import CoinData, CoinType, CoinValue, real_coins_diameters, possible_values_by_type
 
+DIAMETER_RATIOS = {(value1, value2): real_coins_diameters[value1] / real_coins_diameters[value2]
+                   for value1 in real_coins_diameters for value2 in real_coins_diameters}
+"""key = tuple[value of a coin, value of another coin], value = ratio between their real diameters"""
+
+MAX_CACHED_MASKS = 64
+"""Maximum number of coin masks kept in a mask cache (see 'get_internal_and_external_ring_masks'), the least recently used being dropped"""
+
 def get_total_monetary_value(img: ndarray, circles: ndarray) -> float:
     """Get the total monetary value of the coins in an image, knowing where the coins are.
 
@@ -16,12 +26,61 @@ def get_total_monetary_value(img: ndarray, circles: ndarray) -> float:
         total_monetary_value (float): the total monetaru value of the coins in the image
     """
 
-    coinData_list = init_CoinData_struct(circles)
-    update_radiuses(img, coinData_list)
+    coinData_list = get_coins_data(img, circles)
+
+    return get_total_monetary_value_of_coins(coinData_list)
+
+
+def get_coins_data(img: ndarray, circles: ndarray, img_saturation: ndarray | None = None) -> list[CoinData]:
+    """Get the data of each coin in an image (refined radius, type and value), knowing where the coins are.
+
+    Args:
+        img (ndarray): the original image containing coins
+        circles (ndarray): the N circles are contained in an (1,N,3) matrix, with values for each circle = (xCenter, yCenter, radius)
+        img_saturation (ndarray | None, optional): the saturation of the image, if already computed. Defaults to None.
+
+    Returns:
+        coinData_list (list[CoinData]): the data of each coin
+    """
+
+    coinData_list = get_located_coins_data(img, circles, img_saturation)
 
     update_coins_types(img, coinData_list, showImageAndDetails=False)
     update_coins_values(coinData_list, img, showImageAndDetails=False)
 
+    return coinData_list
+
+
+def get_located_coins_data(img: ndarray, circles: ndarray, img_saturation: ndarray | None = None, 
+                           rayTables: dict | None = None) -> list[CoinData]:
+    """Get the data of each coin in an image with only their location (circle and refined radius), 
+    their types and values being decided later.
+
+    Args:
+        img (ndarray): the original image containing coins
+        circles (ndarray): the N circles are contained in an (1,N,3) matrix, with values for each circle = (xCenter, yCenter, radius)
+        img_saturation (ndarray | None, optional): the saturation of the image, if already computed. Defaults to None.
+        rayTables (dict | None, optional): the ray tables kept between the calls (see '_refine_radius_with_s_profile'). Defaults to None.
+
+    Returns:
+        coinData_list (list[CoinData]): the data of each coin (without type and value)
+    """
+
+    coinData_list = init_CoinData_struct(circles)
+    update_radiuses(img, coinData_list, img_saturation, rayTables)
+
+    return coinData_list
+
+
+def get_total_monetary_value_of_coins(coinData_list: list[CoinData]) -> float:
+    """Get the total monetary value of coins whose values are already decided
+
+    Args:
+        coinData_list (list[CoinData]): the data of each coin
+
+    Returns:
+        total_monetary_value (float): the total monetary value of the coins
+    """
     total_monetary_value = 0
     for coinData in coinData_list:
         total_monetary_value += coinData.value.value
@@ -117,7 +176,8 @@ def circular_mask(img: ndarray, centerX: int, centerY: int, radius: float) -> nd
     mask = ((Y - centerY)**2 + (X - centerX)**2) <= radius**2
     return mask
 
-def get_internal_and_external_ring_masks(img: ndarray, centerX: int, centerY: int, radius: float) -> tuple[ndarray, ndarray]:
+def get_internal_and_external_ring_masks(img: ndarray, centerX: int, centerY: int, radius: float, 
+                                         maskCache: OrderedDict | None = None) -> tuple[ndarray, ndarray]:
     """Return masks for the internal region, and the external ring of a coin.
 
     Args:
@@ -125,14 +185,26 @@ def get_internal_and_external_ring_masks(img: ndarray, centerX: int, centerY: in
         centerX (int): x center of the coin
         centerY (int): y center of the coin
         radius (float): radius of the coin, from its center
+        maskCache (OrderedDict | None, optional): the masks already computed, kept between the calls (the coins with the same crop size, 
+                center and radius share their masks, which must not be modified). Defaults to None (the masks are computed).
 
     Returns:
         internalMask,_externalRingMask (tuple[ndarray, ndarray]): the internal mask, and the external ring mask
     """
+    key = (img.shape[0], img.shape[1], centerX, centerY, radius)
+    if maskCache is not None and key in maskCache:
+        maskCache.move_to_end(key)
+        return maskCache[key]
+
     internal_mask = circular_mask(img, centerX, centerY, radius * 0.6)
     partial_internal_mask = circular_mask(img, centerX, centerY, radius * 0.7)
     total_mask = circular_mask(img, centerX, centerY, radius * 0.85)
     external_ring_mask = total_mask ^ partial_internal_mask
+
+    if maskCache is not None:
+        maskCache[key] = (internal_mask, external_ring_mask)
+        if len(maskCache) > MAX_CACHED_MASKS:
+            maskCache.popitem(last=False)
     return (internal_mask, external_ring_mask)
 
 
@@ -206,7 +278,8 @@ def normalize_hsv_rescaled(hsv_img: ndarray) -> ndarray:
     return normalized_hsv
 
 
-def update_coins_types(img: ndarray, list_coinData: list[CoinData], showImageAndDetails: bool = False):
+def update_coins_types(img: ndarray, list_coinData: list[CoinData], showImageAndDetails: bool = False, 
+                       maskCache: OrderedDict | None = None, preset: Preset | None = None) -> CoinsFeatures:
     """Choose a type for each coin : euro type (1€ or 2€), 
     gold type (50c, 20c or 10c) or copper type (5c, 2c or 1c).
 
@@ -214,90 +287,127 @@ def update_coins_types(img: ndarray, list_coinData: list[CoinData], showImageAnd
         img (ndarray): the original image
         list_coinData (list[CoinData]): list containing data for each coin. Will update the 'coinType' and 'value' attributes.
         showImageAndDetails (bool, optional): show images and details about each coin's choice of its type. Defaults to False.
+        maskCache (OrderedDict | None, optional): the masks of the coins kept between the calls 
+                (see 'get_internal_and_external_ring_masks'). Defaults to None.
+        preset (Preset | None, optional): the preset giving the crop of the coins. Defaults to None (the active preset).
+
+    Returns:
+        CoinsFeatures: the hue features of the coins, from which their types were decided
     """
-    hue_values = []
+    features = get_coins_features(img, list_coinData, maskCache, preset)
+    threshold_hue = update_coins_types_from_features(list_coinData, features)
 
-    # 1) Detect 1e and 2e coins, and gets the hue and saturation means sums
-    for coinData in list_coinData:
-        # 1.1) Get only the zoomed coin
-        zoomed_coin = get_zoomed_coin(img, coinData.xCenter, coinData.yCenter, coinData.radius, k=1)
+    if showImageAndDetails:
+        for (i, coinData) in enumerate(list_coinData):
+            zoomed_coin = get_zoomed_coin(img, coinData.xCenter, coinData.yCenter, coinData.radius, k=1)
+            if coinData.coinType == CoinType.EURO:
+                print("• Euro : ({:.1f}, {:.1f}) => {}€".format(features.hInternal_means[i], features.hExternal_means[i], coinData.value.value))
+            else:
+                print("• Cent : {:.1f} => {}".format(features.weighted_hues[i], str.split(str(coinData.coinType), ".")[1]))
+            cv.imshow("t", zoomed_coin); cv.waitKey(0)
+        print("\t== threshold : {:.1f} ==".format(threshold_hue))
+
+    return features
+
+
+def get_coins_features(img: ndarray, list_coinData: list[CoinData], maskCache: OrderedDict | None = None, 
+                       preset: Preset | None = None) -> CoinsFeatures:
+    """Compute the hue features of each coin, from which its type is decided 
+    (each coin is only processed once, whatever its type)
+
+    Args:
+        img (ndarray): the original image
+        list_coinData (list[CoinData]): list containing data for each coin
+        maskCache (OrderedDict | None, optional): the masks of the coins kept between the calls 
+                (see 'get_internal_and_external_ring_masks'). Defaults to None.
+        preset (Preset | None, optional): the preset giving the crop of the coins. Defaults to None (the active preset).
+
+    Returns:
+        CoinsFeatures: the hue features of each coin
+    """
+    coinCropFactor = (preset or get_active_preset()).coin_crop_factor
+    hInternal_means = np.zeros(len(list_coinData))
+    hExternal_means = np.zeros(len(list_coinData))
+    weighted_hues = np.zeros(len(list_coinData))
+    hue_hists = np.zeros((len(list_coinData), NB_BINS_HUE), dtype=np.int64)
+
+    for (i, coinData) in enumerate(list_coinData):
+        # 1) Get only the zoomed coin
+        zoomed_coin = get_zoomed_coin(img, coinData.xCenter, coinData.yCenter, coinData.radius, k=coinCropFactor)
         new_xCenter, new_yCenter = (zoomed_coin.shape[0]//2, zoomed_coin.shape[0]//2)
 
-        # 1.2) Get the masks (global, internal region and external ring)
-        globalMask = circular_mask(zoomed_coin, new_xCenter, new_yCenter, coinData.radius)
-        (internal_mask, external_ring_mask) = get_internal_and_external_ring_masks(zoomed_coin, new_xCenter, new_yCenter, coinData.radius)
+        # 2) Get the masks (internal region and external ring)
+        (internal_mask, external_ring_mask) = get_internal_and_external_ring_masks(zoomed_coin, new_xCenter, new_yCenter, coinData.radius,
+                                                                                   maskCache)
 
-        # 1.3) Compute the coin image in hsv color scale
+        # 3) Compute the coin image in hsv color scale
         gw_coin = gray_world(zoomed_coin) 
         hsv_coin = cv.cvtColor(gw_coin, cv.COLOR_BGR2HSV)
         hsv_coin = normalize_hsv_rescaled(hsv_coin)
 
-        # 1.4) Compute mean hue for coin's central region and external ring
+        # 4) Compute mean hue for coin's central region and external ring, 
+        #   the mean hue of the central region weighted by saturation, and its hue histogram
         hInternal_data = hsv_coin[internal_mask][:,0]
-        hInternal_mean = np.mean(hInternal_data)
-        
-        hExternal_data = hsv_coin[external_ring_mask][:,0]
-        hExternal_mean = np.mean(hExternal_data)
-
-        # 1.5) Decide if the coin is of euro type (1e or 2e) or of cents type
-        if abs(hInternal_mean - hExternal_mean) > 10:
-            # if euro, we can decide its value immediately, 
-            #   based on the difference between the interior region and the external ring
-            coinData.coinType = CoinType.EURO
-            coinData.value = CoinValue.EURO_1 if hInternal_mean > hExternal_mean else CoinValue.EURO_2
-
-            if showImageAndDetails:
-                print("• Euro : ({:.1f}, {:.1f}) => {}€".format(hInternal_mean, hExternal_mean, coinData.value.value))
-                cv.imshow("t", zoomed_coin); cv.waitKey(0)
-        else:
-            # cents are to be decided after getting the global hue and saturation from all the coins of type 'cents'
-            hue_values.extend(hInternal_data) 
+        hInternal_means[i] = np.mean(hInternal_data)
+        hExternal_means[i] = np.mean(hsv_coin[external_ring_mask][:,0])
+        weighted_hues[i] = get_weighted_mean_of_hue_by_saturation(hsv_coin, internal_mask)
+        hue_hists[i] = get_histogram(hInternal_data, NB_BINS_HUE)
 
-    # 2) Decide for the coins of type 'cents'
+    return CoinsFeatures(hInternal_means, hExternal_means, weighted_hues, hue_hists)
 
-    # 2.1) Automatically choose a threshold value to separate cents coin of type 'copper' and 'golden'
-    hist1, bin1 = np.histogram(hue_values, bins=180, range=(0,179))
-    hist1 = strip_histogram_beyond_quartiles(hist1, 0.25, 0.75)
-    if np.any(hist1):
-        threshold_hue = skimage.filters.threshold_otsu(hist=hist1)
-    else:
-        threshold_hue = 15 # default, but it's here just to prevent histogram of only zeros
 
-    if showImageAndDetails:
-        print("\t== threshold : {:.1f} ==".format(threshold_hue))
-    
-    # 2.2) Decide the type of cents
-    list_coins_with_undecided_coinTypes = [coinD for coinD in list_coinData if coinD.coinType is None]
-    for coinData in list_coins_with_undecided_coinTypes:
-        # 2.2.1) Get only the zoomed coin
-        zoomed_coin = get_zoomed_coin(img, coinData.xCenter, coinData.yCenter, coinData.radius, k=1)
-        new_xCenter, new_yCenter = (zoomed_coin.shape[0]//2, zoomed_coin.shape[0]//2)
+def update_coins_types_from_features(list_coinData: list[CoinData], features: CoinsFeatures) -> float:
+    """Choose a type for each coin of an image from its hue features (see 'decide_coins_types_from_features')
 
-        # 2.2.2) Get the masks (global, internal region and external ring)
-        globalMask = circular_mask(zoomed_coin, new_xCenter, new_yCenter, coinData.radius)
-        (internal_mask, external_ring_mask) = get_internal_and_external_ring_masks(zoomed_coin, new_xCenter, new_yCenter, coinData.radius)
+    Args:
+        list_coinData (list[CoinData]): list containing data for each coin. Will update the 'coinType' and 'value' attributes.
+        features (CoinsFeatures): the hue features of each coin
 
-        # 2.2.3) Compute the coin image in hsv color scale
-        gw_coin = gray_world(zoomed_coin) 
-        hsv_coin = cv.cvtColor(gw_coin, cv.COLOR_BGR2HSV)
-        hsv_coin = normalize_hsv_rescaled(hsv_coin)
+    Returns:
+        threshold_hue (float): the hue threshold between copper and gold cents
+    """
+    (coinTypes, euroValues, thresholds_hue) = decide_coins_types_from_features(features, np.zeros(len(features), dtype=np.int64), 1)
+    for (coinData, coinType, euroValue) in zip(list_coinData, coinTypes, euroValues):
+        coinData.coinType = CoinType(coinType)
+        if coinData.coinType == CoinType.EURO:
+            coinData.value = CoinValue(euroValue)
+    return thresholds_hue[0]
 
-        # 2.2.4) Compute mean hue for coin's central region and external ring
-        hInternal_data = hsv_coin[internal_mask][:,0]
-        hInternal_mean = np.mean(hInternal_data)
 
-        hInternal_mean = get_weighted_mean_of_hue_by_saturation(hsv_coin, internal_mask)
+def decide_coins_types_from_features(features: CoinsFeatures, imageIndexes: ndarray, nbImages: int) -> tuple[ndarray, ndarray, ndarray]:
+    """Choose a type for the coins of several images at once, from their hue features :
+    1) the coins whose central region and external ring have different hues are euros (1€ or 2€, decided immediately)
+    2) the other coins are cents : the Otsu threshold on the hues of the cents of each image separates copper and gold cents
 
-        # 2.2.5) Decice if the cent coin is of 'copper' or 'gold' type
-        if hInternal_mean < threshold_hue:
-            coinData.coinType = CoinType.COPPER
-        else:
-            coinData.coinType = CoinType.GOLD
+    Args:
+        features (CoinsFeatures): the hue features of each coin
+        imageIndexes (ndarray): the index of the image of each coin (in [0;nbImages[)
+        nbImages (int): the number of images
 
-        if showImageAndDetails:
-            print("• Cent : {:.1f} => {}".format(hInternal_mean, str.split(str(coinData.coinType), ".")[1]))
-            cv.imshow("t", zoomed_coin); cv.waitKey(0)
+    Returns:
+        coinTypes,_euroValues,_thresholds_hue (tuple[ndarray, ndarray, ndarray]): the type of each coin (CoinType value), 
+                its value if it's a euro (CoinValue value, NaN otherwise), and the hue threshold of each image
+    """
+    # 1) Detect 1e and 2e coins : their value is decided immediately,
+    #   based on the difference between the interior region and the external ring
+    isEuro = np.abs(features.hInternal_means - features.hExternal_means) > 10
+    euroValues = np.where(features.hInternal_means > features.hExternal_means, CoinValue.EURO_1.value, CoinValue.EURO_2.value)
+    euroValues = np.where(isEuro, euroValues, np.nan)
+
+    # 2) Automatically choose a threshold value for each image to separate cents coin of type 'copper' and 'golden'
+    cents_hists = np.zeros((nbImages, features.hue_hists.shape[1]), dtype=np.int64)
+    np.add.at(cents_hists, imageIndexes[~isEuro], features.hue_hists[~isEuro])
+    thresholds_hue = np.full(nbImages, 15.0) # default, but it's here just to prevent histogram of only zeros
+    for imageIndex in np.flatnonzero(cents_hists.any(axis=1)):
+        hist = strip_histogram_beyond_quartiles(cents_hists[imageIndex], 0.25, 0.75)
+        if np.any(hist):
+            thresholds_hue[imageIndex] = get_otsu_threshold(hist)
 
+    # 3) Decide the type of cents
+    isCopper = features.weighted_hues < thresholds_hue[imageIndexes]
+    coinTypes = np.where(isEuro, CoinType.EURO.value, np.where(isCopper, CoinType.COPPER.value, CoinType.GOLD.value))
+
+    return (coinTypes, euroValues, thresholds_hue)
 
 
 def update_coins_values_voting_method(list_coinData: list[CoinData], img: ndarray = None, showImageAndDetails: bool = False):
@@ -332,7 +442,7 @@ def update_coins_values_voting_method(list_coinData: list[CoinData], img: ndarra
 
             for value1 in firstCoin_values:
                 for value2 in secondCoin_values:
-                    ratio_theoretical = real_coins_diameters[value1] / real_coins_diameters[value2]
+                    ratio_theoretical = DIAMETER_RATIOS[(value1, value2)]
                     score = abs(ratio_theoretical - ratio_basic)
                     
                     if score < bestScore:
@@ -383,7 +493,7 @@ def update_coins_values(list_coinData: list[CoinData], img: ndarray = None, show
                 
                 # compare to every possible 'cents' options
                 for coinValue in possible_cents_names:
-                    ratio_theoritical = real_coins_diameters[coinValue] / real_coins_diameters[euroCoin.value]
+                    ratio_theoritical = DIAMETER_RATIOS[(coinValue, euroCoin.value)]
                     score = abs(ratio_theoritical - ratio_basic)
 
                     if score < bestScore:
@@ -409,15 +519,15 @@ def get_weighted_mean_of_hue_by_saturation(hsv_img: ndarray, mask: ndarray) -> f
         mask (ndarray): the mask
 
     Returns:
-        weighted_mean (float): the weighted mean of hue by saturation
+        weighted_mean (float): the weighted mean of hue by saturation (NaN if the saturation is null everywhere)
     """
-    weighted_mean = 0
-    sumSaturation = 0
-    for h,s,v in hsv_img[mask]:
-        weighted_mean += float(h)*float(s)
-        sumSaturation += float(s)
-    weighted_hue = weighted_mean / sumSaturation
-    return weighted_hue
+    masked = hsv_img[mask]
+    hue = masked[:,0].astype(np.float64)
+    saturation = masked[:,1].astype(np.float64)
+    sumSaturation = saturation.sum()
+    if sumSaturation == 0:
+        return np.nan
+    return float(np.dot(hue, saturation) / sumSaturation)
  
 
 def strip_histogram_beyond_quartiles(hist: ndarray, Q1: float = 0.1, Q2: float = 0.9) -> ndarray:
@@ -431,16 +541,13 @@ def strip_histogram_beyond_quartiles(hist: ndarray, Q1: float = 0.1, Q2: float =
     Returns:
         stripped_hist (ndarray): the stripped histogram
     """
-    valueQ1 = np.sum(hist) * Q1
-    valueQ2 = np.sum(hist) * Q2
-    tempSum = 0
-    argQ1, argQ2 = None, None
-    for i in range(len(hist)):
-        tempSum += hist[i]
-        if not argQ1 and tempSum > valueQ1:
-            argQ1 = max(i-1, 0)
-        if not argQ2 and tempSum > valueQ2:
-            argQ2 = i
+    if hist.sum() == 0:
+        return hist # nothing to strip
+
+    # First indexes where the cumulative sum exceeds the quartiles
+    #   (the bin 0 is always stripped on the left, and the right strip starts at the bin 1 at least)
+    argQ1 = max(get_quantile(hist, Q1) - 1, 1)
+    argQ2 = max(get_quantile(hist, Q2), 1)
 
     hist[:argQ1] = 0
     hist[argQ2:] = 0
@@ -452,11 +559,14 @@ def init_CoinData_struct(circles: ndarray) -> list[CoinData]:
 
     Args:
         circles (ndarray): the N circles's data in a (1,N,3) matrix, with values for each coin = (xCenter, yCenter, radius)
+                (None if no circle was detected)
 
     Returns:
         list[CoinData]: the structure containing CoinData for each coin
     """
     coinData_list = []
+    if circles is None:
+        return coinData_list
     for data in circles[0,:]:
         xCenter, yCenter, radius = data
         coinData = CoinData(xCenter, yCenter, radius)
@@ -464,45 +574,95 @@ def init_CoinData_struct(circles: ndarray) -> list[CoinData]:
     return coinData_list
 
 
-def _refine_radius_with_s_profile(list_coinData: list[CoinData], img_saturation: ndarray, n_angles=36, drop_ratio=0.5):
+def _refine_radius_with_s_profile(list_coinData: list[CoinData], img_saturation: ndarray, n_angles=None, drop_ratio=0.5, 
+                                  rayTables: dict | None = None):
     """
     Raffine le rayon de chaque cercle via un profil radial sur le canal S.
     Pour chaque cercle :
-      - On tire n_angles rayons depuis le centre vers l'extérieur
+      - On tire n_angles rayons depuis le centre vers l'extérieur (par défaut, le nombre du preset actif)
       - On cherche sur chaque rayon où S chute sous drop_ratio * S_centre
       - Le vrai rayon = médiane de ces points de chute
+    Les points de tous les rayons d'un cercle sont lus en une fois, depuis une table de décalages par rayon initial
+    (gardée entre les appels dans 'rayTables', voir '_get_ray_table').
     """
+    if n_angles is None:
+        n_angles = get_active_preset().radius_refinement_angles
+    if rayTables is None:
+        rayTables = {}
     h, w    = img_saturation.shape
-    angles  = np.linspace(0, 2 * np.pi, n_angles, endpoint=False)
 
     for coinData in list_coinData:
         cx, cy, r = int(coinData.xCenter), int(coinData.yCenter), int(coinData.radius)
         s_centre  = img_saturation[min(cy, h-1), min(cx, w-1)]
         threshold = max(10.0, drop_ratio * s_centre)
 
-        edge_radii = []
-        for angle in angles:
-            for ri in range(r, int(r * 0.5), -1):
-                px = int(cx + ri * np.cos(angle))
-                py = int(cy + ri * np.sin(angle))
-                if 0 <= px < w and 0 <= py < h:
-                    if img_saturation[py, px] > threshold:
-                        edge_radii.append(ri)
-                        break
+        # Points of every ray (one line per angle, from the radius r inwards), and the first one above the threshold on each ray
+        (radii, xOffsets, yOffsets) = _get_ray_table(rayTables, n_angles, r)
+        px = (cx + xOffsets).astype(np.int64)
+        py = (cy + yOffsets).astype(np.int64)
+        inside = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+        aboveThreshold = inside & (img_saturation[np.clip(py, 0, h-1), np.clip(px, 0, w-1)] > threshold)
+        hasEdge = aboveThreshold.any(axis=1)
+        edge_radii = radii[aboveThreshold.argmax(axis=1)[hasEdge]]
 
         if len(edge_radii) > n_angles // 2:
             coinData.radius = int(np.median(edge_radii))
 
 
+def _get_ray_table(rayTables: dict, n_angles: int, r: int) -> tuple[ndarray, ndarray, ndarray]:
+    """Get the points of the rays drawn from the center of a circle to refine its radius (see '_refine_radius_with_s_profile'),
+    computed once for each number of angles and initial radius
+
+    Args:
+        rayTables (dict): the tables already computed (completed with the new one)
+        n_angles (int): the number of rays
+        r (int): the initial radius (the rays go from r to r/2, excluded)
 
-def update_radiuses(img: ndarray, list_coinData: list[CoinData]):
+    Returns:
+        radii,_xOffsets,_yOffsets (tuple[ndarray, ndarray, ndarray]): the radius of the points of each ray, 
+                and the offsets of the points from the center (one line per angle, one column per radius)
+    """
+    key = (n_angles, r)
+    if key not in rayTables:
+        angles = np.linspace(0, 2 * np.pi, n_angles, endpoint=False)
+        radii = np.arange(r, int(r * 0.5), -1)
+        cosines = np.array([np.cos(angle) for angle in angles])
+        sines = np.array([np.sin(angle) for angle in angles])
+        rayTables[key] = (radii, radii[None, :] * cosines[:, None], radii[None, :] * sines[:, None])
+    return rayTables[key]
+
+
+
+def update_radiuses(img: ndarray, list_coinData: list[CoinData], img_saturation: ndarray | None = None, rayTables: dict | None = None):
     """Change the radiuses of every coin data, based on the refine method
 
     Args:
         img (ndarray): the image containing coins
         list_coinData (list[CoinData]): the list of coin data. Will update the 'radius' attribute of each coin data.
+        img_saturation (ndarray | None, optional): the saturation of the image, if already computed (see 'get_saturation_image'). 
+                Defaults to None.
+        rayTables (dict | None, optional): the ray tables kept between the calls (see '_refine_radius_with_s_profile'). Defaults to None.
+    """
+    if img_saturation is None:
+        img_saturation = get_saturation_image(img)
+    _refine_radius_with_s_profile(list_coinData, img_saturation, rayTables=rayTables)
+
+
+def get_saturation_image(img: ndarray, hsvBuffer: ndarray | None = None, saturationBuffer: ndarray | None = None) -> ndarray:
+    """Get the saturation of an image, used to refine the radiuses of the coins
+
+    Args:
+        img (ndarray): the image containing coins
+        hsvBuffer (ndarray | None, optional): a buffer receiving the HSV image (uint8, same shape as the image). Defaults to None.
+        saturationBuffer (ndarray | None, optional): a buffer receiving the saturation (float, same height and width as the image).
+                Defaults to None.
+
+    Returns:
+        img_saturation (ndarray): the saturation channel of the image (float ; the saturation buffer, if given)
     """
-    img_hsv = cv.cvtColor(img, cv.COLOR_BGR2HSV)
-    img_saturation = img_hsv[:,:,1].astype(float) # saturation is 2nd channel
-    _refine_radius_with_s_profile(list_coinData, img_saturation)
+    img_hsv = cv.cvtColor(img, cv.COLOR_BGR2HSV, dst=hsvBuffer)
+    if saturationBuffer is None:
+        return img_hsv[:,:,1].astype(float) # saturation is 2nd channel
+    np.copyto(saturationBuffer, img_hsv[:,:,1])
+    return saturationBuffer
     
@@ -0,0 +1,86 @@
+class Preset():
+    """Consistent set of the tuning knobs of the whole pipeline (detection, radius refinement and classification),
+    at one point of the latency/accuracy curve"""
+
+    name: str
+    """Name of the preset"""
+
+    shortest_side_length: int
+    """Length of the shortest side of the image for the detection (the detection resolution)"""
+
+    hough_dp: float
+    """Inverse ratio of the resolution of the Hough accumulator (higher = coarser and faster accumulator)"""
+
+    hough_param2: float
+    """Accumulator threshold of the Hough transform, at the detection resolution (higher = fewer circles)"""
+
+    radius_bounds: tuple[float, float]
+    """Minimum and maximum radiuses of the coins, at the resolution SHORTEST_SIDE_LENGTH (scaled to the detection resolution)"""
+
+    median_blur_size: int
+    """Size of the median blur applied before the detection (odd, in pixels at the detection resolution)"""
+
+    radius_refinement_angles: int
+    """Number of rays drawn from the center of each coin to refine its radius (see '_refine_radius_with_s_profile')"""
+
+    coin_crop_factor: float
+    """Size of the crop around each coin for its classification, as a factor of its radius
+    (at least 0.85, the external ring used for the classification)"""
+
+    def __init__(self, name: str, shortest_side_length: int, hough_dp: float, hough_param2: float, radius_bounds: tuple[float, float],
+                 median_blur_size: int, radius_refinement_angles: int, coin_crop_factor: float):
+        self.name = name
+        self.shortest_side_length = shortest_side_length
+        self.hough_dp = hough_dp
+        self.hough_param2 = hough_param2
+        self.radius_bounds = radius_bounds
+        self.median_blur_size = median_blur_size
+        self.radius_refinement_angles = radius_refinement_angles
+        self.coin_crop_factor = coin_crop_factor
+
+
+# The votes for a circle scale with its perimeter, so the accumulator threshold (and the blur) follow the detection resolution.
+#   The calibrated presets are opt-in : a coarser accumulator and a lighter blur, which found more coins on the synthetic datasets
+#   (see the Presets section of the README), not yet measured on the real photos
+PRESETS = {
+    "fast": Preset("fast", shortest_side_length = 350, hough_dp = 1.5, hough_param2 = 35, radius_bounds = (50 * 0.66, 177 * 1.33),
+                   median_blur_size = 5, radius_refinement_angles = 18, coin_crop_factor = 0.9),
+    "balanced": Preset("balanced", shortest_side_length = 500, hough_dp = 1.2, hough_param2 = 50, radius_bounds = (50 * 0.66, 177 * 1.33),
+                       median_blur_size = 7, radius_refinement_angles = 36, coin_crop_factor = 1.0),
+    "accurate": Preset("accurate", shortest_side_length = 700, hough_dp = 1.0, hough_param2 = 70, radius_bounds = (50 * 0.66, 177 * 1.33),
+                       median_blur_size = 9, radius_refinement_angles = 72, coin_crop_factor = 1.0),
+    "calibrated": Preset("calibrated", shortest_side_length = 500, hough_dp = 1.5, hough_param2 = 40, radius_bounds = (50 * 0.66, 177 * 1.33),
+                         median_blur_size = 5, radius_refinement_angles = 36, coin_crop_factor = 1.0),
+    "calibrated-accurate": Preset("calibrated-accurate", shortest_side_length = 700, hough_dp = 1.5, hough_param2 = 50, 
+                                  radius_bounds = (50 * 0.66, 177 * 1.33), median_blur_size = 5, radius_refinement_angles = 72, 
+                                  coin_crop_factor = 1.0)
+}
+"""The available presets, by name"""
+
+DEFAULT_PRESET = "balanced"
+"""Name of the preset used when none is chosen"""
+
+_activePreset = PRESETS[DEFAULT_PRESET]
+
+
+def get_active_preset() -> Preset:
+    """Get the preset currently applied by the pipeline
+
+    Returns:
+        Preset: the active preset
+    """
+    return _activePreset
+
+def set_active_preset(name: str):
+    """Choose the preset applied by the pipeline (in this process : the worker processes are given its name)
+
+    Args:
+        name (str): the name of the preset (see PRESETS)
+
+    Raises:
+        ValueError: unknown preset
+    """
+    global _activePreset
+    if name not in PRESETS:
+        raise ValueError(f"Unknown preset '{name}' (choose between {', '.join(PRESETS)}).")
+    _activePreset = PRESETS[name]
@@ -1,9 +1,80 @@
 import cv2 as cv
-from .DetectCoinsForm import get_circles
-from .PredictMonetaryValue import get_total_monetary_value
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from typing import Any
+from numpy import ndarray
+from .DetectCoinsForm import get_circles, get_circles_adaptive, get_circles_from_gray, _resize_lowest_side_of_image
+import numpy as np
+from .PredictMonetaryValue import get_coins_data, get_located_coins_data, get_total_monetary_value_of_coins, update_coins_types, update_coins_values
+from .PredictMonetaryValue import decide_coins_types_from_features
+from .Pipeline import Pipeline, PipelineStage, MemoStore, IMAGE_SOURCE
+from .TimeBudgetedDetector import TimeBudgetedDetector
+from .Presets import get_active_preset
+from .CoinCounter import CoinCounter
+from ..classes.CoinData import CoinData, CoinType, CoinValue
+from ..classes.CoinsFeatures import CoinsFeatures
+from ..tools.FeatureStore import FeatureStore
+from ..tools.ImageReader import ImageReader
 
 SHORTEST_SIDE_LENGTH = 500
 
+STAGE_NAMES = ["get_circles", "update_radiuses", "update_coins_types", "update_coins_values"]
+"""Names of the stages of the algorithm, in their order (see 'CoinCounter.process_in_stages' and 'get_pipeline')"""
+
+DETECTION_PRESET_FIELDS = ["shortest_side_length", "hough_dp", "hough_param2", "radius_bounds", "median_blur_size"]
+"""Fields of the preset read by the detection of the circles (the settings of the stage 'get_circles' of the pipeline)"""
+
+_coinCounters = {}
+"""Sessions used by the functions of RegressionAlgorithm1 : key = tuple[name of the preset, adaptive detection], value = CoinCounter"""
+
+
+def _get_coin_counter(adaptive_detection: bool = False) -> CoinCounter:
+    """Get the session of the active preset, kept between the calls of the functions of RegressionAlgorithm1
+
+    Args:
+        adaptive_detection (bool, optional): adapt the detection resolution and the searched radiuses to the image. Defaults to False.
+
+    Returns:
+        CoinCounter: the session
+    """
+    key = (get_active_preset().name, adaptive_detection)
+    if key not in _coinCounters:
+        _coinCounters[key] = CoinCounter(key[0], adaptive_detection)
+    return _coinCounters[key]
+
+
+def _get_preset_settings(fields: list[str]) -> dict[str, Any]:
+    """Get fields of the active preset, as the settings of a pipeline stage (part of the key of its results)
+
+    Args:
+        fields (list[str]): the names of the fields read by the stage
+
+    Returns:
+        dict[str, Any]: the values of the fields, by name
+    """
+    presetSettings = vars(get_active_preset())
+    return {field: presetSettings[field] for field in fields}
+
+
+def _detect_circles(img: ndarray, adaptive_detection: bool) -> ndarray:
+    """Stage 'get_circles' of the pipeline : the circles around the coins (with the active preset)"""
+    (circles, nbCircles) = get_circles_adaptive(img) if adaptive_detection else get_circles(img)
+    return circles
+
+def _locate_coins(img: ndarray, circles: ndarray) -> list[CoinData]:
+    """Stage 'update_radiuses' of the pipeline : the coins with their refined radiuses (with the active preset)"""
+    return get_located_coins_data(img, circles)
+
+def _decide_coins_types(img: ndarray, coinData_list: list[CoinData]) -> list[CoinData]:
+    """Stage 'update_coins_types' of the pipeline : the coins with their types (with the active preset)"""
+    update_coins_types(img, coinData_list)
+    return coinData_list
+
+def _decide_coins_values(coinData_list: list[CoinData]) -> list[CoinData]:
+    """Stage 'update_coins_values' of the pipeline : the coins with their values"""
+    update_coins_values(coinData_list)
+    return coinData_list
+
 
 class RegressionAlgorithm1():
 
@@ -20,15 +91,205 @@ class RegressionAlgorithm1():
             nbCoins,_totalMonetaryValue (tuple[int, float]): the number of coins, and the total monetary value
         """
 
-        img = cv.imread(img_path) 
-        if img is None:
-            raise Exception(f"The file '{img_path}' couldn't be read as an image.")
+        img = ImageReader.read_image_from_path(img_path)
         
-        (circles, nbCircles) = get_circles(img)
+        return RegressionAlgorithm1.get_nbCoins_and_totalMonetaryValue_from_image(img)
 
-        monetaryValue = get_total_monetary_value(img, circles)
-        
-        return (nbCircles, monetaryValue)
+    def get_nbCoins_and_totalMonetaryValue_from_image(img: ndarray) -> tuple[int, float]:
+        """Gets the number of coins, and the monetary value of an already decoded image containing coins
+
+        Args:
+            img (ndarray): the image containing coins
+
+        Returns:
+            nbCoins,_totalMonetaryValue (tuple[int, float]): the number of coins, and the total monetary value
+        """
+        return _get_coin_counter().get_nbCoins_and_totalMonetaryValue(img)
+
+    def get_nbCoins(img_path: str) -> int:
+        """Gets only the number of coins of an image (count-only mode) : the image is decoded in gray-scale at a reduced resolution
+        (never at its full resolution), and only the circles are detected (no radius refinement, classification or valuation)
+
+        Args:
+            img_path (str): the path to the image containg coins
+
+        Raises:
+            Exception: couldn't read the image
+
+        Returns:
+            nbCoins (int): the number of coins
+        """
+        img = ImageReader.read_reduced_gray_image_from_path(img_path, get_active_preset().shortest_side_length)
+
+        return RegressionAlgorithm1.get_nbCoins_from_image(img)
+
+    def get_nbCoins_from_image(img: ndarray) -> int:
+        """Gets only the number of coins of an already decoded image (count-only mode, see 'get_nbCoins')
+
+        Args:
+            img (ndarray): the image containing coins, gray-scale or BGR, at any resolution whose shortest side is at least the detection
+                    resolution of the active preset (for example decoded at a reduced resolution, or the detection level of an ImageStore)
+
+        Returns:
+            nbCoins (int): the number of coins
+        """
+        shortestSideLength = get_active_preset().shortest_side_length
+        if min(img.shape[:2]) != shortestSideLength:
+            img = _resize_lowest_side_of_image(img, shortestSideLength)
+        gray = img if img.ndim == 2 else cv.cvtColor(img, cv.COLOR_BGR2GRAY)
+
+        (circles, nbCircles) = get_circles_from_gray(gray, gray.shape[1])
+        return nbCircles
+
+    def get_coins_data_from_image(img: ndarray, adaptive_detection: bool = False, classify_coins: bool = True,
+                                  resized: ndarray | None = None) -> list[CoinData]:
+        """Gets the data of each coin (circle, refined radius, type and value) of an already decoded image containing coins
+        (with the session of the active preset, see CoinCounter)
+
+        Args:
+            img (ndarray): the image containing coins
+            adaptive_detection (bool, optional): adapt the detection resolution and the searched radiuses to the image. Defaults to False.
+            classify_coins (bool, optional): decide the type and value of each coin 
+                    (False when they are decided later, for several images at once with a CoinAtlas). Defaults to True.
+            resized (ndarray | None, optional): the image already resized at the detection resolution, for example from an ImageStore 
+                    (not used by the adaptive detection). Defaults to None.
+
+        Returns:
+            coinData_list (list[CoinData]): the data of each coin detected in the image
+        """
+        return _get_coin_counter(adaptive_detection).process(img, classify_coins, resized)
+
+    def get_coins_data_from_image_in_stages(img: ndarray, stage: Callable[[str], AbstractContextManager], adaptive_detection: bool = False,
+                                            resized: ndarray | None = None) -> list[CoinData]:
+        """Gets the data of each coin of an already decoded image (as 'get_coins_data_from_image'), each named stage of the algorithm
+        running inside a context given by the caller, for example to profile it or to measure its memory
+
+        Args:
+            img (ndarray): the image containing coins
+            stage (Callable[[str], AbstractContextManager]): gives the context of a stage from its name (see STAGE_NAMES)
+            adaptive_detection (bool, optional): adapt the detection resolution and the searched radiuses to the image. Defaults to False.
+            resized (ndarray | None, optional): the image already resized at the detection resolution, for example from an ImageStore 
+                    (not used by the adaptive detection). Defaults to None.
+
+        Returns:
+            coinData_list (list[CoinData]): the data of each coin detected in the image
+        """
+        return _get_coin_counter(adaptive_detection).process_in_stages(img, stage, resized)
+
+    def get_coins_data_from_image_with_time_budget(img: ndarray, detector: TimeBudgetedDetector, 
+                                                   classify_coins: bool = True, resized: ndarray | None = None) -> tuple[list[CoinData], bool]:
+        """Gets the data of each coin of an already decoded image, the circle detection being limited by a time budget
+
+        Args:
+            img (ndarray): the image containing coins
+            detector (TimeBudgetedDetector): the circle detector with a time budget
+            classify_coins (bool, optional): decide the type and value of each coin 
+                    (False when they are decided later, for several images at once with a CoinAtlas). Defaults to True.
+            resized (ndarray | None, optional): the image already resized at the detection resolution, for example from an ImageStore. 
+                    Defaults to None.
+
+        Returns:
+            coinData_list,_usedFallback (tuple[list[CoinData], bool]): the data of each coin detected in the image, 
+                    and True if the detection exceeded its budget (and the fallback detection was used)
+        """
+        (circles, nbCircles, usedFallback) = detector.get_circles(img, resized)
+
+        coinCounter = _get_coin_counter()
+        coinData_list = coinCounter.locate_coins(img, circles)
+        if classify_coins:
+            coinCounter.classify_coins(img, coinData_list)
+        return (coinData_list, usedFallback)
+
+    def get_pipeline(memoStore: MemoStore | None = None, adaptive_detection: bool = False) -> Pipeline:
+        """Gets the algorithm as a pipeline of memoized stages : decode -> get_circles -> update_radiuses -> update_coins_types
+        -> update_coins_values. When a parameter (or the version) of a stage changes, the results of the previous stages are reused.
+        The stages tuned by the presets are given the fields of the active preset they read as settings,
+        so a change of these fields (another preset, or a preset whose values changed) recomputes them.
+
+        Args:
+            memoStore (MemoStore | None, optional): the store of the results of the stages. Defaults to None (in memory).
+            adaptive_detection (bool, optional): adapt the detection resolution and the searched radiuses to the image. Defaults to False.
+
+        Returns:
+            Pipeline: the pipeline of the algorithm
+        """
+        return Pipeline([
+            PipelineStage("decode", ImageReader.read_image_from_path, [IMAGE_SOURCE], memoized = False),
+            PipelineStage("get_circles", _detect_circles, ["decode"], {"adaptive_detection": adaptive_detection},
+                          settings = _get_preset_settings(DETECTION_PRESET_FIELDS)),
+            PipelineStage("update_radiuses", _locate_coins, ["decode", "get_circles"],
+                          settings = _get_preset_settings(["radius_refinement_angles"])),
+            PipelineStage("update_coins_types", _decide_coins_types, ["decode", "update_radiuses"],
+                          settings = _get_preset_settings(["coin_crop_factor"])),
+            PipelineStage("update_coins_values", _decide_coins_values, ["update_coins_types"])
+        ], memoStore)
+
+    def get_coins_data_with_pipeline(pipeline: Pipeline, img_path: str, img: ndarray | None = None) -> list[CoinData]:
+        """Gets the data of each coin of an image with the pipeline of the algorithm (see 'get_pipeline')
+
+        Args:
+            pipeline (Pipeline): the pipeline of the algorithm
+            img_path (str): the path to the image containing coins
+            img (ndarray | None, optional): the image, if already decoded (it's only decoded by the pipeline if needed). Defaults to None.
+
+        Returns:
+            coinData_list (list[CoinData]): the data of each coin detected in the image
+        """
+        knownResults = {"decode": img} if img is not None else None
+        return pipeline.run("update_coins_values", img_path, knownResults)
+
+    def is_decoding_needed_with_pipeline(pipeline: Pipeline, img_path: str) -> bool:
+        """Checks if an image must be decoded to get the data of its coins with the pipeline of the algorithm (see 'get_pipeline') :
+        it isn't when the results of the stages are in the store
+
+        Args:
+            pipeline (Pipeline): the pipeline of the algorithm
+            img_path (str): the path to the image containing coins
+
+        Returns:
+            bool: True if the image must be decoded
+        """
+        return pipeline.needs_result("update_coins_values", "decode", img_path)
+
+    def classify_located_coins(img: ndarray, coinData_list: list[CoinData]) -> CoinsFeatures:
+        """Decide the type and the value of coins already located (circle and refined radius) in an image
+
+        Args:
+            img (ndarray): the image containing the coins
+            coinData_list (list[CoinData]): the data of each coin. Will update the 'coinType' and 'value' attributes.
+
+        Returns:
+            CoinsFeatures: the hue features of the coins, from which their types were decided (to be saved in a FeatureStore)
+        """
+        return _get_coin_counter().classify_coins(img, coinData_list)
+
+    def get_coins_data_from_feature_store(filePath_features: str) -> dict[str, list[CoinData]]:
+        """Gets the data of each coin of every image of a feature store, without detecting the coins again :
+        the types of all the coins are decided at once from their stored features, then their values image by image
+
+        Args:
+            filePath_features (str): path to the feature store file
+
+        Returns:
+            dict[str, list[CoinData]]: key = image name, value = the data of each coin of the image
+        """
+        (images, columns) = FeatureStore.read(filePath_features)
+        imageIndexes = {image_name: i for (i, image_name) in enumerate(images)}
+        coinImageIndexes = np.array([imageIndexes[image_name] for image_name in columns["image_name"]], dtype=np.int64)
+
+        features = CoinsFeatures(columns["hInternal_mean"], columns["hExternal_mean"], columns["weighted_hue"], columns["hue_hist"])
+        (coinTypes, euroValues, _) = decide_coins_types_from_features(features, coinImageIndexes, len(images))
+
+        coinData_lists = {image_name: [] for image_name in images}
+        for i in range(len(coinImageIndexes)):
+            coinData = CoinData(float(columns["xCenter"][i]), float(columns["yCenter"][i]), float(columns["detectedRadius"][i]))
+            coinData.radius = float(columns["radius"][i])
+            coinData.coinType = CoinType(int(coinTypes[i]))
+            if coinData.coinType == CoinType.EURO:
+                coinData.value = CoinValue(float(euroValues[i]))
+            coinData_lists[images[coinImageIndexes[i]]].append(coinData)
 
+        for coinData_list in coinData_lists.values():
+            update_coins_values(coinData_list)
 
-    
\ No newline at end of file
+        return coinData_lists
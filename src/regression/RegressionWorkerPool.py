@@ -0,0 +1,213 @@
+import queue
+import time
+from collections.abc import Iterable, Iterator
+from multiprocessing.queues import Queue
+from numpy import ndarray
+
+from .CoinCounter import CoinCounter
+from .Presets import get_active_preset, set_active_preset
+from .TimeBudgetedDetector import get_worker_context
+from ..classes.CoinData import CoinData
+from ..tools.MemoryTracker import MemoryTracker
+from ..tools.SharedMemoryTransport import (SlabRing, AttachedSlabs, RECORDS_CAPACITY, get_image_view, get_records_view,
+                                           get_coin_records, get_coins_data_from_records)
+
+SLABS_BY_WORKER = 2
+"""Number of slabs in flight for each worker (one image processed, one image waiting)"""
+
+WORKER_CHECK_INTERVAL = 1.0
+"""Interval (in seconds) at which the workers are checked to be alive, while waiting for a result"""
+
+
+def _regression_worker(tasks: Queue, results: Queue, adaptive_detection: bool, presetName: str, track_memory: bool, 
+                       region_detection: bool, verify_threshold: float | None):
+    """Loop of a worker process : receives the slabs holding the decoded images, applies the regression algorithm on them
+    (on a view of the slab, without copy), and writes the coins found in the result area of the slab
+
+    Args:
+        tasks (Queue): the tasks (task index, slab index, slab name, image shape and type), None to stop
+        results (Queue): the results (task index, slab index, number of coins, records not fitting in the slab, time spent, 
+                memory of the stages, error)
+        adaptive_detection (bool): adapt the detection resolution and the searched radiuses to each image
+        presetName (str): the name of the preset applied (the active preset of the main process)
+        track_memory (bool): track the memory of the stages of each image (see MemoryTracker)
+        region_detection (bool): only detect the circles inside the foreground regions of each image
+        verify_threshold (float | None): smallest verification score of a detected circle (None = no verification)
+    """
+    set_active_preset(presetName)
+    coinCounter = CoinCounter(presetName, adaptive_detection, region_detection, verify_threshold)
+    memoryTracker = MemoryTracker() if track_memory else None
+    attachedSlabs = AttachedSlabs()
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            (taskIndex, slabIndex, slabName, shape, dtype) = task
+
+            startingTime = time.time()
+            slab = attachedSlabs.get(slabIndex, slabName)
+            img = get_image_view(slab, shape, dtype)
+            records = get_records_view(slab)
+            try:
+                memory = None
+                if memoryTracker is None:
+                    coinData_list = coinCounter.process(img)
+                else:
+                    memoryTracker.start_image()
+                    coinData_list = coinCounter.process_in_stages(img, memoryTracker.stage)
+                    memory = memoryTracker.image_memory
+                overflowRecords = None
+                if len(coinData_list) <= RECORDS_CAPACITY:
+                    records[:len(coinData_list)] = get_coin_records(coinData_list)
+                else:
+                    overflowRecords = get_coin_records(coinData_list)
+                results.put((taskIndex, slabIndex, len(coinData_list), overflowRecords, time.time() - startingTime, memory, None))
+            except Exception as e:
+                results.put((taskIndex, slabIndex, 0, None, 0.0, None, f"{type(e).__name__}: {e}"))
+            finally:
+                del img, records # the slab can only be detached without any view on it
+    finally:
+        attachedSlabs.close()
+        if memoryTracker is not None: memoryTracker.close()
+
+
+class RegressionWorkerPool():
+    """Pool of worker processes applying the regression algorithm on the decoded images.
+
+    The images go through the shared-memory slabs of a SlabRing : each decoded image is copied once into a slab,
+    the workers process a view of the slab, and write the records of the coins found back into it.
+    Only the slab indexes go through the queues, so the images and the coins are never serialized."""
+
+    nb_workers: int
+    """Number of worker processes"""
+
+    adaptive_detection: bool
+    """Adapt the detection resolution and the searched radiuses to each image (see 'get_circles_adaptive')"""
+
+    track_memory: bool
+    """Track the memory of the stages of each image, in the workers (see MemoryTracker)"""
+
+    region_detection: bool
+    """Only detect the circles inside the foreground regions of each image (see 'get_circles_in_regions')"""
+
+    verify_threshold: float | None
+    """Smallest verification score of a detected circle (see 'get_circles_scores' ; None = no verification)"""
+
+    def __init__(self, nb_workers: int, adaptive_detection: bool = False, track_memory: bool = False, region_detection: bool = False,
+                 verify_threshold: float | None = None):
+        if nb_workers <= 0:
+            raise ValueError(f"The number of workers must be strictly positive (got {nb_workers}).")
+
+        self.nb_workers = nb_workers
+        self.adaptive_detection = adaptive_detection
+        self.track_memory = track_memory
+        self.region_detection = region_detection
+        self.verify_threshold = verify_threshold
+        # Same start method as the TimeBudgetedDetector : the workers are started from a fork server
+        #   (they are started while the prefetch thread runs, so they aren't forked from the main process)
+        self._context = get_worker_context()
+        self._slabRing = SlabRing(nb_workers * SLABS_BY_WORKER)
+        self._tasks = self._context.Queue()
+        self._results = self._context.Queue()
+        self._processes = []
+
+    def __enter__(self) -> "RegressionWorkerPool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def map(self, images: Iterable[tuple[str, ndarray]]) -> Iterator[tuple[list[CoinData], float, dict[str, tuple[int, int]] | None]]:
+        """Apply the regression algorithm on decoded images, in the worker processes
+
+        Args:
+            images (Iterable[tuple[str, ndarray]]): the path and the decoded image of each image (for example an ImagePrefetcher)
+
+        Raises:
+            Exception: the regression algorithm failed on an image, or a worker process died
+
+        Yields:
+            coinData_list,_timeDuration,_memory (tuple[list[CoinData], float, dict[str, tuple[int, int]] | None]): the data of each coin
+                    of the image, the time spent by the worker on it, and the memory of its stages if tracked (see MemoryTracker.image_memory),
+                    in the order of the images
+        """
+        if not self._processes:
+            self._start_workers()
+
+        readyResults = {}
+        nbSubmitted = 0
+        nbYielded = 0
+        for (img_path, img) in images:
+            # Wait for a slab to come back to the ring (the results received meanwhile are given back in order)
+            while (slabIndex := self._slabRing.acquire(img.nbytes)) is None:
+                self._receive_result(readyResults)
+                while nbYielded in readyResults:
+                    yield readyResults.pop(nbYielded)
+                    nbYielded += 1
+
+            # The only copy of the image : into the slab (OpenCV can't decode into a given buffer)
+            slabImage = self._slabRing.get_image_view(slabIndex, img.shape, img.dtype)
+            slabImage[...] = img
+            del slabImage
+
+            self._slabRing.retain(slabIndex) # reference of the task, until its result is read
+            self._tasks.put((nbSubmitted, slabIndex, self._slabRing.get_name(slabIndex), img.shape, img.dtype.str))
+            self._slabRing.release(slabIndex) # reference of the loader
+            nbSubmitted += 1
+
+        while nbYielded < nbSubmitted:
+            if nbYielded not in readyResults:
+                self._receive_result(readyResults)
+                continue
+            yield readyResults.pop(nbYielded)
+            nbYielded += 1
+
+    def _receive_result(self, readyResults: dict[int, tuple[list[CoinData], float, dict[str, tuple[int, int]] | None]]):
+        """Wait for the result of a task, read the coins from its slab, and release the slab
+
+        Args:
+            readyResults (dict[int, tuple[list[CoinData], float, dict[str, tuple[int, int]] | None]]): the results received and not yet given back,
+                    by task index (updated)
+
+        Raises:
+            Exception: the regression algorithm failed on the image, or a worker process died
+        """
+        while True:
+            try:
+                (taskIndex, slabIndex, nbCoins, overflowRecords, timeDuration, memory, error) = self._results.get(timeout=WORKER_CHECK_INTERVAL)
+                break
+            except queue.Empty:
+                if not all(process.is_alive() for process in self._processes):
+                    raise Exception("A worker process died unexpectedly.")
+
+        try:
+            if error is not None:
+                raise Exception(f"The regression failed in a worker process ({error})")
+            records = overflowRecords if overflowRecords is not None else self._slabRing.get_records_view(slabIndex)[:nbCoins]
+            readyResults[taskIndex] = (get_coins_data_from_records(records), timeDuration, memory)
+            del records
+        finally:
+            self._slabRing.release(slabIndex)
+
+    def _start_workers(self):
+        """Start the worker processes"""
+        for _ in range(self.nb_workers):
+            process = self._context.Process(target=_regression_worker, 
+                                            args=(self._tasks, self._results, self.adaptive_detection, get_active_preset().name, 
+                                                  self.track_memory, self.region_detection, self.verify_threshold),
+                                            daemon=True)
+            process.start()
+            self._processes.append(process)
+
+    def close(self):
+        """Stop the worker processes, and free the slabs"""
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self._processes = []
+        self._slabRing.close()
@@ -0,0 +1,259 @@
+import multiprocessing
+import multiprocessing.forkserver
+import os
+import sys
+import threading
+from pathlib import Path
+from multiprocessing.connection import Connection
+from numpy import ndarray
+from .DetectCoinsForm import get_circles, get_circles_adaptive, _resize_lowest_side_of_image, _resize_circles_back_to_original_size
+from .Presets import get_active_preset, set_active_preset
+
+FALLBACK_RESOLUTION_FACTOR = 0.5
+"""Detection resolution of the fallback configuration, as a factor of the resolution of the preset 
+(4 times fewer pixels than the normal detection)"""
+
+FALLBACK_PARAM2_FACTOR = 0.7
+"""Accumulator threshold of the fallback configuration, as a factor of the threshold of the preset
+(the votes for a circle scale with its perimeter, so FALLBACK_RESOLUTION_FACTOR would be equivalent to the normal threshold ;
+it's higher to keep fewer circles on the noisy images that exceed the time budget)"""
+
+NB_STANDBY_WORKERS = 2
+"""Number of worker processes started ahead of their use by a TimeBudgetedDetector 
+(the normal and the fallback detections of an image can both exceed the budget, killing two workers)"""
+
+
+def _detection_worker(connection: Connection):
+    """Loop of the worker process : receives images already resized at the detection resolution 
+    (with the choice of the adaptive detection, the name of the preset, and the choice of the fallback configuration), 
+    and sends back their circles
+
+    Args:
+        connection (Connection): the connection with the main process
+    """
+    try:
+        connection.send(True) # ready (the start-up of the process isn't counted in the time budget)
+    except (BrokenPipeError, ConnectionResetError):
+        return # the detector was closed before the worker was used
+    while True:
+        try:
+            (resized, adaptive_detection, presetName, fallback) = connection.recv()
+        except (EOFError, ConnectionResetError):
+            return # the connection was closed (a standby worker whose ready message wasn't read gets a reset)
+        set_active_preset(presetName)
+        if fallback:
+            (shortest_side_length, param2) = get_fallback_settings()
+            (circles, _) = get_circles(resized, shortest_side_length, param2, resized=resized)
+        else:
+            (circles, _) = get_circles_adaptive(resized) if adaptive_detection else get_circles(resized)
+        connection.send(circles)
+
+
+def get_fallback_settings() -> tuple[int, float]:
+    """Get the settings of the fallback configuration, derived from the active preset
+
+    Returns:
+        shortest_side_length,_param2 (tuple[int, float]): the detection resolution and the accumulator threshold of the fallback detection
+    """
+    preset = get_active_preset()
+    return (int(preset.shortest_side_length * FALLBACK_RESOLUTION_FACTOR), preset.hough_param2 * FALLBACK_PARAM2_FACTOR)
+
+
+def get_worker_context() -> multiprocessing.context.BaseContext:
+    """Get the multiprocessing context of the worker processes : they are started from a fork server when possible 
+    (a single-threaded process, so a worker is forked without the risk of a deadlock), spawned otherwise.
+    Starting a worker still costs a few tens of milliseconds at best (up to a few hundred on a loaded machine), 
+    so the workers are started ahead of their use (see TimeBudgetedDetector)
+
+    Returns:
+        multiprocessing.context.BaseContext: the context
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # The main module and the modules of the program already imported (with OpenCV, numpy, pandas...) are imported once 
+        #   by the fork server, when it starts : a new worker doesn't import them again (the preload has no effect 
+        #   once the fork server runs, so it's set before the start of the first worker)
+        packageName = __name__.split(".")[0]
+        context.set_forkserver_preload(["__main__"] + sorted(name for name in list(sys.modules) if name.split(".")[0] == packageName))
+        _start_fork_server()
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _start_fork_server():
+    """Start the fork server (if it doesn't run yet) with the root of the program in its import path : 
+    the fork server doesn't get the import path of the main process (Python 3.11 drops it, with the path of the main module), 
+    so the preloaded modules would only be found from the directory of the program, and silently imported again by every worker
+    """
+    packageRoot = str(Path(__file__).resolve().parents[2])
+    pythonPath = os.environ.get("PYTHONPATH")
+    os.environ["PYTHONPATH"] = os.pathsep.join([packageRoot] + ([pythonPath] if pythonPath else []))
+    try:
+        multiprocessing.forkserver.ensure_running()
+    finally:
+        if pythonPath is None:
+            del os.environ["PYTHONPATH"]
+        else:
+            os.environ["PYTHONPATH"] = pythonPath
+
+
+class TimeBudgetedDetector():
+    """Circle detection with a time budget per image.
+
+    The detection runs in a worker process, that is killed when the budget is exceeded.
+    In that case, the circles are detected with a cheaper fallback configuration (lower resolution, higher threshold),
+    in another worker and with the same budget : if the fallback detection exceeds it too, no circle is detected in the image.
+    Standby workers are started ahead : one replaces a killed worker at once. Their replacements are started in a background thread
+    once the detection of the image is over, and the killed workers are reaped later : neither the start-up nor the end 
+    of a worker is on the path of a detection. An image thus takes at most twice the budget (plus the transfer of the image
+    to the workers), unless the images exceed the budget in a row faster than a worker starts (a standby worker is then waited for).
+
+    The worker is never forked from the main process, which runs other threads (prefetch of the images, thread pool of OpenCV)
+    whose locks could be copied in a locked state : it's started from a fork server (or spawned, without fork server)."""
+
+    time_budget: float
+    """The time budget (in seconds) of the normal detection for one image"""
+
+    adaptive_detection: bool
+    """Adapt the detection resolution and the searched radiuses to each image (see 'get_circles_adaptive')"""
+
+    def __init__(self, time_budget: float, adaptive_detection: bool = False):
+        if time_budget <= 0:
+            raise ValueError(f"The time budget must be strictly positive (got {time_budget}).")
+
+        self.time_budget = time_budget
+        self.adaptive_detection = adaptive_detection
+        self._context = get_worker_context()
+        self._process = None
+        self._connection = None
+        self._standbyWorkers = []
+        self._standbyStarter = None
+        self._killedProcesses = []
+
+    def __enter__(self) -> "TimeBudgetedDetector":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_circles(self, img: ndarray, resized: ndarray | None = None) -> tuple[ndarray, int, bool]:
+        """Get the circles around the coins in the image, within the time budget
+
+        Args:
+            img (ndarray): the image with coins
+            resized (ndarray | None, optional): the image already resized at the detection resolution (for example from an ImageStore).
+                    Defaults to None (the image is resized).
+
+        Returns:
+            circles,_nb_circles,_usedFallback (tuple[ndarray, int, bool]): the N circles in a (1,N,3) matrix
+                    (center X and Y coordinates, and radius), their number, and True if the fallback configuration was used
+                    (None and 0 if the fallback detection exceeded the budget too)
+        """
+        # Only the image at the detection resolution is sent to the worker (small, quick to transfer)
+        if resized is None:
+            resized = _resize_lowest_side_of_image(img, get_active_preset().shortest_side_length)
+
+        (completed, circles) = self._get_circles_in_worker(resized)
+        usedFallback = not completed
+        if usedFallback:
+            resized = _resize_lowest_side_of_image(img, get_fallback_settings()[0])
+            (completed, circles) = self._get_circles_in_worker(resized, fallback = True)
+        circles = _resize_circles_back_to_original_size(circles, resized.shape[1], img.shape[1])
+
+        # The workers killed by the detection are replaced after it
+        self._replace_standby_worker()
+
+        nbCircles = circles.shape[1] if circles is not None else 0
+        return (circles, nbCircles, usedFallback)
+
+    def _get_circles_in_worker(self, resized: ndarray, fallback: bool = False) -> tuple[bool, ndarray | None]:
+        """Detect the circles in the worker process, and cancel the detection if it exceeds the time budget
+
+        Args:
+            resized (ndarray): the image at the detection resolution
+            fallback (bool, optional): use the fallback configuration (the image being at its resolution). Defaults to False.
+
+        Returns:
+            completed,_circles (tuple[bool, ndarray | None]): False if the detection was cancelled, 
+                    and the circles otherwise (None if no circle)
+        """
+        try:
+            if self._process is None:
+                self._activate_standby_worker()
+
+            self._connection.send((resized, self.adaptive_detection, get_active_preset().name, fallback))
+            if self._connection.poll(self.time_budget):
+                return (True, self._connection.recv())
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            pass # the worker died : it's replaced, as for an exceeded budget
+
+        self._stop_worker()
+        return (False, None)
+
+    def _start_worker(self) -> tuple[multiprocessing.process.BaseProcess, Connection]:
+        """Start a worker process, without waiting for it to be ready (it sends True when it is)
+
+        Returns:
+            process,_connection (tuple[multiprocessing.process.BaseProcess, Connection]): the worker, and the connection with it
+        """
+        (connection, workerConnection) = self._context.Pipe()
+        process = self._context.Process(target=_detection_worker, args=(workerConnection,), daemon=True)
+        process.start()
+        workerConnection.close()
+        return (process, connection)
+
+    def _activate_standby_worker(self):
+        """Make a standby worker the worker of the detections (waiting for it to be ready, which it usually already is)"""
+        if len(self._standbyWorkers) == 0 and self._standbyStarter is not None:
+            self._standbyStarter.join()
+            self._standbyStarter = None
+        if len(self._standbyWorkers) == 0:
+            self._standbyWorkers.append(self._start_worker()) # first detection
+        (self._process, self._connection) = self._standbyWorkers.pop(0)
+        self._connection.recv() # wait for the worker to be ready
+
+    def _replace_standby_worker(self):
+        """Start new standby workers in a background thread, if some were activated, and reap the killed workers"""
+        self._killedProcesses = [process for process in self._killedProcesses if process.exitcode is None]
+        if self._standbyStarter is not None and not self._standbyStarter.is_alive():
+            self._standbyStarter = None
+        if len(self._standbyWorkers) < NB_STANDBY_WORKERS and self._standbyStarter is None:
+            self._standbyStarter = threading.Thread(target=self._start_standby_workers, daemon=True)
+            self._standbyStarter.start()
+
+    def _start_standby_workers(self):
+        """Start the missing standby workers (run in a background thread)"""
+        while len(self._standbyWorkers) < NB_STANDBY_WORKERS:
+            self._standbyWorkers.append(self._start_worker())
+
+    def _stop_worker(self):
+        """Kill the worker process (a standby worker replaces it for the next detection ; it's reaped later)"""
+        if self._process is None:
+            return
+        self._process.kill()
+        self._connection.close()
+        self._killedProcesses.append(self._process)
+        self._process = None
+        self._connection = None
+
+    def close(self):
+        """Stop the worker process and the standby workers"""
+        if self._standbyStarter is not None:
+            self._standbyStarter.join()
+            self._standbyStarter = None
+        workers = self._standbyWorkers
+        if self._process is not None:
+            workers.append((self._process, self._connection))
+        for (process, connection) in workers:
+            connection.close() # the worker stops when its connection is closed
+        for (process, connection) in workers:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        for process in self._killedProcesses:
+            process.join()
+        self._process = None
+        self._connection = None
+        self._standbyWorkers = []
+        self._killedProcesses = []
@@ -0,0 +1,120 @@
+import json
+import os
+from ..classes.ResultsToEvaluate import ResultsToEvaluate
+
+DEFAULT_BATCH_SIZE = 1
+"""Default number of completed images appended together to the checkpoint log"""
+
+
+class CheckpointLog():
+    """Append-only log of the completed images (one JSON line per image), to resume a run after a crash or a preemption.
+
+    Each batch of lines is appended with a single write on a file opened in append mode, then synced to the disk.
+    If the process is killed during a write, only the last line can be incomplete : it is ignored when reading the log,
+    and removed before appending new lines."""
+
+    filePath: str
+    """Path to the checkpoint log file"""
+
+    batch_size: int
+    """Number of completed images appended together to the log"""
+
+    def __init__(self, filePath: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        if batch_size <= 0:
+            raise ValueError(f"The checkpoint batch size must be strictly positive (got {batch_size}).")
+
+        self.filePath = filePath
+        self.batch_size = batch_size
+        self._bufferedLines = []
+
+        # Remove an incomplete last line (interrupted write), then open the log in append mode
+        if os.path.isfile(filePath):
+            (_, validLength) = CheckpointLog._read_valid_records(filePath)
+            os.truncate(filePath, validLength)
+        self._fileDescriptor = os.open(filePath, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def __enter__(self) -> "CheckpointLog":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, result: ResultsToEvaluate):
+        """Add a completed image to the log (written once the batch is complete, see 'is_batch_complete' and 'flush')
+
+        Args:
+            result (ResultsToEvaluate): the results of the completed image
+        """
+        self._bufferedLines.append(json.dumps(result.to_dict()) + "\n")
+
+    def is_batch_complete(self) -> bool:
+        """Check if a complete batch of images is waiting to be written
+
+        Returns:
+            bool: True if the buffered images should be written to the log
+        """
+        return len(self._bufferedLines) >= self.batch_size
+
+    def flush(self):
+        """Append the buffered images to the log, atomically (one write), and sync the log to the disk"""
+        if not self._bufferedLines:
+            return
+        os.write(self._fileDescriptor, "".join(self._bufferedLines).encode("utf-8"))
+        os.fsync(self._fileDescriptor)
+        self._bufferedLines = []
+
+    def close(self):
+        """Write the remaining buffered images, and close the log"""
+        if self._fileDescriptor is None:
+            return
+        self.flush()
+        os.close(self._fileDescriptor)
+        self._fileDescriptor = None
+
+    def read(filePath: str) -> list[ResultsToEvaluate]:
+        """Read the results of the completed images from a checkpoint log (an incomplete last line is ignored)
+
+        Args:
+            filePath (str): path to the checkpoint log file
+
+        Raises:
+            FileNotFoundError: the file doesn't exist
+
+        Returns:
+            list[ResultsToEvaluate]: the results of the completed images, in the order they were completed
+        """
+        if not os.path.isfile(filePath):
+            raise FileNotFoundError(f"The checkpoint file '{filePath}' doesn't exist.")
+
+        (records, _) = CheckpointLog._read_valid_records(filePath)
+        return [ResultsToEvaluate.from_dict(record) for record in records]
+
+    def _read_valid_records(filePath: str) -> tuple[list[dict], int]:
+        """Read the complete records of a checkpoint log
+
+        Args:
+            filePath (str): path to the checkpoint log file
+
+        Raises:
+            ValueError: a line in the middle of the log is corrupted
+
+        Returns:
+            records,_validLength (tuple[list[dict], int]): the records, and the length (in bytes) of the valid part of the log
+        """
+        with open(filePath, "rb") as file:
+            content = file.read()
+
+        records = []
+        validLength = 0
+        lines = content.split(b"\n")
+        for (i, line) in enumerate(lines):
+            isLastLine = i == len(lines) - 1
+            if isLastLine:
+                break # either empty (the log ends with a new line), or an incomplete line
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                raise ValueError(f"The checkpoint file '{filePath}' is corrupted (line {i+1}).")
+            validLength += len(line) + 1
+
+        return (records, validLength)
@@ -0,0 +1,171 @@
+import heapq
+import json
+import os
+import statistics
+from ..classes.ImageData import ImageData
+from .ImageHeader import get_image_dimensions
+from .ImageReader import ImageReader
+
+TIMING_HISTORY_VERSION = 1
+"""Version of the timing history file format"""
+
+TIMING_EMA_FACTOR = 0.3
+"""Weight of the last timing in the exponential moving averages of the timing history"""
+
+DEFAULT_SECONDS_PER_MEGAPIXEL = 0.01
+"""Cost of a megapixel before any timing is known (only the order of the costs matters then)"""
+
+
+class TimingHistory():
+    """History of the processing times of the previous runs, as exponential moving averages :
+    the time of each image, and the time per megapixel of each group of images (directory) and of all the images.
+    The costs of the images are estimated from it, to schedule the longest images first."""
+
+    filePath: str
+    """Path to the timing history file"""
+
+    images: dict[str, float]
+    """key = image name, value = average processing time (in seconds)"""
+
+    groups: dict[str, float]
+    """key = group of images (the directory of their names), value = average processing time per megapixel"""
+
+    seconds_per_megapixel: float | None
+    """Average processing time per megapixel of all the images (None before any timing)"""
+
+    def __init__(self, filePath: str):
+        """Load the timing history from its file (empty if the file doesn't exist yet)
+
+        Args:
+            filePath (str): path to the timing history file
+
+        Raises:
+            ValueError: the file isn't a valid timing history
+        """
+        self.filePath = filePath
+        self.images = {}
+        self.groups = {}
+        self.seconds_per_megapixel = None
+
+        try:
+            with open(filePath) as file:
+                content = json.load(file)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            raise ValueError(f"The file '{filePath}' isn't a valid timing history.")
+
+        if content.get("version") != TIMING_HISTORY_VERSION:
+            raise ValueError(f"The file '{filePath}' isn't a valid timing history (unknown version).")
+        self.images = content["images"]
+        self.groups = content["groups"]
+        self.seconds_per_megapixel = content["seconds_per_megapixel"]
+
+    def estimate_cost(self, image_name: str, megapixels: float) -> float:
+        """Estimate the processing time of an image : its own average time if it was already processed,
+        otherwise its size multiplied by the time per megapixel of its group (or of all the images)
+
+        Args:
+            image_name (str): the name of the image
+            megapixels (float): the size of the image (in megapixels)
+
+        Returns:
+            float: the estimated processing time (in seconds)
+        """
+        if image_name in self.images:
+            return self.images[image_name]
+        secondsPerMegapixel = self.groups.get(os.path.dirname(image_name), self.seconds_per_megapixel)
+        return megapixels * (secondsPerMegapixel if secondsPerMegapixel is not None else DEFAULT_SECONDS_PER_MEGAPIXEL)
+
+    def update(self, image_name: str, megapixels: float, seconds: float):
+        """Add the processing time of an image to the averages
+
+        Args:
+            image_name (str): the name of the image
+            megapixels (float): the size of the image (in megapixels)
+            seconds (float): the processing time of the image
+        """
+        self.images[image_name] = _get_updated_average(self.images.get(image_name), seconds)
+        if megapixels > 0:
+            group = os.path.dirname(image_name)
+            self.groups[group] = _get_updated_average(self.groups.get(group), seconds / megapixels)
+            self.seconds_per_megapixel = _get_updated_average(self.seconds_per_megapixel, seconds / megapixels)
+
+    def save(self):
+        """Save the timing history in its file (replaced atomically)"""
+        content = {
+            "version": TIMING_HISTORY_VERSION,
+            "images": self.images,
+            "groups": self.groups,
+            "seconds_per_megapixel": self.seconds_per_megapixel
+        }
+        temporaryPath = self.filePath + ".tmp"
+        with open(temporaryPath, "w") as file:
+            json.dump(content, file)
+        os.replace(temporaryPath, self.filePath)
+
+
+class CostScheduler():
+    """Class with the methods scheduling the images across several workers, the longest images first (LPT)"""
+
+    def get_images_megapixels(image_data: list[ImageData]) -> dict[str, float]:
+        """Get the size of each image from the header of its file, without decoding it.
+        The images whose header can't be read get the median size of the others.
+
+        Args:
+            image_data (list[ImageData]): the data of the images
+
+        Returns:
+            dict[str, float]: key = image name, value = size of the image (in megapixels)
+        """
+        megapixels = {}
+        for data in image_data:
+            with ImageReader.open_image_file(data.image_path) as file:
+                dimensions = get_image_dimensions(file)
+            megapixels[data.name] = dimensions[0] * dimensions[1] / 1e6 if dimensions is not None else None
+
+        knownMegapixels = [value for value in megapixels.values() if value is not None]
+        medianMegapixels = statistics.median(knownMegapixels) if knownMegapixels else 1.0
+        return {name: (value if value is not None else medianMegapixels) for (name, value) in megapixels.items()}
+
+    def schedule_longest_first(image_data: list[ImageData], costs: dict[str, float]) -> list[ImageData]:
+        """Order the images by decreasing estimated cost : the workers taking the next image of the queue as soon as they are free,
+        the longest images are processed first, and the shortest images fill the end of the run (LPT scheduling)
+
+        Args:
+            image_data (list[ImageData]): the data of the images
+            costs (dict[str, float]): key = image name, value = estimated cost of the image
+
+        Returns:
+            list[ImageData]: the data of the images, in the order of the schedule
+        """
+        return sorted(image_data, key=lambda data: costs[data.name], reverse=True)
+
+    def get_makespan(image_data: list[ImageData], costs: dict[str, float], nbWorkers: int) -> float:
+        """Estimate the duration of a run (makespan), the workers taking the next image of the queue as soon as they are free
+
+        Args:
+            image_data (list[ImageData]): the data of the images, in the order of the queue
+            costs (dict[str, float]): key = image name, value = estimated cost of the image
+            nbWorkers (int): the number of workers
+
+        Returns:
+            float: the estimated makespan (the time at which the last worker finishes)
+        """
+        finishTimes = [0.0] * nbWorkers # heap of the times at which each worker is free
+        for data in image_data:
+            heapq.heappush(finishTimes, heapq.heappop(finishTimes) + costs[data.name])
+        return max(finishTimes)
+
+
+def _get_updated_average(average: float | None, value: float) -> float:
+    """Update an exponential moving average with a new value (see TIMING_EMA_FACTOR)
+
+    Args:
+        average (float | None): the current average (None if there is no value yet)
+        value (float): the new value
+
+    Returns:
+        float: the updated average
+    """
+    return value if average is None else TIMING_EMA_FACTOR * value + (1 - TIMING_EMA_FACTOR) * average
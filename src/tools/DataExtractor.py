@@ -1,26 +1,48 @@
 from ..classes.ImageData import ImageData
 from .FileParser import FileParser
-from pathlib import Path
-import os
+from .DirectoryIndex import DirectoryIndex
+from .ImageArchive import ImageArchive
+from .Sharding import Sharding
 
 class DataExtractor():
     """General class for data extraction (image list, image data, ground truth...)"""
 
-    def get_data_for_regression_and_evaluation(filePath_evaluatedImages: str, 
-            directoryPath_imageCollection: str, filePath_groundTruth: str) -> list[ImageData]:
+    def get_data_for_regression_and_evaluation(filePath_evaluatedImages: str | None, 
+            directoryPath_imageCollection: str, filePath_groundTruth: str,
+            imagesGlobPatterns: list[str] | None = None, filePath_directoryIndex: str | None = None,
+            shard: tuple[int, int] | None = None) -> list[ImageData]:
         """Extract all the necessary data for the regression and evaluation work
 
         Args:
-            filePath_evaluatedImages (str): path to the file containing the list of image names
-            directoryPath_imageCollection (str): path to the directory containing all the images
+            filePath_evaluatedImages (str | None): path to the file containing the list of image names 
+                    (can be None if glob patterns select the images instead)
+            directoryPath_imageCollection (str): path to the directory containing all the images (or to a zip or tar archive)
             filePath_groundTruth (str): path to the file containing the ground truth for the images to evaluate
+            imagesGlobPatterns (list[str] | None, optional): glob patterns selecting the images in the directory.
+                    Only the selected images with a ground truth are kept. Defaults to None (no selection).
+            filePath_directoryIndex (str | None, optional): path to the file persisting the index of the directory
+                    (not used for an archive). Defaults to None (the index is built in memory).
+            shard (tuple[int, int] | None, optional): the shard number and the number of shards, to keep only the images of this shard.
+                    Defaults to None (every image is kept).
 
         Returns:
             list[ImageData]: the list of data per image
         """
-        list_imgs_to_evaluate = DataExtractor._get_list_of_images_to_evaluate(filePath_evaluatedImages)
+        # An archive is indexed from its own list of members (without extracting them)
+        if ImageArchive.is_archive(directoryPath_imageCollection):
+            directoryIndex = ImageArchive.open(directoryPath_imageCollection).get_directory_index()
+        else:
+            directoryIndex = DirectoryIndex.load_or_build(directoryPath_imageCollection, filePath_directoryIndex)
+
+        if imagesGlobPatterns:
+            list_imgs_to_evaluate = DataExtractor._get_list_of_images_from_glob_patterns(
+                directoryIndex, imagesGlobPatterns, filePath_groundTruth, filePath_evaluatedImages)
+        else:
+            list_imgs_to_evaluate = DataExtractor._get_list_of_images_to_evaluate(filePath_evaluatedImages)
+        if shard is not None:
+            list_imgs_to_evaluate = Sharding.select_shard(list_imgs_to_evaluate, shard)
         data_groundTruth = DataExtractor._get_ground_truth(filePath_groundTruth, list_imgs_to_evaluate)
-        absolutePaths_images = DataExtractor._get_images_absolute_paths(directoryPath_imageCollection, list_imgs_to_evaluate)
+        absolutePaths_images = DataExtractor._get_images_absolute_paths(directoryIndex, list_imgs_to_evaluate)
         
         return DataExtractor._create_image_data(data_groundTruth, absolutePaths_images)
 
@@ -69,40 +91,62 @@ class DataExtractor():
         
         # We check that each image name exist in this dictionary
         for image_name in list_images:
-            if (not image_name in data_groundTruth.keys()):
+            if (not image_name in data_groundTruth):
                 raise ValueError(f"The ground truth file doesn't have data for the '{image_name}' file.")
 
-        # We delete useless entries (image that aren't used for regression and evaluation)
-        final_data_groundTruth = { k:v for (k,v) in data_groundTruth.items() if k in list_images}
+        # We delete useless entries (image that aren't used for regression and evaluation), 
+        # with a set of the names (a list would be scanned for each entry of the ground truth)
+        set_images = set(list_images)
+        final_data_groundTruth = { k:v for (k,v) in data_groundTruth.items() if k in set_images}
 
         return final_data_groundTruth
     
-    def _get_images_absolute_paths(directoryPath_imageCollection: str, list_images: list[str]) -> dict[str, str]:
+    def _get_list_of_images_from_glob_patterns(directoryIndex: DirectoryIndex, imagesGlobPatterns: list[str],
+            filePath_groundTruth: str, filePath_imageList: str | None = None) -> list[str]:
+        """Select the images matching glob patterns in the indexed directory, and having a ground truth
+
+        Args:
+            directoryIndex (DirectoryIndex): the index of the directory containing the images
+            imagesGlobPatterns (list[str]): the glob patterns selecting the images
+            filePath_groundTruth (str): path to the ground truth file
+            filePath_imageList (str | None, optional): file containing a list of image names, to restrict the selection. Defaults to None.
+
+        Raises:
+            ValueError: no image matches the patterns (and has a ground truth)
+
+        Returns:
+            list[str]: the sorted list of selected image names
+        """
+        try:
+            data_groundTruth = FileParser.excel_file_reading_and_parsing_ground_truth(filePath_groundTruth)
+        except Exception as e:
+            raise Exception(str(e) + "\n(this file is supposed to contain the ground truth for the images)")
+
+        imagesNames = [name for name in directoryIndex.select(imagesGlobPatterns) if name in data_groundTruth]
+        if filePath_imageList is not None:
+            listedImages = set(DataExtractor._get_list_of_images_to_evaluate(filePath_imageList))
+            imagesNames = [name for name in imagesNames if name in listedImages]
+
+        if len(imagesNames) == 0:
+            raise ValueError(f"No image with a ground truth matches the patterns {imagesGlobPatterns} "
+                             + f"in the directory '{directoryIndex.root_path}'.")
+
+        return imagesNames
+    
+    def _get_images_absolute_paths(directoryIndex: DirectoryIndex, list_images: list[str]) -> dict[str, str]:
         """Get the list of valid image paths (the images will be read when necessary ; we just check they exist)
 
         Args:
-            directoryPath_imageCollection (str): path to the directory containing the images
+            directoryIndex (DirectoryIndex): the index of the directory containing the images
             list_images (list[str]): the list of image names
 
         Raises:
-            FileNotFoundError: the directory containing the images doesn't exist
-            FileNotFoundError: an necessary image couldn't be found in the directory
+            FileNotFoundError: some necessary images couldn't be found in the directory
 
         Returns:
             absolutePaths (dict[str, str]): key = image name, value = absolute path
         """
-        if not Path(directoryPath_imageCollection).is_dir():
-            raise FileNotFoundError(f"The directory '{directoryPath_imageCollection}' doesn't exist.")
-        
-        dict_image_paths = {}
-        for image_name in list_images:
-            img_path = os.path.join(directoryPath_imageCollection, image_name)
-            if Path(img_path).is_file():
-                dict_image_paths[image_name] = img_path
-            else:
-                raise FileNotFoundError(f"The image '{image_name}' couldn't be found at '{img_path}'.")
-        
-        return dict_image_paths
+        return directoryIndex.resolve(list_images)
 
     def _create_image_data(data_groundTruth: dict[str, tuple[int, float]], absolutePaths_images: dict[str, str]) -> list[ImageData]:
         """Create an ImageData for each image, based on the ground truth and the absolute paths previously extracted
@@ -0,0 +1,309 @@
+import os
+import numpy as np
+from numpy import ndarray
+import cv2 as cv
+import pandas
+
+from ..classes.CoinData import CoinValue, real_coins_diameters
+
+IMAGE_LIST_FILE_NAME = "images_to_evaluate.txt"
+"""Name of the file listing the generated images (read with the option '-f')"""
+
+GROUND_TRUTH_FILE_NAME = "ground_truth.xlsx"
+"""Name of the ground truth workbook of the generated images (read with the option '-g')"""
+
+IMAGE_DIRECTORY_NAME = "images"
+"""Name of the directory of the generated images (read with the option '-d'), with one sub-directory per group"""
+
+GROUND_TRUTH_HEADER = ["Nom image", "Nombre de pièces", "Valeur monétaire €", "Identifiant équipe"]
+"""Header of the ground truth workbook (the same as the default ground truth, read by FileParser)"""
+
+ASPECT_RATIO = 4 / 3
+"""Ratio between the longest and the shortest side of the generated images"""
+
+JPEG_QUALITY = 90
+"""Quality of the JPEG encoding of the generated images"""
+
+MAX_PLACEMENT_ATTEMPTS = 200
+"""Number of random positions tried for each coin before giving up on it (the image then holds fewer coins)"""
+
+REFERENCE_SHORTEST_SIDE = 500
+"""Resolution at which the sizes of the coins are chosen (the reference resolution of the detection, see 'Presets')"""
+
+LARGEST_COIN_RADIUS_RANGE = (55, 100)
+"""Range of the radius of a 2 € coin, at the reference resolution (the scale of each image is drawn in this range,
+well inside the radius bounds of the detection)"""
+
+# Colors of the metals (BGR), before the shading
+SILVER_COLOR = (172, 176, 180)
+NORDIC_GOLD_COLOR = (62, 160, 196)
+COPPER_COLOR = (58, 104, 168)
+
+COIN_COLORS = {
+    CoinValue.EURO_2: (NORDIC_GOLD_COLOR, SILVER_COLOR),
+    CoinValue.EURO_1: (SILVER_COLOR, NORDIC_GOLD_COLOR),
+    CoinValue.CENT_50: (NORDIC_GOLD_COLOR, NORDIC_GOLD_COLOR),
+    CoinValue.CENT_20: (NORDIC_GOLD_COLOR, NORDIC_GOLD_COLOR),
+    CoinValue.CENT_10: (NORDIC_GOLD_COLOR, NORDIC_GOLD_COLOR),
+    CoinValue.CENT_5: (COPPER_COLOR, COPPER_COLOR),
+    CoinValue.CENT_2: (COPPER_COLOR, COPPER_COLOR),
+    CoinValue.CENT_1: (COPPER_COLOR, COPPER_COLOR)
+}
+"""key = coin value, value = tuple[color of the external ring, color of the center] (BGR)"""
+
+EURO_CENTER_RATIO = 0.72
+"""Radius of the center of the bimetallic euro coins, as a ratio of their radius"""
+
+
+class GenerationSettings():
+    """Settings of a synthetic dataset"""
+
+    nb_images: int
+    """Number of generated images"""
+
+    seed: int
+    """Seed of the generation (the same seed and settings always give the same dataset, image by image)"""
+
+    nb_coins_range: tuple[int, int]
+    """Minimum and maximum numbers of coins in an image (inclusive)"""
+
+    max_overlap: float
+    """Maximum overlap between two coins, as a ratio of the sum of their radiuses (0 = the coins never touch)"""
+
+    shortest_side_length: int
+    """Length of the shortest side of the images (in pixels)"""
+
+    noise: float
+    """Standard deviation of the Gaussian noise added to the images (in gray levels)"""
+
+    nb_groups: int
+    """Number of groups of images (one sub-directory per group, as the groups of the ground truth)"""
+
+    def __init__(self, nb_images: int, seed: int = 0, nb_coins_range: tuple[int, int] = (1, 12), max_overlap: float = 0.0,
+                 shortest_side_length: int = 1000, noise: float = 4.0, nb_groups: int = 1):
+        if nb_images <= 0:
+            raise ValueError(f"The number of images must be strictly positive (got {nb_images}).")
+        if not 0 <= nb_coins_range[0] <= nb_coins_range[1]:
+            raise ValueError(f"Invalid range of numbers of coins ({nb_coins_range[0]} to {nb_coins_range[1]}).")
+        if not 0 <= max_overlap < 1:
+            raise ValueError(f"The maximum overlap must be between 0 (included) and 1 (excluded) (got {max_overlap}).")
+        if shortest_side_length < 100:
+            raise ValueError(f"The shortest side of the images must be at least 100 pixels (got {shortest_side_length}).")
+        if noise < 0:
+            raise ValueError(f"The noise must be positive (got {noise}).")
+        if nb_groups <= 0:
+            raise ValueError(f"The number of groups must be strictly positive (got {nb_groups}).")
+
+        self.nb_images = nb_images
+        self.seed = seed
+        self.nb_coins_range = nb_coins_range
+        self.max_overlap = max_overlap
+        self.shortest_side_length = shortest_side_length
+        self.noise = noise
+        self.nb_groups = nb_groups
+
+
+class DatasetGenerator():
+    """Class with the methods rendering synthetic photos of coins, with the matching image list and ground truth"""
+
+    def generate_dataset(directoryPath: str, settings: GenerationSettings, printDetails: bool = False) -> tuple[str, str, str]:
+        """Generate a synthetic dataset : the images (one sub-directory per group), the list of their names, and the ground truth workbook
+
+        Args:
+            directoryPath (str): the directory of the dataset (created if it doesn't exist)
+            settings (GenerationSettings): the settings of the dataset
+            printDetails (bool, optional): print each generated image. Defaults to False.
+
+        Raises:
+            Exception: couldn't write an image
+
+        Returns:
+            directoryPath_images,_filePath_imageList,_filePath_groundTruth (tuple[str, str, str]):
+                    the paths to give to the options '-d', '-f' and '-g' of a run
+        """
+        directoryPath_images = os.path.join(directoryPath, IMAGE_DIRECTORY_NAME)
+        for groupIndex in range(settings.nb_groups):
+            os.makedirs(os.path.join(directoryPath_images, _get_group_name(groupIndex)), exist_ok=True)
+
+        rows = []
+        imageNames = []
+        for imageIndex in range(settings.nb_images):
+            groupName = _get_group_name(imageIndex % settings.nb_groups)
+            fileName = f"{imageIndex // settings.nb_groups}.jpg"
+            (img, values) = DatasetGenerator.render_image(settings, imageIndex)
+
+            imagePath = os.path.join(directoryPath_images, groupName, fileName)
+            if not cv.imwrite(imagePath, img, [cv.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]):
+                raise Exception(f"The image '{imagePath}' couldn't be written.")
+            totalValue = round(sum(value.value for value in values), 2)
+            rows.append((fileName, len(values), totalValue, groupName))
+            imageNames.append(f"{groupName}/{fileName}")
+            if printDetails: print(f"{groupName}/{fileName} : {len(values)} coin(s), {totalValue} €")
+
+        filePath_imageList = os.path.join(directoryPath, IMAGE_LIST_FILE_NAME)
+        with open(filePath_imageList, "w") as file:
+            file.write("\n".join(imageNames) + "\n")
+
+        # FileParser skips the first 2 rows, and reads the next one as a header : a title, a note, the header, then one row per image
+        filePath_groundTruth = os.path.join(directoryPath, GROUND_TRUTH_FILE_NAME)
+        with pandas.ExcelWriter(filePath_groundTruth) as writer:
+            pandas.DataFrame(rows, columns=GROUND_TRUTH_HEADER).to_excel(writer, index=False, startrow=2)
+            sheet = writer.sheets["Sheet1"]
+            sheet.cell(row=1, column=1).value = "Annotations des images synthétiques"
+            sheet.cell(row=2, column=1).value = ("seed {}, {} to {} coins, overlap {}, shortest side {}px, noise {}"
+                                                 .format(settings.seed, *settings.nb_coins_range, settings.max_overlap,
+                                                         settings.shortest_side_length, settings.noise))
+
+        return (directoryPath_images, filePath_imageList, filePath_groundTruth)
+
+    def render_image(settings: GenerationSettings, imageIndex: int) -> tuple[ndarray, list[CoinValue]]:
+        """Render a synthetic photo of coins. Its random generator only depends on the seed and the index of the image,
+        so any image of a dataset can be rendered again alone.
+
+        Args:
+            settings (GenerationSettings): the settings of the dataset
+            imageIndex (int): the index of the image in the dataset
+
+        Returns:
+            img,_values (tuple[ndarray, list[CoinValue]]): the rendered image (BGR), and the value of each coin drawn on it
+        """
+        rng = np.random.default_rng([settings.seed, imageIndex])
+        shortestSide = settings.shortest_side_length
+        longestSide = int(round(shortestSide * ASPECT_RATIO))
+        (height, width) = (shortestSide, longestSide) if rng.random() < 0.5 else (longestSide, shortestSide)
+
+        img = _render_background(rng, height, width)
+
+        # Scale of the image (pixels per millimeter), from the radius of the largest coin
+        largestRadius = rng.uniform(*LARGEST_COIN_RADIUS_RANGE) * shortestSide / REFERENCE_SHORTEST_SIDE
+        pixelsPerMillimeter = largestRadius / (max(real_coins_diameters.values()) / 2)
+        lightDirection = rng.uniform(0, 2 * np.pi)
+
+        coins = [] # (x, y, radius) of the coins already placed
+        values = []
+        coinValues = list(CoinValue)
+        for _ in range(rng.integers(settings.nb_coins_range[0], settings.nb_coins_range[1] + 1)):
+            value = coinValues[rng.integers(len(coinValues))]
+            radius = real_coins_diameters[value] / 2 * pixelsPerMillimeter
+            position = _find_coin_position(rng, coins, radius, height, width, settings.max_overlap)
+            if position is None:
+                continue
+            coins.append((position[0], position[1], radius))
+            values.append(value)
+            _draw_coin(img, rng, position, radius, value, lightDirection)
+
+        if settings.noise > 0:
+            img = img + rng.normal(0, settings.noise, img.shape)
+        return (np.clip(img, 0, 255).astype(np.uint8), values)
+
+
+def _get_group_name(groupIndex: int) -> str:
+    """Get the name of a group of generated images
+
+    Args:
+        groupIndex (int): the index of the group
+
+    Returns:
+        str: the name of the group (its sub-directory, and its identifier in the ground truth)
+    """
+    return f"synth{groupIndex + 1}"
+
+def _render_background(rng: np.random.Generator, height: int, width: int) -> ndarray:
+    """Render a textured background : a base color with low-frequency variations (lighting and stains),
+    wood-like stripes or a fine grain
+
+    Args:
+        rng (np.random.Generator): the random generator of the image
+        height (int): the height of the image
+        width (int): the width of the image
+
+    Returns:
+        ndarray: the background (BGR, float)
+    """
+    baseColor = rng.uniform(40, 220, 3)
+    # Low-frequency variations : a coarse random grid smoothly resized to the image
+    coarse = cv.resize(rng.normal(0, 1, (6, 8)).astype(np.float32), (width, height), interpolation=cv.INTER_CUBIC)
+    img = baseColor[None, None, :] * (1 + 0.12 * coarse[:, :, None])
+
+    if rng.random() < 0.5:
+        # Wood-like stripes, along a random direction
+        angle = rng.uniform(0, np.pi)
+        (y, x) = np.mgrid[0:height, 0:width].astype(np.float32)
+        coordinate = x * np.cos(angle) + y * np.sin(angle)
+        period = rng.uniform(0.02, 0.08) * min(height, width)
+        stripes = np.sin(2 * np.pi * coordinate / period + 3 * coarse)
+        img *= (1 + 0.08 * stripes[:, :, None])
+    else:
+        # Fine grain (fabric, paper)
+        grain = cv.GaussianBlur(rng.normal(0, 1, (height, width)).astype(np.float32), (0, 0), 1.5)
+        img *= (1 + 0.1 * grain[:, :, None])
+    return img
+
+def _find_coin_position(rng: np.random.Generator, coins: list[tuple[float, float, float]], radius: float,
+                        height: int, width: int, maxOverlap: float) -> tuple[float, float] | None:
+    """Find a random position for a coin, entirely inside the image and overlapping the other coins at most by the maximum overlap
+
+    Args:
+        rng (np.random.Generator): the random generator of the image
+        coins (list[tuple[float, float, float]]): the center and radius of the coins already placed
+        radius (float): the radius of the coin
+        height (int): the height of the image
+        width (int): the width of the image
+        maxOverlap (float): the maximum overlap, as a ratio of the sum of the radiuses
+
+    Returns:
+        tuple[float, float] | None: the center of the coin (x, y), or None if no position was found
+    """
+    margin = radius + 2
+    if 2 * margin >= min(height, width):
+        return None
+    for _ in range(MAX_PLACEMENT_ATTEMPTS):
+        (x, y) = (rng.uniform(margin, width - margin), rng.uniform(margin, height - margin))
+        if all(np.hypot(x - xOther, y - yOther) >= (radius + rOther) * (1 - maxOverlap) for (xOther, yOther, rOther) in coins):
+            return (x, y)
+    return None
+
+def _draw_coin(img: ndarray, rng: np.random.Generator, center: tuple[float, float], radius: float, value: CoinValue,
+               lightDirection: float):
+    """Draw a coin on the image (over the coins already drawn) : its metals, a directional shading, a relief texture,
+    a darker rim and a soft shadow
+
+    Args:
+        img (ndarray): the image (BGR, float), modified in place
+        rng (np.random.Generator): the random generator of the image
+        center (tuple[float, float]): the center of the coin (x, y)
+        radius (float): the radius of the coin
+        value (CoinValue): the value of the coin (its colors)
+        lightDirection (float): the direction of the light (in radians, the same for all the coins of an image)
+    """
+    (height, width) = img.shape[:2]
+    shadowOffset = 0.08 * radius
+    extent = radius + shadowOffset + 3
+    (xMin, xMax) = (max(0, int(center[0] - extent)), min(width, int(center[0] + extent) + 1))
+    (yMin, yMax) = (max(0, int(center[1] - extent)), min(height, int(center[1] + extent) + 1))
+    (y, x) = np.mgrid[yMin:yMax, xMin:xMax].astype(np.float32)
+    (dx, dy) = (x - center[0], y - center[1])
+    distance = np.hypot(dx, dy)
+    patch = img[yMin:yMax, xMin:xMax]
+
+    # Soft shadow, opposite to the light
+    shadowDistance = np.hypot(dx + shadowOffset * np.cos(lightDirection), dy + shadowOffset * np.sin(lightDirection))
+    shadow = np.clip((radius + 2 - shadowDistance) / 4, 0, 1)
+    patch *= (1 - 0.35 * shadow)[:, :, None]
+
+    # Metals : the external ring and the center (bimetallic for the euros)
+    (ringColor, centerColor) = COIN_COLORS[value]
+    centerWeight = np.clip((EURO_CENTER_RATIO * radius - distance) + 0.5, 0, 1)[:, :, None]
+    coinColor = (1 - centerWeight) * np.array(ringColor, np.float32) + centerWeight * np.array(centerColor, np.float32)
+
+    # Shading : brighter on the side of the light, a darker rim, and a relief texture
+    normalizedDistance = np.minimum(distance / radius, 1)
+    lighting = 1 + 0.18 * (-(dx * np.cos(lightDirection) + dy * np.sin(lightDirection)) / radius)
+    lighting -= 0.25 * np.clip((normalizedDistance - 0.9) / 0.1, 0, 1)
+    relief = cv.GaussianBlur(rng.normal(0, 1, distance.shape).astype(np.float32), (0, 0), max(1.0, radius / 25))
+    lighting += 0.6 * relief * rng.uniform(0.5, 1.5)
+    coinColor *= (lighting * rng.uniform(0.85, 1.15))[:, :, None]
+
+    # Anti-aliased edge
+    alpha = np.clip(radius - distance + 0.5, 0, 1)[:, :, None]
+    patch[...] = (1 - alpha) * patch + alpha * coinColor
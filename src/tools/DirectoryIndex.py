@@ -0,0 +1,253 @@
+from fnmatch import fnmatchcase
+from pathlib import Path
+import json
+import os
+
+INDEX_FILE_VERSION = 2
+"""Version of the persisted index file format (the version 1, without the modification times of the directories, is still read)"""
+
+
+class DirectoryIndex():
+    """Index of all the files of a directory (relative path, size and modification time),
+    built with one recursive scan of the directory. It avoids one filesystem call per image
+    when resolving a list of images, and allows to select images with glob patterns."""
+
+    root_path: str
+    """Absolute path to the indexed directory"""
+
+    entries: dict[str, tuple[int, float]]
+    """key = relative path of the file (with the OS separator), value = tuple[size in bytes, modification time]"""
+
+    directories: dict[str, float] | None
+    """key = relative path of each scanned directory ('' for the root), value = its modification time, which changes when 
+    a file or a sub-directory is added to it or deleted from it (None if unknown, for an index of the version 1)"""
+
+    def __init__(self, root_path: str, entries: dict[str, tuple[int, float]], directories: dict[str, float] | None = None):
+        self.root_path = os.path.abspath(root_path)
+        self.entries = entries
+        self.directories = directories
+        self._filesByDirectory = None # the entries grouped by directory (see 'rescan'), computed when needed
+
+    def build(directoryPath: str) -> "DirectoryIndex":
+        """Index a directory with one recursive 'os.scandir' pass
+
+        Args:
+            directoryPath (str): path to the directory to index
+
+        Raises:
+            FileNotFoundError: the directory doesn't exist
+
+        Returns:
+            DirectoryIndex: the index of every file in the directory (and its sub-directories)
+        """
+        if not Path(directoryPath).is_dir():
+            raise FileNotFoundError(f"The directory '{directoryPath}' doesn't exist.")
+
+        # Nothing to reuse : every directory is scanned
+        return DirectoryIndex(directoryPath, {}, {}).rescan()
+
+    def rescan(self, recheckedFiles: list[str] | None = None) -> "DirectoryIndex":
+        """Index the directory again, reusing this index for the directories whose modification time didn't change : 
+        one 'stat' call per directory, and one 'os.scandir' pass on each changed directory.
+        A file rewritten in place doesn't change the modification time of its directory : the given files (for example the 
+        files still being written at the previous scan) are checked with their own 'stat' call, the others are only 
+        seen changed by a full scan (see 'build')
+
+        Args:
+            recheckedFiles (list[str] | None, optional): relative paths of the files of this index to check again. 
+                    Defaults to None (no file is checked again).
+
+        Raises:
+            FileNotFoundError: the directory doesn't exist
+
+        Returns:
+            DirectoryIndex: the new index of the directory
+        """
+        if self.directories is None:
+            return DirectoryIndex.build(self.root_path)
+
+        # Files and sub-directories of each indexed directory
+        if self._filesByDirectory is None:
+            self._filesByDirectory = {}
+            for (name, fileInfo) in self.entries.items():
+                self._filesByDirectory.setdefault(os.path.dirname(name), {})[name] = fileInfo
+        subdirectoriesByDirectory = {}
+        for relativePath in self.directories:
+            if relativePath:
+                subdirectoriesByDirectory.setdefault(os.path.dirname(relativePath), []).append(relativePath)
+
+        filesByDirectory = {}
+        directories = {}
+        directoriesToScan = [""]
+        while directoriesToScan:
+            relativePath = directoriesToScan.pop()
+            absolutePath = os.path.join(self.root_path, relativePath)
+            try:
+                directories[relativePath] = os.stat(absolutePath).st_mtime
+            except FileNotFoundError:
+                if not relativePath:
+                    raise FileNotFoundError(f"The directory '{self.root_path}' doesn't exist.")
+                continue # deleted since its parent was scanned
+
+            # Same files and sub-directories as in this index
+            if self.directories.get(relativePath) == directories[relativePath]:
+                filesByDirectory[relativePath] = self._filesByDirectory.get(relativePath, {})
+                directoriesToScan.extend(subdirectoriesByDirectory.get(relativePath, []))
+                continue
+
+            files = filesByDirectory[relativePath] = {}
+            with os.scandir(absolutePath) as iterator:
+                for entry in iterator:
+                    entryRelativePath = os.path.join(relativePath, entry.name) if relativePath else entry.name
+                    if entry.is_dir():
+                        directoriesToScan.append(entryRelativePath)
+                    elif entry.is_file():
+                        # 'scandir' already retrieved the stat data on most systems (no additional call)
+                        stat = entry.stat()
+                        files[entryRelativePath] = (stat.st_size, stat.st_mtime)
+
+        # The files checked again, in the reused directories (the files of this index are left unchanged)
+        for name in recheckedFiles or []:
+            directoryPath = os.path.dirname(name)
+            files = filesByDirectory.get(directoryPath)
+            if files is None or files is not self._filesByDirectory.get(directoryPath) or name not in files:
+                continue
+            files = filesByDirectory[directoryPath] = dict(files)
+            try:
+                stat = os.stat(os.path.join(self.root_path, name))
+                files[name] = (stat.st_size, stat.st_mtime)
+            except FileNotFoundError:
+                del files[name]
+
+        entries = {}
+        for files in filesByDirectory.values():
+            entries.update(files)
+        index = DirectoryIndex(self.root_path, entries, directories)
+        index._filesByDirectory = filesByDirectory
+        return index
+
+    def load(filePath_index: str) -> "DirectoryIndex":
+        """Load an index previously saved in a file
+
+        Args:
+            filePath_index (str): path to the index file
+
+        Raises:
+            FileNotFoundError: the file doesn't exist
+            ValueError: the file isn't a valid index file
+
+        Returns:
+            DirectoryIndex: the loaded index
+        """
+        try:
+            with open(filePath_index) as file:
+                content = json.load(file)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"The index file '{filePath_index}' doesn't exist.")
+        except json.JSONDecodeError:
+            raise ValueError(f"The file '{filePath_index}' isn't a valid index file.")
+
+        if content.get("version") not in (1, INDEX_FILE_VERSION):
+            raise ValueError(f"The file '{filePath_index}' isn't a valid index file (unknown version).")
+
+        entries = {os.path.join(*name.split("/")): (size, mtime) for (name, (size, mtime)) in content["entries"].items()}
+        directories = None
+        if "directories" in content:
+            directories = {os.path.join(*name.split("/")) if name else "": mtime for (name, mtime) in content["directories"].items()}
+        return DirectoryIndex(content["root"], entries, directories)
+
+    def save(self, filePath_index: str):
+        """Save the index in a file (the relative paths are written with '/' separators)
+
+        Args:
+            filePath_index (str): path to the index file
+        """
+        content = {
+            "version": INDEX_FILE_VERSION,
+            "root": self.root_path,
+            "entries": {Path(name).as_posix(): [size, mtime] for (name, (size, mtime)) in self.entries.items()},
+            "directories": {Path(name).as_posix() if name else "": mtime for (name, mtime) in (self.directories or {}).items()}
+        }
+        temporaryPath = filePath_index + ".tmp"
+        with open(temporaryPath, "w") as file:
+            json.dump(content, file)
+        os.replace(temporaryPath, filePath_index)
+
+    def load_or_build(directoryPath: str, filePath_index: str | None = None) -> "DirectoryIndex":
+        """Load the index of a directory from its index file, or build it (and save it) if there is no index file yet,
+        or if the directory changed since the index was built (see 'is_up_to_date')
+
+        Args:
+            directoryPath (str): path to the directory to index
+            filePath_index (str | None, optional): path to the index file. Defaults to None (the index is only kept in memory).
+
+        Returns:
+            DirectoryIndex: the index of the directory
+        """
+        if filePath_index is not None and Path(filePath_index).is_file():
+            index = DirectoryIndex.load(filePath_index)
+            if index.root_path == os.path.abspath(directoryPath) and index.is_up_to_date():
+                return index
+
+        index = DirectoryIndex.build(directoryPath)
+        if filePath_index is not None:
+            index.save(filePath_index)
+        return index
+
+    def is_up_to_date(self) -> bool:
+        """Check that no file was added to or deleted from the indexed directory since the index was built, 
+        from the modification times of its directories (one 'stat' call per directory, not per file)
+
+        Returns:
+            bool: True if every indexed directory still exists, with the same modification time
+        """
+        if self.directories is None:
+            return False
+        for (relativePath, mtime) in self.directories.items():
+            try:
+                if os.stat(os.path.join(self.root_path, relativePath)).st_mtime != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def resolve(self, list_images: list[str]) -> dict[str, str]:
+        """Get the absolute paths of the images, checking in bulk they all exist in the index
+
+        Args:
+            list_images (list[str]): the list of image names (relative paths in the directory)
+
+        Raises:
+            FileNotFoundError: some images couldn't be found in the directory
+
+        Returns:
+            absolutePaths (dict[str, str]): key = image name, value = absolute path
+        """
+        missingImages = [image_name for image_name in list_images if image_name not in self.entries]
+        if len(missingImages) == 1:
+            raise FileNotFoundError(f"The image '{missingImages[0]}' couldn't be found in '{self.root_path}'.")
+        if len(missingImages) > 1:
+            raise FileNotFoundError(f"{len(missingImages)} images couldn't be found in '{self.root_path}' "
+                                    + f"(for example '{missingImages[0]}').")
+
+        return {image_name: os.path.join(self.root_path, image_name) for image_name in list_images}
+
+    def select(self, patterns: list[str]) -> list[str]:
+        """Select the files matching at least one glob pattern.
+        The patterns are matched against the relative paths with '/' separators,
+        and '*' also matches '/' (so '*.png' selects the PNG files of every sub-directory).
+
+        Args:
+            patterns (list[str]): the glob patterns (for example 'gp1/*.png', or '*.png')
+
+        Returns:
+            list[str]: the sorted list of matching relative paths (with the OS separator)
+        """
+        selectedFiles = []
+        for name in self.entries.keys():
+            posixName = Path(name).as_posix()
+            if any(fnmatchcase(posixName, pattern) for pattern in patterns):
+                selectedFiles.append(name)
+
+        selectedFiles.sort()
+        return selectedFiles
@@ -0,0 +1,160 @@
+import numpy as np
+from numpy import ndarray
+from ..classes.CoinData import CoinData
+from ..classes.CoinsFeatures import CoinsFeatures
+
+DEFAULT_BATCH_SIZE = 64
+"""Default number of images whose features are buffered before being flushed to the file"""
+
+FEATURE_COLUMNS = {
+    "image_name": np.str_,
+    "xCenter": np.float32,
+    "yCenter": np.float32,
+    "detectedRadius": np.float32,
+    "radius": np.float32,
+    "hInternal_mean": np.float64,
+    "hExternal_mean": np.float64,
+    "weighted_hue": np.float64,
+    "hue_hist": np.uint32
+}
+"""Columns of the per-coin feature table, and their types (hue_hist = the 180-bin hue histogram of the internal region)"""
+
+IMAGES_COLUMN = "images"
+"""Name of the column listing the images of each batch (including the images without any coin)"""
+
+
+class FeatureStore():
+    """Columnar store of the per-coin features on disk : the location of each coin (circle and refined radius),
+    and the hue features from which its type is decided. The coins can then be classified again
+    without detecting them (see 'RegressionAlgorithm1.get_coins_data_from_feature_store').
+
+    The file is a sequence of '.npy' arrays (same layout as the per-coin file of the ResultsWriter) : first the column names,
+    then for each batch one array per column, and the names of the images of the batch.
+    An image written again (for example when a run is resumed) replaces its previous features."""
+
+    filePath: str
+    """Path to the feature store file"""
+
+    batch_size: int | None
+    """Number of images whose features are buffered before being flushed (None = only flushed by the caller, 
+    for example at each checkpoint)"""
+
+    def __init__(self, filePath: str, batch_size: int | None = DEFAULT_BATCH_SIZE, append: bool = False):
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError(f"The batch size of the feature store must be strictly positive (got {batch_size}).")
+
+        self.filePath = filePath
+        self.batch_size = batch_size
+        self._bufferedImages = []
+        self._bufferedCoins = {column: [] for column in FEATURE_COLUMNS if column != "hue_hist"}
+        self._bufferedFeatures = []
+
+        self._file = open(filePath, "ab" if append else "wb")
+        if self._file.tell() == 0:
+            np.save(self._file, np.array(list(FEATURE_COLUMNS.keys())))
+
+    def __enter__(self) -> "FeatureStore":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, image_name: str, coinData_list: list[CoinData], features: CoinsFeatures):
+        """Add the features of the coins of an image (flushed to the file once a batch of images is complete)
+
+        Args:
+            image_name (str): the name of the image
+            coinData_list (list[CoinData]): the data of each coin of the image
+            features (CoinsFeatures): the hue features of each coin of the image
+        """
+        self._bufferedImages.append(image_name)
+        for coinData in coinData_list:
+            self._bufferedCoins["image_name"].append(image_name)
+            self._bufferedCoins["xCenter"].append(coinData.xCenter)
+            self._bufferedCoins["yCenter"].append(coinData.yCenter)
+            self._bufferedCoins["detectedRadius"].append(coinData.detectedRadius)
+            self._bufferedCoins["radius"].append(coinData.radius)
+        self._bufferedFeatures.append(features)
+
+        if self.batch_size is not None and len(self._bufferedImages) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered features to the file"""
+        if not self._bufferedImages:
+            return
+
+        features = CoinsFeatures.concatenate(self._bufferedFeatures)
+        columns = dict(self._bufferedCoins)
+        columns["hInternal_mean"] = features.hInternal_means
+        columns["hExternal_mean"] = features.hExternal_means
+        columns["weighted_hue"] = features.weighted_hues
+        columns["hue_hist"] = features.hue_hists
+        for (column, columnType) in FEATURE_COLUMNS.items():
+            np.save(self._file, np.asarray(columns[column], dtype=columnType), allow_pickle=False)
+        np.save(self._file, np.array(self._bufferedImages, dtype=np.str_), allow_pickle=False)
+        self._file.flush()
+
+        self._bufferedImages = []
+        self._bufferedCoins = {column: [] for column in FEATURE_COLUMNS if column != "hue_hist"}
+        self._bufferedFeatures = []
+
+    def close(self):
+        """Flush the remaining features, and close the file"""
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def read(filePath: str) -> tuple[list[str], dict[str, ndarray]]:
+        """Read a feature store
+
+        Args:
+            filePath (str): path to the feature store file
+
+        Raises:
+            FileNotFoundError: the file doesn't exist
+            ValueError: the file isn't a feature store
+
+        Returns:
+            images,_columns (tuple[list[str], dict[str, ndarray]]): the names of the images of the store (with or without coins),
+                    and the columns of the per-coin table (key = column name, value = the column for every coin).
+                    An image written in several batches only has the coins of its last batch.
+        """
+        try:
+            file = open(filePath, "rb")
+        except FileNotFoundError:
+            raise FileNotFoundError(f"The feature store '{filePath}' doesn't exist.")
+
+        with file:
+            columns = [str(column) for column in np.load(file)]
+            if columns != list(FEATURE_COLUMNS.keys()):
+                raise ValueError(f"The file '{filePath}' isn't a feature store (unknown columns).")
+
+            batches = {column: [] for column in columns + [IMAGES_COLUMN]}
+            while True:
+                try:
+                    for column in columns + [IMAGES_COLUMN]:
+                        batches[column].append(np.load(file))
+                except EOFError:
+                    break
+
+        # Only the last batch of each image is kept (the previous ones were written by an interrupted run)
+        lastBatchIndexes = {}
+        for (batchIndex, imagesArray) in enumerate(batches.pop(IMAGES_COLUMN)):
+            for image_name in imagesArray:
+                lastBatchIndexes[str(image_name)] = batchIndex
+        images = list(lastBatchIndexes.keys())
+        for batchIndex in range(len(batches["image_name"])):
+            isKept = np.array([lastBatchIndexes[str(image_name)] == batchIndex for image_name in batches["image_name"][batchIndex]],
+                              dtype=bool)
+            if not isKept.all():
+                for arrays in batches.values():
+                    arrays[batchIndex] = arrays[batchIndex][isKept]
+
+        columns = {column: (np.concatenate(arrays) if arrays else np.array([], dtype=FEATURE_COLUMNS[column]))
+                   for (column, arrays) in batches.items()}
+        if len(columns["hue_hist"]) == 0:
+            columns["hue_hist"] = columns["hue_hist"].reshape(0, 180)
+        return (images, columns)
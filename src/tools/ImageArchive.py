@@ -0,0 +1,180 @@
+import io
+import os
+import tarfile
+import threading
+import zipfile
+from datetime import datetime
+from typing import BinaryIO
+from .DirectoryIndex import DirectoryIndex
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+"""Extensions of the archives that can be given as the image collection"""
+
+
+class ImageArchive():
+    """Zip or tar archive used as the image collection : its members are indexed once when it's opened,
+    then read from the archive without being extracted (the paths of the members are the path of the archive
+    followed by the name of the member, for example 'dataset.zip/gp1/18.png').
+
+    The members of a zip archive, and of an uncompressed tar archive (by their offsets), can be read in any order,
+    and from several threads. The members of a compressed tar archive are read one at a time, through one decompression stream :
+    reading them in the order of the archive only decompresses it once."""
+
+    archive_path: str
+    """Absolute path to the archive"""
+
+    entries: dict[str, tuple[int, float]]
+    """key = name of the member (with the OS separator), value = tuple[size in bytes, modification time]"""
+
+    _openArchives: dict[str, "ImageArchive"] = {}
+    """The archives already opened, by absolute path (each archive is indexed only once)"""
+
+    _openArchivesLock = threading.Lock()
+    """Lock of the opened archives (the images are read from several threads)"""
+
+    def __init__(self, archive_path: str):
+        self.archive_path = os.path.abspath(archive_path)
+        self.entries = {}
+        self._members = {}
+        self._lock = threading.Lock()
+        self._zipFile = None
+        self._tarFile = None
+        self._fileDescriptor = None
+
+        if zipfile.is_zipfile(self.archive_path):
+            self._zipFile = zipfile.ZipFile(self.archive_path)
+            for info in self._zipFile.infolist():
+                if not info.is_dir():
+                    name = os.path.join(*info.filename.split("/"))
+                    self.entries[name] = (info.file_size, _get_zip_member_time(info))
+                    self._members[name] = info
+            return
+
+        try:
+            self._tarFile = tarfile.open(self.archive_path, "r:") # uncompressed : the members are read by their offsets
+            if hasattr(os, "pread"):
+                self._fileDescriptor = os.open(self.archive_path, os.O_RDONLY)
+        except tarfile.ReadError:
+            try:
+                self._tarFile = tarfile.open(self.archive_path, "r:*")
+            except tarfile.ReadError:
+                raise ValueError(f"The file '{archive_path}' isn't a zip or tar archive.")
+        for info in self._tarFile.getmembers():
+            if info.isfile():
+                name = os.path.join(*info.name.split("/"))
+                self.entries[name] = (info.size, float(info.mtime))
+                self._members[name] = info
+
+    def open(archive_path: str) -> "ImageArchive":
+        """Open an archive (indexed when it's opened for the first time, then reused)
+
+        Args:
+            archive_path (str): path to the archive
+
+        Raises:
+            FileNotFoundError: the archive doesn't exist
+            ValueError: the file isn't a zip or tar archive
+
+        Returns:
+            ImageArchive: the opened archive
+        """
+        absolutePath = os.path.abspath(archive_path)
+        with ImageArchive._openArchivesLock:
+            if absolutePath not in ImageArchive._openArchives:
+                if not os.path.isfile(absolutePath):
+                    raise FileNotFoundError(f"The archive '{archive_path}' doesn't exist.")
+                ImageArchive._openArchives[absolutePath] = ImageArchive(absolutePath)
+            return ImageArchive._openArchives[absolutePath]
+
+    def is_archive(path: str) -> bool:
+        """Check if a path is an archive that can be given as the image collection (from its extension)
+
+        Args:
+            path (str): the path
+
+        Returns:
+            bool: True if the path is a file with an archive extension
+        """
+        return path.lower().endswith(ARCHIVE_EXTENSIONS) and os.path.isfile(path)
+
+    def split_member_path(path: str) -> tuple["ImageArchive", str] | None:
+        """Find the archive containing a path, if the path is a member of an archive
+
+        Args:
+            path (str): the path (for example 'dataset.zip/gp1/18.png')
+
+        Returns:
+            tuple[ImageArchive, str] | None: the archive and the name of the member, or None if the path isn't in an archive
+        """
+        absolutePath = os.path.abspath(path)
+        archivePath = absolutePath
+        while True:
+            parentPath = os.path.dirname(archivePath)
+            if parentPath == archivePath:
+                return None
+            archivePath = parentPath
+            if ImageArchive.is_archive(archivePath):
+                return (ImageArchive.open(archivePath), os.path.relpath(absolutePath, archivePath))
+
+    def get_directory_index(self) -> DirectoryIndex:
+        """Get the index of the members of the archive, as the index of a directory
+
+        Returns:
+            DirectoryIndex: the index, whose root is the archive
+        """
+        return DirectoryIndex(self.archive_path, dict(self.entries))
+
+    def read_member(self, name: str) -> bytes:
+        """Read the content of a member of the archive
+
+        Args:
+            name (str): the name of the member (with the OS separator)
+
+        Raises:
+            FileNotFoundError: the member isn't in the archive
+
+        Returns:
+            bytes: the content of the member
+        """
+        info = self._members.get(name)
+        if info is None:
+            raise FileNotFoundError(f"The file '{name}' isn't in the archive '{self.archive_path}'.")
+
+        if self._zipFile is not None:
+            return self._zipFile.read(info) # the zip file handles the reads of several threads
+        if self._fileDescriptor is not None:
+            return os.pread(self._fileDescriptor, info.size, info.offset_data)
+        with self._lock: # one stream (of decompression) : the members are read one at a time
+            with self._tarFile.extractfile(info) as file:
+                return file.read()
+
+    def open_member(self, name: str) -> BinaryIO:
+        """Open a member of the archive, to read only its beginning (for example its header)
+
+        Args:
+            name (str): the name of the member (with the OS separator)
+
+        Raises:
+            FileNotFoundError: the member isn't in the archive
+
+        Returns:
+            BinaryIO: the member, opened in binary mode
+        """
+        if self._zipFile is not None and name in self._members:
+            return self._zipFile.open(self._members[name]) # decompressed on the fly
+        return io.BytesIO(self.read_member(name))
+
+
+def _get_zip_member_time(info: zipfile.ZipInfo) -> float:
+    """Get the modification time of a member of a zip archive
+
+    Args:
+        info (zipfile.ZipInfo): the member
+
+    Returns:
+        float: the modification time (timestamp), 0 if the archive has an invalid date for this member
+    """
+    try:
+        return datetime(*info.date_time).timestamp()
+    except ValueError:
+        return 0.0
@@ -0,0 +1,91 @@
+import struct
+from typing import BinaryIO
+
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+"""JPEG markers of the start-of-frame segments (containing the dimensions of the image)"""
+
+JPEG_MARKERS_WITHOUT_LENGTH = set(range(0xD0, 0xDA)) | {0x01}
+"""JPEG markers not followed by a segment length (restart markers, start and end of image, TEM)"""
+
+
+def get_image_dimensions(file: BinaryIO) -> tuple[int, int] | None:
+    """Get the dimensions of an image from the header of its file, without decoding it (PNG, JPEG and WebP)
+
+    Args:
+        file (BinaryIO): the image file, opened in binary mode at its start
+
+    Returns:
+        tuple[int, int] | None: the width and the height of the image (before any EXIF rotation),
+                or None if the format isn't supported or the header is invalid
+    """
+    signature = file.read(12)
+    try:
+        if signature.startswith(b"\x89PNG\r\n\x1a\n"):
+            return _get_png_dimensions(signature + file.read(12))
+        if signature.startswith(b"\xff\xd8"):
+            return _get_jpeg_dimensions(file, signature[2:])
+        if signature.startswith(b"RIFF") and signature[8:12] == b"WEBP":
+            return _get_webp_dimensions(signature + file.read(18))
+    except struct.error:
+        pass # truncated header
+    return None
+
+
+def _get_png_dimensions(header: bytes) -> tuple[int, int] | None:
+    """Get the dimensions of a PNG image, from its first 24 bytes (signature, then the IHDR chunk)"""
+    if header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+def _get_jpeg_dimensions(file: BinaryIO, buffer: bytes) -> tuple[int, int] | None:
+    """Get the dimensions of a JPEG image, by skipping its segments up to the start-of-frame segment
+
+    Args:
+        file (BinaryIO): the image file, after the start-of-image marker and the bytes of the buffer
+        buffer (bytes): the bytes already read after the start-of-image marker
+
+    Returns:
+        tuple[int, int] | None: the width and the height of the image, or None if there is no start-of-frame segment
+    """
+    def read(nbBytes: int) -> bytes:
+        nonlocal buffer
+        if len(buffer) < nbBytes:
+            buffer += file.read(nbBytes - len(buffer))
+        (data, buffer) = (buffer[:nbBytes], buffer[nbBytes:])
+        if len(data) < nbBytes:
+            raise struct.error("truncated JPEG header")
+        return data
+
+    while True:
+        if read(1) != b"\xff":
+            return None
+        marker = read(1)[0]
+        while marker == 0xFF: # fill bytes
+            marker = read(1)[0]
+
+        if marker in JPEG_MARKERS_WITHOUT_LENGTH:
+            if marker == 0xD9: # end of image
+                return None
+            continue
+        (length,) = struct.unpack(">H", read(2))
+        if marker in JPEG_SOF_MARKERS:
+            (_, height, width) = struct.unpack(">BHH", read(5))
+            return (width, height)
+        read(length - 2)
+
+def _get_webp_dimensions(header: bytes) -> tuple[int, int] | None:
+    """Get the dimensions of a WebP image, from its first 30 bytes (RIFF header, then the first chunk)"""
+    match header[12:16]:
+        case b"VP8 ": # lossy
+            if header[23:26] != b"\x9d\x01\x2a":
+                return None
+            (width, height) = struct.unpack("<HH", header[26:30])
+            return (width & 0x3FFF, height & 0x3FFF)
+        case b"VP8L": # lossless
+            (bits,) = struct.unpack("<I", header[21:25])
+            return (1 + (bits & 0x3FFF), 1 + ((bits >> 14) & 0x3FFF))
+        case b"VP8X": # extended
+            width = 1 + int.from_bytes(header[24:27], "little")
+            height = 1 + int.from_bytes(header[27:30], "little")
+            return (width, height)
+    return None
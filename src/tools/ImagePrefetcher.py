@@ -0,0 +1,126 @@
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from numpy import ndarray
+from .ImageReader import ImageReader
+
+DEFAULT_QUEUE_DEPTH = 4
+"""Default number of images read and decoded in advance"""
+
+DEFAULT_MAX_BYTES = 1024**3
+"""Default memory ceiling (in bytes) for the decoded images waiting in the queue"""
+
+
+class ImagePrefetcher():
+    """Read and decode the next images in background threads, while the current image is processed.
+
+    The images are given back in the same order as their paths.
+    The prefetch stage is bounded by a queue depth (number of images read in advance)
+    and by a memory ceiling (bytes of decoded images held in the queue)."""
+
+    image_paths: list[str]
+    """The paths of the images to read, in order"""
+
+    queue_depth: int
+    """The maximum number of images read and decoded in advance (0 = no prefetch)"""
+
+    max_bytes: int
+    """The memory ceiling, in bytes, of the decoded images held in the queue"""
+
+    read_image: Callable[[str], ndarray | None]
+    """The function reading and decoding an image from its path (None for an image that doesn't need to be decoded)"""
+
+    def __init__(self, image_paths: list[str], queue_depth: int = DEFAULT_QUEUE_DEPTH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 read_image: Callable[[str], ndarray | None] = ImageReader.read_image_from_path):
+        if queue_depth < 0:
+            raise ValueError(f"The prefetch queue depth must be positive (got {queue_depth}).")
+        if max_bytes <= 0:
+            raise ValueError(f"The prefetch memory ceiling must be strictly positive (got {max_bytes}).")
+
+        self.image_paths = image_paths
+        self.queue_depth = queue_depth
+        self.max_bytes = max_bytes
+        self.read_image = read_image
+        self._nbImagesRead = 0
+        self._totalBytesRead = 0
+
+    def __iter__(self) -> Iterator[tuple[str, ndarray | None]]:
+        """Iterate over the decoded images, in the order of the paths
+
+        Raises:
+            Exception: an image couldn't be read (raised when this image is reached)
+
+        Yields:
+            img_path,_img (tuple[str, ndarray | None]): the path of the image, and the decoded image (None if it wasn't decoded)
+        """
+        if self.queue_depth == 0:
+            for img_path in self.image_paths:
+                yield (img_path, self.read_image(img_path))
+            return
+
+        pending = deque()
+        nextIndex = 0
+        executor = ThreadPoolExecutor(max_workers=self.queue_depth, thread_name_prefix="image_prefetch")
+        try:
+            while nextIndex < len(self.image_paths) or pending:
+                # Fill the queue, as long as the depth and the memory ceiling allow it
+                #   (at least one image is always in the queue, whatever its size)
+                while (nextIndex < len(self.image_paths) and len(pending) < self.queue_depth
+                       and (not pending or self._can_prefetch_another_image(pending))):
+                    img_path = self.image_paths[nextIndex]
+                    pending.append((img_path, executor.submit(self.read_image, img_path)))
+                    nextIndex += 1
+
+                (img_path, future) = pending.popleft()
+                img = future.result()
+                if img is not None:
+                    self._nbImagesRead += 1
+                    self._totalBytesRead += img.nbytes
+                yield (img_path, img)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _can_prefetch_another_image(self, pending: deque[tuple[str, Future]]) -> bool:
+        """Check if another image can be added to the queue without exceeding the memory ceiling
+
+        Args:
+            pending (deque[tuple[str, Future]]): the images already in the queue (read or being read)
+
+        Returns:
+            bool: True if another image can be prefetched
+        """
+        # Until an image is decoded, its size is unknown : only one image is read at a time
+        if self._nbImagesRead == 0 and not any(future.done() for (_, future) in pending):
+            return False
+
+        expectedBytes = self._get_expected_image_bytes(pending)
+        bytesInQueue = 0
+        for (_, future) in pending:
+            if future.done() and future.exception() is None:
+                bytesInQueue += _get_image_bytes(future.result())
+            else:
+                bytesInQueue += expectedBytes
+
+        return bytesInQueue + expectedBytes <= self.max_bytes
+
+    def _get_expected_image_bytes(self, pending: deque[tuple[str, Future]]) -> int:
+        """Estimate the size of a decoded image, from the mean size of the images already decoded
+
+        Args:
+            pending (deque[tuple[str, Future]]): the images already in the queue (read or being read)
+
+        Returns:
+            int: the expected size (in bytes) of the next decoded image
+        """
+        nbImages = self._nbImagesRead
+        totalBytes = self._totalBytesRead
+        for (_, future) in pending:
+            if future.done() and future.exception() is None and future.result() is not None:
+                nbImages += 1
+                totalBytes += future.result().nbytes
+        return totalBytes // nbImages if nbImages > 0 else 0
+
+
+def _get_image_bytes(img: ndarray | None) -> int:
+    """Get the size (in bytes) of a decoded image in the queue (0 for an image that wasn't decoded)"""
+    return img.nbytes if img is not None else 0
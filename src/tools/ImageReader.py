@@ -0,0 +1,125 @@
+import os
+from typing import BinaryIO
+import numpy as np
+from numpy import ndarray
+import cv2 as cv
+from .ImageArchive import ImageArchive
+from .ImageHeader import get_image_dimensions
+
+REDUCED_GRAYSCALE_FLAGS = {8: cv.IMREAD_REDUCED_GRAYSCALE_8, 4: cv.IMREAD_REDUCED_GRAYSCALE_4, 2: cv.IMREAD_REDUCED_GRAYSCALE_2}
+"""key = reduction factor, value = flag decoding an image at a reduced resolution and in gray-scale
+(for JPEG images, the decoder skips the high frequencies and the color channels ; the other formats are decoded at full resolution,
+then reduced)"""
+
+class ImageReader():
+    """Class with the methods reading and decoding the images to evaluate"""
+
+    def read_image_from_path(img_path: str) -> ndarray:
+        """Read and decode an image from its path (a file, or a member of a zip or tar archive)
+
+        Args:
+            img_path (str): the path to the image
+
+        Raises:
+            Exception: couldn't read the image
+
+        Returns:
+            img (ndarray): the decoded image (BGR)
+        """
+        archiveMember = ImageArchive.split_member_path(img_path)
+        if archiveMember is None:
+            img = cv.imread(img_path)
+        else:
+            (archive, name) = archiveMember
+            img = cv.imdecode(np.frombuffer(archive.read_member(name), dtype=np.uint8), cv.IMREAD_COLOR)
+        if img is None:
+            raise Exception(f"The file '{img_path}' couldn't be read as an image.")
+        return img
+
+    def read_reduced_gray_image_from_path(img_path: str, shortest_side_length: int) -> ndarray:
+        """Read and decode an image in gray-scale, at the most reduced resolution (1/2, 1/4 or 1/8) keeping its shortest side
+        at least as long as the given length. Only the JPEG decoder skips the full-resolution pixels (it decodes the reduced image 
+        directly) : the other formats (PNG, WebP...) are decoded at full resolution by OpenCV, then reduced.
+
+        Args:
+            img_path (str): the path to the image (a file, or a member of a zip or tar archive)
+            shortest_side_length (int): the minimal length of the shortest side of the decoded image
+
+        Raises:
+            Exception: couldn't read the image
+
+        Returns:
+            img (ndarray): the decoded image (gray-scale), at its original resolution if its dimensions can't be read from its header
+        """
+        with ImageReader.open_image_file(img_path) as file:
+            dimensions = get_image_dimensions(file)
+
+        flag = cv.IMREAD_GRAYSCALE
+        if dimensions is not None:
+            for (factor, reducedFlag) in REDUCED_GRAYSCALE_FLAGS.items():
+                if min(dimensions) // factor >= shortest_side_length:
+                    flag = reducedFlag
+                    break
+
+        archiveMember = ImageArchive.split_member_path(img_path)
+        if archiveMember is None:
+            img = cv.imread(img_path, flag)
+        else:
+            (archive, name) = archiveMember
+            img = cv.imdecode(np.frombuffer(archive.read_member(name), dtype=np.uint8), flag)
+        if img is None:
+            raise Exception(f"The file '{img_path}' couldn't be read as an image.")
+        return img
+
+    def read_image_file(img_path: str) -> bytes:
+        """Read the (encoded) content of an image file
+
+        Args:
+            img_path (str): the path to the image (a file, or a member of a zip or tar archive)
+
+        Returns:
+            bytes: the content of the file
+        """
+        archiveMember = ImageArchive.split_member_path(img_path)
+        if archiveMember is None:
+            with open(img_path, "rb") as file:
+                return file.read()
+        (archive, name) = archiveMember
+        return archive.read_member(name)
+
+    def open_image_file(img_path: str) -> BinaryIO:
+        """Open an image file in binary mode, to read only its beginning (for example its header)
+
+        Args:
+            img_path (str): the path to the image (a file, or a member of a zip or tar archive)
+
+        Returns:
+            BinaryIO: the opened file
+        """
+        archiveMember = ImageArchive.split_member_path(img_path)
+        if archiveMember is None:
+            return open(img_path, "rb")
+        (archive, name) = archiveMember
+        return archive.open_member(name)
+
+    def get_image_file_info(img_path: str) -> tuple[int, int]:
+        """Get the size and the modification time of an image file, to detect its changes
+
+        Args:
+            img_path (str): the path to the image (a file, or a member of a zip or tar archive)
+
+        Raises:
+            FileNotFoundError: the image doesn't exist
+
+        Returns:
+            size,_mtime_ns (tuple[int, int]): the size in bytes, and the modification time in nanoseconds
+        """
+        archiveMember = ImageArchive.split_member_path(img_path)
+        if archiveMember is None:
+            fileStat = os.stat(img_path)
+            return (fileStat.st_size, fileStat.st_mtime_ns)
+        (archive, name) = archiveMember
+        if name not in archive.entries:
+            raise FileNotFoundError(f"The file '{name}' isn't in the archive '{archive.archive_path}'.")
+        (size, mtime) = archive.entries[name]
+        return (size, int(mtime * 1e9))
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import numpy as np
+from numpy import ndarray
+
+from .ImageReader import ImageReader
+from ..classes.ImageData import ImageData
+from ..regression.DetectCoinsForm import _resize_lowest_side_of_image
+from ..regression.Presets import get_active_preset
+
+STORE_VERSION = 1
+"""Version of the image store format"""
+
+INDEX_FILE_NAME = "index.json"
+"""Name of the index file of the store (image name -> source hash, offsets and shapes of the levels)"""
+
+DATA_FILE_NAME = "images.raw"
+"""Name of the data file of the store (the raw uint8 pixels of every level of every image, one after the other)"""
+
+LEVEL_FULL = "full"
+"""Level of the store : the decoded image, at its original resolution"""
+
+LEVEL_DETECTION = "detection"
+"""Level of the store : the image resized at the detection resolution of the active preset (see '_resize_lowest_side_of_image')"""
+
+LEVEL_ALIGNMENT = 64
+"""The levels are written at offsets aligned on this number of bytes"""
+
+
+class ImageStore():
+    """Store of decoded images, filled once by the 'ingest' command : the raw pixels of each image, and of the image already resized
+    at the detection resolution, are written in one data file, and read back with a memory map (no decoding, and only the pages
+    actually used are read from the disk).
+
+    The index maps each image name to the hash, size and modification time of its source file, and to the offset and shape
+    of each level in the data file. A level is only used while the source file is unchanged (same size and modification time) :
+    otherwise the image is decoded from its source file, as without a store."""
+
+    directoryPath: str
+    """Path to the directory of the store"""
+
+    entries: dict[str, dict]
+    """key = image name, value = {"source": [sha1, size, modification time in ns], "levels": {level: [offset, shape]}}"""
+
+    detection_shortest_side_length: int
+    """Length of the shortest side of the detection level of the images in the store"""
+
+    def __init__(self, directoryPath: str, create: bool = False):
+        """Open a store
+
+        Args:
+            directoryPath (str): path to the directory of the store
+            create (bool, optional): create the store if it doesn't exist (to ingest images). Defaults to False.
+
+        Raises:
+            FileNotFoundError: the store doesn't exist (and isn't created)
+            ValueError: the directory isn't a valid image store
+        """
+        self.directoryPath = directoryPath
+        self.entries = {}
+        self.detection_shortest_side_length = get_active_preset().shortest_side_length
+        self._data = None
+
+        indexPath = os.path.join(directoryPath, INDEX_FILE_NAME)
+        try:
+            with open(indexPath) as file:
+                content = json.load(file)
+        except FileNotFoundError:
+            if not create:
+                raise FileNotFoundError(f"The image store '{directoryPath}' doesn't exist (use the 'ingest' command to create it).")
+            os.makedirs(directoryPath, exist_ok=True)
+            return
+        except json.JSONDecodeError:
+            raise ValueError(f"The directory '{directoryPath}' isn't a valid image store (invalid index).")
+
+        if content.get("version") != STORE_VERSION:
+            raise ValueError(f"The directory '{directoryPath}' isn't a valid image store (unknown version).")
+        self.entries = content["entries"]
+        self.detection_shortest_side_length = content["detection_shortest_side_length"]
+
+    def ingest(self, image_data: list[ImageData], printProgress: bool = False) -> tuple[int, int]:
+        """Decode the images that aren't in the store yet (or whose source file changed), and add their levels to the store.
+        An image whose source file only changed of modification time (same hash) isn't decoded again.
+
+        Args:
+            image_data (list[ImageData]): the data of the images to ingest
+            printProgress (bool, optional): print each image decoded. Defaults to False.
+
+        Raises:
+            Exception: an image couldn't be read
+
+        Returns:
+            nbDecoded,_nbReused (tuple[int, int]): the number of images decoded and added to the store,
+                    and the number of images already in the store
+        """
+        nbDecoded = 0
+        nbReused = 0
+        self._close_data()
+
+        # The levels of an image produced with another detection resolution (another preset) are ingested again
+        shortestSideLength = get_active_preset().shortest_side_length
+        if self.detection_shortest_side_length != shortestSideLength:
+            self.entries = {}
+            self.detection_shortest_side_length = shortestSideLength
+            open(os.path.join(self.directoryPath, DATA_FILE_NAME), "wb").close()
+
+        try:
+            with open(os.path.join(self.directoryPath, DATA_FILE_NAME), "ab") as dataFile:
+                for data in image_data:
+                    (size, mtime_ns) = ImageReader.get_image_file_info(data.image_path)
+                    source = [hashlib.sha1(ImageReader.read_image_file(data.image_path)).hexdigest(), size, mtime_ns]
+
+                    entry = self.entries.get(data.name)
+                    if entry is not None and entry["source"][0] == source[0]:
+                        entry["source"] = source
+                        nbReused += 1
+                        continue
+
+                    img = ImageReader.read_image_from_path(data.image_path)
+                    levels = {LEVEL_FULL: img, LEVEL_DETECTION: _resize_lowest_side_of_image(img, shortestSideLength)}
+                    entry = {"source": source, "levels": {}}
+                    for (level, levelImage) in levels.items():
+                        dataFile.write(b"\0" * (-dataFile.tell() % LEVEL_ALIGNMENT))
+                        entry["levels"][level] = [dataFile.tell(), list(levelImage.shape)]
+                        dataFile.write(np.ascontiguousarray(levelImage, dtype=np.uint8).tobytes())
+                    self.entries[data.name] = entry
+                    nbDecoded += 1
+                    if printProgress: print(f"{data.name} : ingested ({img.shape[1]}x{img.shape[0]})")
+        finally:
+            # The index only refers to the levels completely written
+            self._save_index()
+
+        return (nbDecoded, nbReused)
+
+    def read_image(self, name: str, img_path: str) -> ndarray:
+        """Get a decoded image : from the store (a copy-on-write memory map, so the image can be modified),
+        or decoded from its source file if it isn't in the store (or if its source file changed)
+
+        Args:
+            name (str): the name of the image
+            img_path (str): the path to the source file of the image
+
+        Raises:
+            Exception: the image isn't in the store, and its source file couldn't be read
+
+        Returns:
+            img (ndarray): the decoded image (BGR)
+        """
+        img = self._read_level(name, img_path, LEVEL_FULL)
+        return img if img is not None else ImageReader.read_image_from_path(img_path)
+
+    def read_detection_level(self, name: str, img_path: str) -> ndarray | None:
+        """Get an image already resized at the detection resolution, from the store
+
+        Args:
+            name (str): the name of the image
+            img_path (str): the path to the source file of the image
+
+        Returns:
+            ndarray | None: the resized image (copy-on-write memory map), or None if it isn't in the store, its source file changed,
+                    or the store was ingested with another detection resolution (another preset)
+        """
+        if self.detection_shortest_side_length != get_active_preset().shortest_side_length:
+            return None
+        return self._read_level(name, img_path, LEVEL_DETECTION)
+
+    def _read_level(self, name: str, img_path: str, level: str) -> ndarray | None:
+        """Get a level of an image from the store
+
+        Args:
+            name (str): the name of the image
+            img_path (str): the path to the source file of the image
+            level (str): the level (LEVEL_FULL or LEVEL_DETECTION)
+
+        Returns:
+            ndarray | None: the level of the image, or None if it isn't in the store or its source file changed
+        """
+        entry = self.entries.get(name)
+        if entry is None or level not in entry["levels"]:
+            return None
+        try:
+            (size, mtime_ns) = ImageReader.get_image_file_info(img_path)
+        except FileNotFoundError:
+            return None
+        if [size, mtime_ns] != entry["source"][1:]:
+            return None
+
+        if self._data is None:
+            # The whole data file is mapped once : each level is a view on the mapping
+            self._data = np.memmap(os.path.join(self.directoryPath, DATA_FILE_NAME), dtype=np.uint8, mode="c")
+        (offset, shape) = entry["levels"][level]
+        return self._data[offset:offset + int(np.prod(shape))].reshape(shape)
+
+    def _save_index(self):
+        """Save the index of the store (replaced atomically)"""
+        content = {
+            "version": STORE_VERSION,
+            "detection_shortest_side_length": self.detection_shortest_side_length,
+            "entries": self.entries
+        }
+        indexPath = os.path.join(self.directoryPath, INDEX_FILE_NAME)
+        temporaryPath = indexPath + ".tmp"
+        with open(temporaryPath, "w") as file:
+            json.dump(content, file)
+        os.replace(temporaryPath, indexPath)
+
+    def _close_data(self):
+        """Close the memory map of the data file (before it is modified)"""
+        self._data = None
+
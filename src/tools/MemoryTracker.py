@@ -0,0 +1,88 @@
+import os
+import sys
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+try:
+    import resource
+except ImportError:
+    resource = None # not available on Windows
+
+
+class MemoryTracker():
+    """Tracker of the memory of the named stages of the algorithm, image by image : the peak of the bytes allocated during each stage
+    (with tracemalloc, which also sees the numpy arrays, including the images returned by OpenCV), and the variation of the
+    resident memory of the process (RSS, from the counters of the OS).
+
+    The allocations of every thread are traced : the images shouldn't be decoded in background threads meanwhile."""
+
+    image_memory: dict[str, tuple[int, int]]
+    """Memory of the stages of the current image : key = name of the stage, value = tuple[peak allocated bytes, RSS delta in bytes]"""
+
+    def __init__(self):
+        self.image_memory = {}
+        self._startedTracing = not tracemalloc.is_tracing()
+        if self._startedTracing:
+            tracemalloc.start()
+
+    def __enter__(self) -> "MemoryTracker":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start_image(self):
+        """Start tracking the stages of a new image"""
+        self.image_memory = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Context of a stage of the algorithm : its peak of allocated bytes (above the bytes allocated before the stage)
+        and its RSS delta are recorded in 'image_memory'
+
+        Args:
+            name (str): the name of the stage
+        """
+        tracemalloc.reset_peak()
+        (startingAllocated, _) = tracemalloc.get_traced_memory()
+        startingRss = get_rss()
+        try:
+            yield
+        finally:
+            (_, peakAllocated) = tracemalloc.get_traced_memory()
+            self.image_memory[name] = (peakAllocated - startingAllocated, get_rss() - startingRss)
+
+    def close(self):
+        """Stop tracing the allocations (if the tracing was started by this tracker)"""
+        if self._startedTracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._startedTracing = False
+
+
+def get_rss() -> int:
+    """Get the resident memory of the process (RSS)
+
+    Returns:
+        int: the resident memory in bytes (on the systems without '/proc', the peak resident memory ; 0 if unknown)
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0
+    maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxRss if sys.platform == "darwin" else maxRss * 1024 # in bytes on macOS, in kibibytes otherwise
+
+
+def format_bytes(nbBytes: int) -> str:
+    """Format a number of bytes, in mebibytes
+
+    Args:
+        nbBytes (int): the number of bytes (negative for a decrease)
+
+    Returns:
+        str: the formatted number (for example '12.3 MiB')
+    """
+    return "{:.1f} MiB".format(nbBytes / 1024**2)
@@ -0,0 +1,299 @@
+import csv
+import json
+import math
+import os
+import numpy as np
+from numpy import ndarray
+from ..classes.CoinData import CoinData
+from ..classes.ResultsToEvaluate import ResultsToEvaluate
+
+DEFAULT_BATCH_SIZE = 64
+"""Default number of images whose results are buffered before being flushed to the files"""
+
+RESULTS_COLUMNS = ["image_name", "nbCoins_predicted", "nbCoins_groundTruth",
+                   "totalMonetaryValue_predicted", "totalMonetaryValue_groundTruth", "usedFallback", "time"]
+"""Columns of the per-image results (JSONL keys or CSV header). A missing value (NaN) is written as null in JSONL,
+and as an empty cell in CSV"""
+
+MEMORY_COLUMNS = ["peakBytes_{}", "rssDeltaBytes_{}"]
+"""Columns of the memory of each stage, added to the per-image results when the memory is tracked (formatted with the stage name)"""
+
+COIN_DETAILS_COLUMNS = {
+    "image_name": np.str_,
+    "coin_index": np.int16,
+    "xCenter": np.float32,
+    "yCenter": np.float32,
+    "detectedRadius": np.float32,
+    "radius": np.float32,
+    "coinType": np.int8,
+    "value": np.float32
+}
+"""Columns of the per-coin detail table, and their types
+(coinType = value of the CoinType enumeration, 0 if undecided ; value = monetary value, NaN if undecided)"""
+
+
+class ResultsWriter():
+    """Results sink streaming machine-readable results : one record per image (JSONL or CSV),
+    and optionally a per-coin detail table in a compact binary columnar file.
+    The results are buffered, and flushed to the files in batches of images.
+
+    The per-coin file is a sequence of '.npy' arrays : first the column names,
+    then for each batch one array per column (see 'read_coin_details')."""
+
+    filePath_results: str | None
+    """Path to the per-image results file ('.csv' for CSV, JSONL otherwise), or None"""
+
+    filePath_coinDetails: str | None
+    """Path to the per-coin detail file, or None"""
+
+    batch_size: int | None
+    """Number of images whose results are buffered before being flushed (None = only flushed by the caller, 
+    for example at each checkpoint)"""
+
+    memory_stages: list[str] | None
+    """Stages whose memory (peak allocated bytes and RSS delta) is added to the per-image results, or None"""
+
+    def __init__(self, filePath_results: str | None, filePath_coinDetails: str | None = None,
+                 batch_size: int | None = DEFAULT_BATCH_SIZE, append: bool = False, memory_stages: list[str] | None = None):
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError(f"The batch size of the results writer must be strictly positive (got {batch_size}).")
+
+        self.filePath_results = filePath_results
+        self.filePath_coinDetails = filePath_coinDetails
+        self.batch_size = batch_size
+        self.memory_stages = memory_stages
+        self._columns = RESULTS_COLUMNS + [column.format(stage) for stage in (memory_stages or []) for column in MEMORY_COLUMNS]
+        self._isCsv = filePath_results is not None and filePath_results.lower().endswith(".csv")
+
+        self._bufferedResults = []
+        self._bufferedCoins = {column: [] for column in COIN_DETAILS_COLUMNS}
+        self._nbBufferedImages = 0
+
+        mode = "a" if append else "w"
+        self._resultsFile = open(filePath_results, mode, newline="") if filePath_results is not None else None
+        if self._isCsv:
+            self._csvWriter = csv.writer(self._resultsFile)
+            if self._resultsFile.tell() == 0:
+                self._csvWriter.writerow(self._columns)
+
+        self._coinDetailsFile = open(filePath_coinDetails, mode + "b") if filePath_coinDetails is not None else None
+        if self._coinDetailsFile is not None and self._coinDetailsFile.tell() == 0:
+            np.save(self._coinDetailsFile, np.array(list(COIN_DETAILS_COLUMNS.keys())))
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, result: ResultsToEvaluate, coinData_list: list[CoinData] | None = None, timeDuration: float | None = None,
+              memory: dict[str, tuple[int, int]] | None = None):
+        """Add the results of an image (flushed to the files once a batch of images is complete)
+
+        Args:
+            result (ResultsToEvaluate): the prediction and ground truth of the image
+            coinData_list (list[CoinData] | None, optional): the data of each coin detected in the image. Defaults to None.
+            timeDuration (float | None, optional): the time spent on the image, in seconds. Defaults to None.
+            memory (dict[str, tuple[int, int]] | None, optional): the peak allocated bytes and the RSS delta of each stage 
+                    (see MemoryTracker.image_memory). Defaults to None.
+        """
+        record = result.to_dict()
+        record["time"] = timeDuration
+        for stage in (self.memory_stages or []):
+            (peakBytes, rssDeltaBytes) = memory[stage] if memory is not None and stage in memory else (None, None)
+            record[MEMORY_COLUMNS[0].format(stage)] = peakBytes
+            record[MEMORY_COLUMNS[1].format(stage)] = rssDeltaBytes
+        self._bufferedResults.append(record)
+
+        for (coinIndex, coinData) in enumerate(coinData_list or []):
+            self._bufferedCoins["image_name"].append(result.image_name)
+            self._bufferedCoins["coin_index"].append(coinIndex)
+            self._bufferedCoins["xCenter"].append(coinData.xCenter)
+            self._bufferedCoins["yCenter"].append(coinData.yCenter)
+            self._bufferedCoins["detectedRadius"].append(coinData.detectedRadius)
+            self._bufferedCoins["radius"].append(coinData.radius)
+            self._bufferedCoins["coinType"].append(coinData.coinType.value if coinData.coinType is not None else 0)
+            self._bufferedCoins["value"].append(coinData.value.value if coinData.value is not None else math.nan)
+
+        self._nbBufferedImages += 1
+        if self.batch_size is not None and self._nbBufferedImages >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered results to the files"""
+        if self._resultsFile is not None and self._bufferedResults:
+            records = [{column: _get_missing_as_none(value) for (column, value) in record.items()} for record in self._bufferedResults]
+            if self._isCsv:
+                self._csvWriter.writerows([["" if record[column] is None else record[column] for column in self._columns] 
+                                           for record in records])
+            else:
+                # Strict JSON (no NaN nor Infinity constants), readable by any JSON parser
+                self._resultsFile.write("".join(json.dumps(record, allow_nan=False) + "\n" for record in records))
+            self._resultsFile.flush()
+
+        if self._coinDetailsFile is not None and self._nbBufferedImages > 0:
+            for (column, columnType) in COIN_DETAILS_COLUMNS.items():
+                np.save(self._coinDetailsFile, np.array(self._bufferedCoins[column], dtype=columnType), allow_pickle=False)
+            self._coinDetailsFile.flush()
+
+        self._bufferedResults = []
+        self._bufferedCoins = {column: [] for column in COIN_DETAILS_COLUMNS}
+        self._nbBufferedImages = 0
+
+    def close(self):
+        """Flush the remaining results, and close the files"""
+        self.flush()
+        if self._resultsFile is not None:
+            self._resultsFile.close()
+            self._resultsFile = None
+        if self._coinDetailsFile is not None:
+            self._coinDetailsFile.close()
+            self._coinDetailsFile = None
+
+    def get_file_sizes(self) -> dict[str, int]:
+        """Get the sizes of the files, once flushed (to restore them later with 'truncate_files')
+
+        Returns:
+            dict[str, int]: key = path to a file of the writer, value = its size in bytes
+        """
+        self.flush()
+        fileSizes = {}
+        if self._resultsFile is not None:
+            fileSizes[self.filePath_results] = self._resultsFile.tell()
+        if self._coinDetailsFile is not None:
+            fileSizes[self.filePath_coinDetails] = self._coinDetailsFile.tell()
+        return fileSizes
+
+    def truncate_files(fileSizes: dict[str, int]):
+        """Truncate the files of a results writer to sizes they had (see 'get_file_sizes') : the rows written after are removed
+
+        Args:
+            fileSizes (dict[str, int]): key = path to a file, value = the size in bytes to restore (a smaller file is left unchanged)
+        """
+        for (filePath, size) in fileSizes.items():
+            if os.path.isfile(filePath) and os.path.getsize(filePath) > size:
+                os.truncate(filePath, size)
+
+    def keep_only_images(filePath_results: str | None, filePath_coinDetails: str | None, image_names: set[str]):
+        """Rewrite the files of a results writer with only the rows of some images, each image once (its first rows) : 
+        before resuming a run, the rows written after the last checkpoint (the images processed again) are removed
+
+        Args:
+            filePath_results (str | None): path to the per-image results file, or None
+            filePath_coinDetails (str | None): path to the per-coin detail file, or None
+            image_names (set[str]): the names of the kept images (the images completed according to the checkpoint log)
+        """
+        if filePath_results is not None and os.path.isfile(filePath_results):
+            with open(filePath_results, newline="") as file:
+                lines = file.readlines()
+            isCsv = filePath_results.lower().endswith(".csv")
+            keptLines = lines[:1] if isCsv else []
+            seenImages = set()
+            for line in (lines[1:] if isCsv else lines):
+                if line.strip() == "":
+                    continue
+                image_name = next(csv.reader([line]))[0] if isCsv else json.loads(line)["image_name"]
+                if image_name in image_names and image_name not in seenImages:
+                    seenImages.add(image_name)
+                    keptLines.append(line)
+            _replace_file(filePath_results, lambda file: file.writelines(keptLines), binary=False)
+
+        if filePath_coinDetails is not None and os.path.isfile(filePath_coinDetails):
+            columns = ResultsWriter.read_coin_details(filePath_coinDetails)
+            isKept = np.zeros(len(columns["image_name"]), dtype=bool)
+            seenCoins = set()
+            for (i, (image_name, coinIndex)) in enumerate(zip(columns["image_name"].tolist(), columns["coin_index"].tolist())):
+                if image_name in image_names and (image_name, coinIndex) not in seenCoins:
+                    seenCoins.add((image_name, coinIndex))
+                    isKept[i] = True
+
+            def write_coin_details(file):
+                np.save(file, np.array(list(COIN_DETAILS_COLUMNS.keys())))
+                for (column, columnType) in COIN_DETAILS_COLUMNS.items():
+                    np.save(file, columns[column][isKept].astype(columnType), allow_pickle=False)
+            _replace_file(filePath_coinDetails, write_coin_details, binary=True)
+
+    def read_results(filePath_results: str) -> list[dict[str, str | int | float | None]]:
+        """Read the per-image results written by a results writer
+
+        Args:
+            filePath_results (str): path to the results file ('.csv' for CSV, JSONL otherwise)
+
+        Raises:
+            ValueError: a JSONL line isn't strict JSON (for example a NaN constant)
+
+        Returns:
+            list[dict[str, str | int | float | None]]: one dictionary per image (keys = RESULTS_COLUMNS, and the MEMORY_COLUMNS of each stage
+                    if the memory was tracked ; None for a missing value)
+        """
+        with open(filePath_results, newline="") as file:
+            if filePath_results.lower().endswith(".csv"):
+                records = list(csv.DictReader(file))
+                memoryPrefixes = tuple(column.format("") for column in MEMORY_COLUMNS)
+                for record in records:
+                    for column in list(record)[1:]:
+                        if column == "usedFallback":
+                            record[column] = record[column] == "True"
+                            continue
+                        columnType = int if column.startswith(("nbCoins",) + memoryPrefixes) else float
+                        record[column] = columnType(record[column]) if record[column] != "" else None
+                return records
+            return [json.loads(line, parse_constant=_reject_constant) for line in file if line.strip() != ""]
+
+    def read_coin_details(filePath_coinDetails: str) -> dict[str, ndarray]:
+        """Read the per-coin detail table written by a results writer
+
+        Args:
+            filePath_coinDetails (str): path to the per-coin detail file
+
+        Returns:
+            dict[str, ndarray]: key = column name, value = the column for every coin
+        """
+        with open(filePath_coinDetails, "rb") as file:
+            columns = [str(column) for column in np.load(file)]
+            batches = {column: [] for column in columns}
+            while True:
+                try:
+                    for column in columns:
+                        batches[column].append(np.load(file))
+                except EOFError:
+                    break
+
+        return {column: (np.concatenate(arrays) if arrays else np.array([], dtype=COIN_DETAILS_COLUMNS.get(column)))
+                for (column, arrays) in batches.items()}
+
+
+def _get_missing_as_none(value: str | int | float | None) -> str | int | float | None:
+    """Replace a missing value (NaN) of the per-image results with None
+
+    Args:
+        value (str | int | float | None): the value of a column
+
+    Returns:
+        str | int | float | None: the value, or None if it was NaN
+    """
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+def _reject_constant(constant: str):
+    """Reject the non-standard constants of a JSONL line (NaN, Infinity and -Infinity), accepted by default by 'json.loads'
+
+    Args:
+        constant (str): the constant
+
+    Raises:
+        ValueError: always
+    """
+    raise ValueError(f"The results file contains the non-standard JSON constant '{constant}'.")
+
+def _replace_file(filePath: str, write_content, binary: bool):
+    """Replace the content of a file atomically (written in a temporary file, then renamed)
+
+    Args:
+        filePath (str): path to the file
+        write_content (Callable): writes the new content in the opened temporary file
+        binary (bool): open the temporary file in binary mode
+    """
+    temporaryPath = filePath + ".tmp"
+    with open(temporaryPath, "wb" if binary else "w", newline=None if binary else "") as file:
+        write_content(file)
+    os.replace(temporaryPath, filePath)
@@ -0,0 +1,161 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+from ..classes.ResultsToEvaluate import ResultsToEvaluate
+from ..evaluation.EvaluationState import EvaluationState
+
+SHARD_RESULTS_FILE_VERSION = 2
+"""Version of the shard results file format (the version 1, with NaN constants for the missing values, can still be read)"""
+
+
+class Sharding():
+    """Class with the methods splitting a run in several shards (for several machines), and merging their results"""
+
+    def parse_shard(text: str) -> tuple[int, int]:
+        """Parse a shard description 'i/n' (shard number i among n shards, with 0 <= i < n)
+
+        Args:
+            text (str): the shard description
+
+        Raises:
+            ValueError: the description isn't in the 'i/n' format, or the shard number isn't in [0;n[
+
+        Returns:
+            shardIndex,_nbShards (tuple[int, int]): the shard number, and the number of shards
+        """
+        try:
+            (shardIndex, nbShards) = (int(part) for part in text.split("/"))
+        except ValueError:
+            raise ValueError(f"The shard '{text}' isn't in the format 'i/n'.")
+
+        if nbShards <= 0 or not (0 <= shardIndex < nbShards):
+            raise ValueError(f"The shard '{text}' must verify 0 <= i < n.")
+
+        return (shardIndex, nbShards)
+
+    def get_shard_of_image(image_name: str, nbShards: int) -> int:
+        """Get the shard of an image, by a stable hashing of its name
+        (the same on every machine and every run, whatever the OS separator in the name)
+
+        Args:
+            image_name (str): the image name
+            nbShards (int): the number of shards
+
+        Returns:
+            int: the shard number of the image, in [0;nbShards[
+        """
+        digest = hashlib.sha1(Path(image_name).as_posix().encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % nbShards
+
+    def select_shard(list_images: list[str], shard: tuple[int, int]) -> list[str]:
+        """Keep only the images of a shard
+
+        Args:
+            list_images (list[str]): the list of image names
+            shard (tuple[int, int]): the shard number, and the number of shards
+
+        Returns:
+            list[str]: the image names of the shard (same order as the original list)
+        """
+        (shardIndex, nbShards) = shard
+        return [image_name for image_name in list_images if Sharding.get_shard_of_image(image_name, nbShards) == shardIndex]
+
+    def write_shard_results(filePath_shardResults: str, shard: tuple[int, int] | None, results: list[ResultsToEvaluate]):
+        """Write the results of a shard in a file : the predictions, and the mergeable evaluation state.
+        The file is strict JSON : the missing values are written as null
+
+        Args:
+            filePath_shardResults (str): path to the file to write
+            shard (tuple[int, int] | None): the shard number and the number of shards (None for a run without sharding)
+            results (list[ResultsToEvaluate]): the results of the shard
+        """
+        content = {
+            "version": SHARD_RESULTS_FILE_VERSION,
+            "shard": list(shard) if shard is not None else None,
+            "predictions": [result.to_dict() for result in results],
+            "evaluationState": EvaluationState.from_results(results).to_dict()
+        }
+        temporaryPath = filePath_shardResults + ".tmp"
+        with open(temporaryPath, "w") as file:
+            json.dump(content, file, indent=1, allow_nan=False)
+        os.replace(temporaryPath, filePath_shardResults)
+
+    def read_shard_results(filePath_shardResults: str) -> tuple[tuple[int, int] | None, list[ResultsToEvaluate], EvaluationState]:
+        """Read the results of a shard from a file written by 'write_shard_results'
+
+        Args:
+            filePath_shardResults (str): path to the shard results file
+
+        Raises:
+            FileNotFoundError: the file doesn't exist
+            ValueError: the file isn't a valid shard results file
+
+        Returns:
+            shard,_results,_evaluationState (tuple[tuple[int, int] | None, list[ResultsToEvaluate], EvaluationState]):
+                    the shard description, the predictions, and the evaluation state of the shard
+        """
+        try:
+            with open(filePath_shardResults) as file:
+                content = json.load(file)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"The shard results file '{filePath_shardResults}' doesn't exist.")
+        except json.JSONDecodeError:
+            raise ValueError(f"The file '{filePath_shardResults}' isn't a valid shard results file.")
+
+        if content.get("version") not in (1, SHARD_RESULTS_FILE_VERSION):
+            raise ValueError(f"The file '{filePath_shardResults}' isn't a valid shard results file (unknown version).")
+
+        shard = tuple(content["shard"]) if content["shard"] is not None else None
+        results = [ResultsToEvaluate.from_dict(prediction) for prediction in content["predictions"]]
+        evaluationState = EvaluationState.from_dict(content["evaluationState"])
+
+        return (shard, results, evaluationState)
+
+    def merge_shards_results(filePaths_shardResults: list[str]) -> tuple[list[ResultsToEvaluate], EvaluationState, list[int]]:
+        """Merge the results of several shards
+
+        Args:
+            filePaths_shardResults (list[str]): paths to the shard results files
+
+        Raises:
+            ValueError: the shards don't split the same run, a shard is given twice, or an image is in two shards
+
+        Returns:
+            results,_evaluationState,_missingShards (tuple[list[ResultsToEvaluate], EvaluationState, list[int]]):
+                    the predictions of all shards (sorted by image name), the merged evaluation state, and the missing shard numbers
+        """
+        results = []
+        evaluationState = EvaluationState()
+        nbShards = None
+        shardsSeen = set()
+        filePaths_images = {} # key = image name, value = the file of its results
+
+        for filePath in filePaths_shardResults:
+            (shard, shardResults, shardEvaluationState) = Sharding.read_shard_results(filePath)
+
+            if shard is not None:
+                (shardIndex, shardCount) = shard
+                if nbShards is not None and shardCount != nbShards:
+                    raise ValueError(f"The file '{filePath}' comes from a run split in {shardCount} shards, "
+                                     + f"the other files from a run split in {nbShards} shards.")
+                if shardIndex in shardsSeen:
+                    raise ValueError(f"The shard {shardIndex}/{shardCount} is given twice (file '{filePath}').")
+                nbShards = shardCount
+                shardsSeen.add(shardIndex)
+
+            # An image in two files would be counted twice in the evaluation state
+            for result in shardResults:
+                imageName = Path(result.image_name).as_posix()
+                if imageName in filePaths_images:
+                    raise ValueError(f"The image '{result.image_name}' is in two shards (files '{filePaths_images[imageName]}' "
+                                     + f"and '{filePath}').")
+                filePaths_images[imageName] = filePath
+
+            results.extend(shardResults)
+            evaluationState.merge(shardEvaluationState)
+
+        results.sort(key=lambda result: result.image_name)
+        missingShards = [i for i in range(nbShards) if i not in shardsSeen] if nbShards is not None else []
+
+        return (results, evaluationState, missingShards)
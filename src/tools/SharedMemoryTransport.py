@@ -0,0 +1,240 @@
+from collections import deque
+from multiprocessing import shared_memory
+import numpy as np
+from numpy import ndarray
+from ..classes.CoinData import CoinData, CoinType, CoinValue
+
+COIN_RECORD_DTYPE = np.dtype([
+    ("xCenter", np.float64),
+    ("yCenter", np.float64),
+    ("detectedRadius", np.float64),
+    ("radius", np.float64),
+    ("coinType", np.int8),      # value of the CoinType (0 = unknown)
+    ("value", np.float64)       # value of the CoinValue (NaN = unknown)
+], align=True)
+"""Fixed-size record of a coin, as written by the workers in the result area of a slab"""
+
+RECORDS_CAPACITY = 512
+"""Maximum number of coin records in the result area of a slab (the records of an image with more coins are sent through the queue)"""
+
+RECORDS_AREA_BYTES = -(-RECORDS_CAPACITY * COIN_RECORD_DTYPE.itemsize // 64) * 64
+"""Size (in bytes) of the result area at the start of each slab (rounded to 64 bytes, so that the image is aligned)"""
+
+SLAB_GROWTH_STEP = 1024**2
+"""The slabs are (re)allocated by multiples of this size (in bytes), so that similar images reuse the same slabs"""
+
+
+class SlabRing():
+    """Ring of shared-memory slabs, through which the decoded images and the coins found in them are handed to worker processes
+    without being serialized : a slab holds a result area (see COIN_RECORD_DTYPE) followed by an image,
+    and the processes only exchange the index and the name of the slab.
+
+    The slabs are reused in ring order. Each slab has a reference count (held by the loader while it writes the image,
+    then by the task until its result is read) : it goes back to the ring when its count drops to 0.
+    A slab too small for an image is replaced by a bigger one (under a new name)."""
+
+    nbSlabs: int
+    """Number of slabs in the ring (the maximum number of images in flight)"""
+
+    def __init__(self, nbSlabs: int):
+        if nbSlabs <= 0:
+            raise ValueError(f"The number of slabs must be strictly positive (got {nbSlabs}).")
+
+        self.nbSlabs = nbSlabs
+        self._slabs = [None] * nbSlabs
+        self._referenceCounts = [0] * nbSlabs
+        self._freeSlabs = deque(range(nbSlabs))
+
+    def __enter__(self) -> "SlabRing":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def acquire(self, imageBytes: int) -> int | None:
+        """Take the next free slab of the ring, big enough for an image (its reference count is 1)
+
+        Args:
+            imageBytes (int): size of the image (in bytes)
+
+        Returns:
+            int | None: the index of the slab, or None if every slab is in use
+        """
+        if not self._freeSlabs:
+            return None
+
+        slabIndex = self._freeSlabs.popleft()
+        slab = self._slabs[slabIndex]
+        if slab is None or slab.size < RECORDS_AREA_BYTES + imageBytes:
+            if slab is not None:
+                slab.close()
+                slab.unlink()
+            slabBytes = -(-(RECORDS_AREA_BYTES + imageBytes) // SLAB_GROWTH_STEP) * SLAB_GROWTH_STEP
+            self._slabs[slabIndex] = shared_memory.SharedMemory(create=True, size=slabBytes)
+
+        self._referenceCounts[slabIndex] = 1
+        return slabIndex
+
+    def retain(self, slabIndex: int):
+        """Add a reference to a slab in use
+
+        Args:
+            slabIndex (int): the index of the slab
+        """
+        if self._referenceCounts[slabIndex] <= 0:
+            raise ValueError(f"The slab {slabIndex} isn't in use.")
+        self._referenceCounts[slabIndex] += 1
+
+    def release(self, slabIndex: int):
+        """Remove a reference to a slab (the slab goes back to the ring without any reference)
+
+        Args:
+            slabIndex (int): the index of the slab
+        """
+        if self._referenceCounts[slabIndex] <= 0:
+            raise ValueError(f"The slab {slabIndex} isn't in use.")
+        self._referenceCounts[slabIndex] -= 1
+        if self._referenceCounts[slabIndex] == 0:
+            self._freeSlabs.append(slabIndex)
+
+    def get_name(self, slabIndex: int) -> str:
+        """Get the name of the shared memory of a slab (to attach it in another process)
+
+        Args:
+            slabIndex (int): the index of the slab
+
+        Returns:
+            str: the name of the shared memory
+        """
+        return self._slabs[slabIndex].name
+
+    def get_image_view(self, slabIndex: int, shape: tuple[int, ...], dtype: np.dtype = np.uint8) -> ndarray:
+        """Get the image area of a slab, as an array (a view, without copy)
+
+        Args:
+            slabIndex (int): the index of the slab
+            shape (tuple[int, ...]): the shape of the image
+            dtype (np.dtype, optional): the type of the pixels. Defaults to np.uint8.
+
+        Returns:
+            ndarray: the view on the image area
+        """
+        return get_image_view(self._slabs[slabIndex], shape, dtype)
+
+    def get_records_view(self, slabIndex: int) -> ndarray:
+        """Get the result area of a slab, as an array of coin records (a view, without copy)
+
+        Args:
+            slabIndex (int): the index of the slab
+
+        Returns:
+            ndarray: the view on the result area (RECORDS_CAPACITY records)
+        """
+        return get_records_view(self._slabs[slabIndex])
+
+    def close(self):
+        """Free the shared memory of every slab (the views on the slabs mustn't be used anymore)"""
+        for slab in self._slabs:
+            if slab is not None:
+                slab.close()
+                slab.unlink()
+        self._slabs = [None] * self.nbSlabs
+        self._referenceCounts = [0] * self.nbSlabs
+        self._freeSlabs = deque(range(self.nbSlabs))
+
+
+class AttachedSlabs():
+    """The slabs of a ring attached in a worker process, by index (a slab is attached again when it was replaced)"""
+
+    def __init__(self):
+        self._slabs = {}
+
+    def get(self, slabIndex: int, name: str) -> shared_memory.SharedMemory:
+        """Get an attached slab
+
+        Args:
+            slabIndex (int): the index of the slab in the ring
+            name (str): the current name of the shared memory of the slab
+
+        Returns:
+            SharedMemory: the attached shared memory
+        """
+        slab = self._slabs.get(slabIndex)
+        if slab is None or slab.name != name:
+            if slab is not None:
+                slab.close()
+            slab = shared_memory.SharedMemory(name=name)
+            # The registration of the slab goes to the resource tracker of the main process (shared by the workers) :
+            #   it's already registered there, and it's unlinked by the ring (not when the worker process exits)
+            self._slabs[slabIndex] = slab
+        return slab
+
+    def close(self):
+        """Detach every slab (the views on the slabs must have been deleted)"""
+        for slab in self._slabs.values():
+            slab.close()
+        self._slabs = {}
+
+
+def get_image_view(slab: shared_memory.SharedMemory, shape: tuple[int, ...], dtype: np.dtype = np.uint8) -> ndarray:
+    """Get the image area of a slab, as an array (a view, without copy)
+
+    Args:
+        slab (SharedMemory): the shared memory of the slab
+        shape (tuple[int, ...]): the shape of the image
+        dtype (np.dtype, optional): the type of the pixels. Defaults to np.uint8.
+
+    Returns:
+        ndarray: the view on the image area
+    """
+    return np.ndarray(shape, dtype=dtype, buffer=slab.buf, offset=RECORDS_AREA_BYTES)
+
+def get_records_view(slab: shared_memory.SharedMemory) -> ndarray:
+    """Get the result area of a slab, as an array of coin records (a view, without copy)
+
+    Args:
+        slab (SharedMemory): the shared memory of the slab
+
+    Returns:
+        ndarray: the view on the result area (RECORDS_CAPACITY records)
+    """
+    return np.ndarray((RECORDS_CAPACITY,), dtype=COIN_RECORD_DTYPE, buffer=slab.buf)
+
+
+def get_coin_records(coinData_list: list[CoinData]) -> ndarray:
+    """Get the records of some coins
+
+    Args:
+        coinData_list (list[CoinData]): the data of each coin
+
+    Returns:
+        ndarray: the records of the coins (see COIN_RECORD_DTYPE)
+    """
+    records = np.zeros(len(coinData_list), dtype=COIN_RECORD_DTYPE)
+    for (record, coinData) in zip(records, coinData_list):
+        record["xCenter"] = coinData.xCenter
+        record["yCenter"] = coinData.yCenter
+        record["detectedRadius"] = coinData.detectedRadius
+        record["radius"] = coinData.radius
+        record["coinType"] = coinData.coinType.value if coinData.coinType is not None else 0
+        record["value"] = coinData.value.value if coinData.value is not None else np.nan
+    return records
+
+def get_coins_data_from_records(records: ndarray) -> list[CoinData]:
+    """Get the data of some coins from their records
+
+    Args:
+        records (ndarray): the records of the coins (see COIN_RECORD_DTYPE)
+
+    Returns:
+        list[CoinData]: the data of each coin
+    """
+    coinData_list = []
+    for record in records.tolist():
+        (xCenter, yCenter, detectedRadius, radius, coinType, value) = record
+        coinData = CoinData(xCenter, yCenter, radius)
+        coinData.detectedRadius = detectedRadius
+        coinData.coinType = CoinType(coinType) if coinType != 0 else None
+        coinData.value = CoinValue(value) if not np.isnan(value) else None
+        coinData_list.append(coinData)
+    return coinData_list
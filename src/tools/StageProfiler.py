@@ -0,0 +1,174 @@
+import cProfile
+import fnmatch
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+SAMPLING_INTERVAL = 0.001
+"""Interval (in seconds) between two samples of the stack of the profiled thread"""
+
+STAGE_STATS_FILE_NAME = "{}.pstats"
+"""Name of the pstats file of each stage (formatted with the name of the stage)"""
+
+ALL_STATS_FILE_NAME = "all_stages.pstats"
+"""Name of the pstats file of all the stages together"""
+
+COLLAPSED_STACKS_FILE_NAME = "stacks.collapsed"
+"""Name of the file of the sampled stacks, in the collapsed format of the flamegraph tools ('root;...;leaf count' per line)"""
+
+NB_HOTSPOTS = 15
+"""Number of Python functions in the summary of the hotspots"""
+
+
+class StageProfiler():
+    """Profiler of the named stages of the algorithm, on a chosen subset of images.
+
+    Each stage has its own deterministic profile (cProfile, enabled only while the stage runs), saved as a pstats file.
+    In parallel, a thread samples the stack of the profiled thread at a fixed interval : the stacks, rooted at the name of the stage
+    and cut at the call of the stage, are saved in the collapsed format read by the flamegraph tools (flamegraph.pl, speedscope...)."""
+
+    directoryPath: str
+    """Directory where the profiles are written"""
+
+    images_patterns: list[str] | None
+    """Glob patterns selecting the names of the profiled images (None = every image)"""
+
+    stage_times: dict[str, float]
+    """key = name of the stage, value = total time spent in the stage (in seconds)"""
+
+    nb_images: int
+    """Number of profiled images"""
+
+    def __init__(self, directoryPath: str, images_patterns: list[str] | None = None, sampling_interval: float = SAMPLING_INTERVAL):
+        self.directoryPath = directoryPath
+        self.images_patterns = images_patterns
+        self.stage_times = {}
+        self.nb_images = 0
+        self._profiles = {}
+        self._stacks = Counter()
+        self._samplingInterval = sampling_interval
+        self._profiledThreadId = None
+        self._activeStage = None # (name of the stage, frame calling the stage)
+        self._stopSampling = threading.Event()
+        self._samplingThread = None
+        os.makedirs(directoryPath, exist_ok=True)
+
+    def __enter__(self) -> "StageProfiler":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def is_profiled(self, image_name: str) -> bool:
+        """Check if an image is in the profiled subset
+
+        Args:
+            image_name (str): the name of the image
+
+        Returns:
+            bool: True if the image is profiled
+        """
+        if self.images_patterns is None:
+            return True
+        return any(fnmatch.fnmatch(image_name, pattern) for pattern in self.images_patterns)
+
+    @contextmanager
+    def profile_image(self) -> Iterator[None]:
+        """Context of the processing of a profiled image (its stages are profiled with 'stage')"""
+        if self._samplingThread is None:
+            self._profiledThreadId = threading.get_ident()
+            self._samplingThread = threading.Thread(target=self._sample_stacks, name="stage_profiler", daemon=True)
+            self._samplingThread.start()
+        self.nb_images += 1
+        yield
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Context of a stage of the algorithm : the stage is profiled, and its time counted
+
+        Args:
+            name (str): the name of the stage
+        """
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        self._activeStage = (name, sys._getframe(2)) # the frame of the 'with' statement (above the context manager)
+        startingTime = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.stage_times[name] = self.stage_times.get(name, 0.0) + time.perf_counter() - startingTime
+            self._activeStage = None
+
+    def _sample_stacks(self):
+        """Loop of the sampling thread : counts the stack of the profiled thread while it's in a stage"""
+        while not self._stopSampling.wait(self._samplingInterval):
+            activeStage = self._activeStage
+            frame = sys._current_frames().get(self._profiledThreadId)
+            if activeStage is None or frame is None:
+                continue
+            (stageName, stageFrame) = activeStage
+
+            frames = []
+            while frame is not None and frame is not stageFrame:
+                code = frame.f_code
+                frames.append("{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            if frame is None:
+                continue # the stage ended while its stack was walked
+            self._stacks[";".join([stageName] + frames[::-1])] += 1
+
+    def close(self):
+        """Stop the sampling, and write the profiles (one pstats file per stage, one for all the stages, and the collapsed stacks)"""
+        if self._samplingThread is not None:
+            self._stopSampling.set()
+            self._samplingThread.join()
+            self._samplingThread = None
+
+        if not self._profiles:
+            return
+        allStats = None
+        for (name, profile) in self._profiles.items():
+            profile.dump_stats(os.path.join(self.directoryPath, STAGE_STATS_FILE_NAME.format(name)))
+            if allStats is None:
+                allStats = pstats.Stats(profile)
+            else:
+                allStats.add(profile)
+        allStats.dump_stats(os.path.join(self.directoryPath, ALL_STATS_FILE_NAME))
+
+        with open(os.path.join(self.directoryPath, COLLAPSED_STACKS_FILE_NAME), "w") as file:
+            file.writelines(f"{stack} {count}\n" for (stack, count) in sorted(self._stacks.items()))
+
+    def get_summary(self, nbHotspots: int = NB_HOTSPOTS) -> str:
+        """Get the summary of the profile : the time of each stage, and the Python functions with the highest own times
+
+        Args:
+            nbHotspots (int, optional): the number of functions in the summary. Defaults to NB_HOTSPOTS.
+
+        Returns:
+            str: the lines of the summary
+        """
+        totalTime = sum(self.stage_times.values())
+        lines = [f"Profile of {self.nb_images} image(s) (written in '{self.directoryPath}')", "\tTime by stage"]
+        for (name, stageTime) in self.stage_times.items():
+            lines.append("\t\t{:<20} {:>8.3f}s  {:>5.1f}%  ({:.3f}s / image)".format(
+                name, stageTime, 100 * stageTime / max(totalTime, 1e-9), stageTime / max(1, self.nb_images)))
+
+        # Own time of each function, in each stage (the built-in functions of OpenCV and numpy are included)
+        hotspots = []
+        for (name, profile) in self._profiles.items():
+            for ((fileName, lineNumber, functionName), (_, nbCalls, ownTime, _, _)) in pstats.Stats(profile).stats.items():
+                location = f"{os.path.basename(fileName)}:{lineNumber}" if fileName != "~" else "built-in"
+                hotspots.append((ownTime, nbCalls, f"{functionName} ({location})", name))
+        hotspots.sort(reverse=True)
+
+        lines.append("\tHotspots (own time of the functions)")
+        for (ownTime, nbCalls, function, stageName) in hotspots[:nbHotspots]:
+            lines.append("\t\t{:>8.3f}s  {:>5.1f}%  {:>9} calls  {}  [{}]".format(
+                ownTime, 100 * ownTime / max(totalTime, 1e-9), nbCalls, function, stageName))
+        return "\n".join(lines)
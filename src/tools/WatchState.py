@@ -0,0 +1,270 @@
+import json
+import math
+import os
+from pathlib import Path
+from ..classes.ResultsToEvaluate import ResultsToEvaluate
+from ..evaluation.EvaluationState import EvaluationState
+
+WATCH_STATE_VERSION = 3
+"""Version of the watch state file format (the versions 1, without the sizes of the results files, and 2, without the log, can still be read)"""
+
+DEFAULT_POLL_INTERVAL = 5.0
+"""Default interval (in seconds) between two scans of the watched directory"""
+
+SETTLE_TIME = 2.0
+"""Time (in seconds) since its last modification after which an image is processed (an image still being written is left to the next scans)"""
+
+FULL_SCAN_INTERVAL = 60.0
+"""Interval (in seconds) between two full scans of the watched directory : the scans in between only list again the directories 
+whose modification time changed (see 'DirectoryIndex.rescan'), so an image rewritten in place is only seen by the next full scan"""
+
+MIN_COMPACTION_RECORDS = 1000
+"""Minimum number of records of the watch state log before they are compacted in the watch state file (see 'WatchState.save')"""
+
+
+class WatchState():
+    """Persisted state of a watched image directory : the size and modification time of each processed image (as seen by the scan
+    that selected it), its results, and the running evaluation state of all of them. Only the new or changed images are processed
+    by the next scans, including after a restart.
+
+    The changes are appended to a log (one JSON line per processed or forgotten image), so that saving the state after a batch
+    doesn't write the whole state again. When the log grows larger than the state, it is compacted : the whole state is written 
+    atomically in the state file, then the log is replaced by an empty one. Both start with the same log id, so that a log 
+    already compacted (interrupted before its replacement) is ignored. An incomplete last line (interrupted write) is ignored too."""
+
+    filePath: str
+    """Path to the watch state file"""
+
+    logFilePath: str
+    """Path to the watch state log (the path to the watch state file, with the '.log' extension added)"""
+
+    root_path: str
+    """Absolute path to the watched directory"""
+
+    images: dict[str, tuple[int, float]]
+    """key = name of a processed image, value = tuple[size in bytes, modification time] of its processed version"""
+
+    results: dict[str, ResultsToEvaluate]
+    """key = name of a processed image, value = its results"""
+
+    evaluation_state: EvaluationState
+    """Evaluation state of the results of all the processed images"""
+
+    results_file_sizes: dict[str, int]
+    """key = path to a results file, value = its size in bytes when the state was saved 
+    (the rows written after it, whose images aren't in the state, are removed when the watch restarts)"""
+
+    def __init__(self, filePath: str, directoryPath: str):
+        """Load the watch state from its file (empty if the file doesn't exist yet)
+
+        Args:
+            filePath (str): path to the watch state file
+            directoryPath (str): path to the watched directory
+
+        Raises:
+            ValueError: the file isn't a valid watch state, or it's the watch state of another directory
+        """
+        self.filePath = filePath
+        self.logFilePath = filePath + ".log"
+        self.root_path = os.path.abspath(directoryPath)
+        self.images = {}
+        self.results = {}
+        self.evaluation_state = EvaluationState()
+        self.results_file_sizes = {}
+        self._logId = 0
+        self._nbLogRecords = None # None : no valid log yet (created by the next save)
+        self._pendingRecords = []
+
+        try:
+            with open(filePath) as file:
+                content = json.load(file)
+        except FileNotFoundError:
+            content = None
+        except json.JSONDecodeError:
+            raise ValueError(f"The file '{filePath}' isn't a valid watch state.")
+
+        if content is not None:
+            if content.get("version") not in (1, 2, WATCH_STATE_VERSION):
+                raise ValueError(f"The file '{filePath}' isn't a valid watch state (unknown version).")
+            if content["root"] != self.root_path:
+                raise ValueError(f"The file '{filePath}' is the watch state of another directory ('{content['root']}').")
+            for (name, (size, mtime, resultData)) in content["images"].items():
+                imageName = os.path.join(*name.split("/"))
+                self.images[imageName] = (size, mtime)
+                self.results[imageName] = ResultsToEvaluate.from_dict(resultData)
+            self.evaluation_state = EvaluationState.from_dict(content["evaluation_state"])
+            self.results_file_sizes = content.get("results_file_sizes", {})
+            self._logId = content.get("log_id", 0)
+
+        self._replay_log()
+
+    def __len__(self) -> int:
+        return len(self.images)
+
+    def get_images_to_process(self, fileInfos: dict[str, tuple[int, float]]) -> list[str]:
+        """Get the images never processed, or changed since they were processed
+
+        Args:
+            fileInfos (dict[str, tuple[int, float]]): key = name of a selected image, value = tuple[size in bytes, modification time]
+                    (from the last scan of the directory)
+
+        Returns:
+            list[str]: the sorted names of the images to process
+        """
+        return sorted(name for (name, fileInfo) in fileInfos.items() if self.images.get(name) != tuple(fileInfo))
+
+    def update(self, fileInfo: tuple[int, float], result: ResultsToEvaluate):
+        """Record the results of a processed image (replacing the results of its previous version in the evaluation state)
+
+        Args:
+            fileInfo (tuple[int, float]): the size in bytes and the modification time of the processed version of the image
+            result (ResultsToEvaluate): the results of the image
+        """
+        self._update(tuple(fileInfo), result)
+        self._pendingRecords.append({"fileInfo": list(fileInfo), "result": result.to_dict()})
+
+    def forget(self, image_name: str):
+        """Remove an image and its results (for example, an image deleted from the directory)
+
+        Args:
+            image_name (str): the name of the image
+        """
+        if image_name in self.images or image_name in self.results:
+            self._forget(image_name)
+            self._pendingRecords.append({"forget": Path(image_name).as_posix()})
+
+    def _update(self, fileInfo: tuple[int, float], result: ResultsToEvaluate):
+        """Record the results of a processed image, without logging it (see 'update')"""
+        self._forget(result.image_name)
+        self.images[result.image_name] = fileInfo
+        self.results[result.image_name] = result
+        self.evaluation_state.add(result)
+
+    def _forget(self, image_name: str):
+        """Remove an image and its results, without logging it (see 'forget')"""
+        if image_name in self.results:
+            self.evaluation_state.remove(self.results.pop(image_name))
+        self.images.pop(image_name, None)
+
+    def update_ground_truth(self, data_groundTruth: dict[str, tuple[int, float]]) -> int:
+        """Apply a new version of the ground truth to the results of the processed images (without processing them again)
+
+        Args:
+            data_groundTruth (dict[str, tuple[int, float]]): key = image name, value = tuple[nb coins, total monetary value]
+
+        Returns:
+            int: the number of results whose ground truth changed
+        """
+        nbUpdated = 0
+        for (name, result) in list(self.results.items()):
+            groundTruth = data_groundTruth.get(name)
+            if groundTruth is None or _is_same_ground_truth((result.nbCoins_groundTruth, result.totalMonetaryValue_groundTruth), groundTruth):
+                continue
+            updatedResult = ResultsToEvaluate.from_dict(result.to_dict())
+            (updatedResult.nbCoins_groundTruth, updatedResult.totalMonetaryValue_groundTruth) = groundTruth
+            self.update(self.images[name], updatedResult)
+            nbUpdated += 1
+        return nbUpdated
+
+    def save(self, results_file_sizes: dict[str, int] | None = None):
+        """Save the changes of the watch state since the last save : appended to the log with a single write (then synced to the disk),
+        or, when the log would have more records than the state has images (and at least MIN_COMPACTION_RECORDS), compacted with the
+        whole state in the state file (replaced atomically, the relative paths being written with '/' separators)
+
+        Args:
+            results_file_sizes (dict[str, int] | None, optional): the sizes of the results files, flushed with the results 
+                    of the processed images (see 'ResultsWriter.get_file_sizes'). Defaults to None (the previous sizes are kept).
+        """
+        if results_file_sizes is not None:
+            self.results_file_sizes = results_file_sizes
+            self._pendingRecords.append({"results_file_sizes": results_file_sizes})
+        if not self._pendingRecords:
+            return
+
+        if self._nbLogRecords is None or self._nbLogRecords + len(self._pendingRecords) > max(MIN_COMPACTION_RECORDS, len(self.images)):
+            self._compact()
+        else:
+            fileDescriptor = os.open(self.logFilePath, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fileDescriptor, "".join(json.dumps(record) + "\n" for record in self._pendingRecords).encode("utf-8"))
+                os.fsync(fileDescriptor)
+            finally:
+                os.close(fileDescriptor)
+            self._nbLogRecords += len(self._pendingRecords)
+        self._pendingRecords = []
+
+    def _compact(self):
+        """Write the whole watch state in its file, then replace the log by an empty one (both atomically, with a new log id)"""
+        self._logId += 1
+        content = {
+            "version": WATCH_STATE_VERSION,
+            "root": self.root_path,
+            "log_id": self._logId,
+            "images": {Path(name).as_posix(): [size, mtime, self.results[name].to_dict()]
+                       for (name, (size, mtime)) in self.images.items()},
+            "evaluation_state": self.evaluation_state.to_dict(),
+            "results_file_sizes": self.results_file_sizes
+        }
+        temporaryPath = self.filePath + ".tmp"
+        with open(temporaryPath, "w") as file:
+            json.dump(content, file)
+        os.replace(temporaryPath, self.filePath)
+
+        # Interrupted here, the previous log is ignored (its log id isn't the one of the state file anymore)
+        temporaryPath = self.logFilePath + ".tmp"
+        with open(temporaryPath, "w") as file:
+            file.write(json.dumps({"log_id": self._logId, "root": self.root_path}) + "\n")
+        os.replace(temporaryPath, self.logFilePath)
+        self._nbLogRecords = 0
+
+    def _replay_log(self):
+        """Apply the records of the log to the state loaded from the state file (an incomplete last line is ignored and removed)
+
+        Raises:
+            ValueError: the log is corrupted, or it's the log of another directory
+        """
+        try:
+            with open(self.logFilePath, "rb") as file:
+                content = file.read()
+        except FileNotFoundError:
+            return
+
+        records = []
+        validLength = 0
+        lines = content.split(b"\n")
+        for (i, line) in enumerate(lines[:-1]): # the last line is either empty or incomplete
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                raise ValueError(f"The file '{self.logFilePath}' is corrupted (line {i+1}).")
+            validLength += len(line) + 1
+
+        if not records or records[0].get("log_id") != self._logId:
+            return # already compacted in the state file (or interrupted at its creation) : replaced by the next save
+        if records[0]["root"] != self.root_path:
+            raise ValueError(f"The file '{self.logFilePath}' is the watch state log of another directory ('{records[0]['root']}').")
+        os.truncate(self.logFilePath, validLength)
+
+        for record in records[1:]:
+            if "result" in record:
+                self._update(tuple(record["fileInfo"]), ResultsToEvaluate.from_dict(record["result"]))
+            elif "forget" in record:
+                self._forget(os.path.join(*record["forget"].split("/")))
+            else:
+                self.results_file_sizes = record["results_file_sizes"]
+        self._nbLogRecords = len(records) - 1
+
+
+def _is_same_ground_truth(groundTruth: tuple[int, float], otherGroundTruth: tuple[int, float]) -> bool:
+    """Compare two ground truths (two invalid monetary values being the same)
+
+    Args:
+        groundTruth (tuple[int, float]): a number of coins and a total monetary value
+        otherGroundTruth (tuple[int, float]): another number of coins and total monetary value
+
+    Returns:
+        bool: True if the ground truths are the same
+    """
+    (nbCoins, value) = (int(groundTruth[0]), float(groundTruth[1]))
+    (otherNbCoins, otherValue) = (int(otherGroundTruth[0]), float(otherGroundTruth[1]))
+    return nbCoins == otherNbCoins and (value == otherValue or (math.isnan(value) and math.isnan(otherValue)))
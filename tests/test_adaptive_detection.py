@@ -0,0 +1,61 @@
+import numpy as np
+import cv2 as cv
+from src.regression.DetectCoinsForm import SHORTEST_SIDE_LENGTH, get_circles, get_circles_adaptive, _estimate_dominant_coin_radius
+from src.regression.Presets import PRESETS
+
+IMAGE_SHAPE = (1000, 1500)
+"""Shape of the rendered images (the shortest side is twice SHORTEST_SIDE_LENGTH)"""
+
+CENTERS = [(250, 250), (750, 250), (1250, 250), (250, 750), (750, 750), (1250, 750)]
+"""Centers of the rendered coins"""
+
+
+def _render_coins(radius: int, seed: int = 0) -> np.ndarray:
+    """Render coins of the same radius, with a darker rim, on a noisy light background
+
+    Args:
+        radius (int): the radius of the coins, in pixels of the image
+        seed (int, optional): the seed of the noise. Defaults to 0.
+
+    Returns:
+        ndarray: the BGR image
+    """
+    rng = np.random.default_rng(seed)
+    img = np.full(IMAGE_SHAPE + (3,), 200, np.uint8)
+    for center in CENTERS:
+        cv.circle(img, center, radius, (40, 120, 160), -1, cv.LINE_AA)
+        cv.circle(img, center, radius, (20, 60, 80), max(2, radius // 15), cv.LINE_AA)
+    noise = rng.normal(0, 4, img.shape)
+    return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def test_estimate_of_a_known_radius():
+    preset = PRESETS["balanced"]
+    for radius in (80, 110, 150):
+        img = _render_coins(radius)
+        expectedRadius = radius * SHORTEST_SIDE_LENGTH / min(IMAGE_SHAPE)
+        estimatedRadius = _estimate_dominant_coin_radius(img, preset)
+        assert estimatedRadius is not None
+        assert abs(estimatedRadius / expectedRadius - 1) < 0.2
+
+
+def test_adaptive_detection_of_a_known_radius():
+    preset = PRESETS["balanced"]
+    (circles, nbCircles) = get_circles_adaptive(_render_coins(90), preset)
+    assert nbCircles == len(CENTERS)
+    assert np.all(np.abs(circles[0, :, 2] / 90 - 1) < 0.2)
+
+
+def test_estimate_outside_the_radius_bounds_falls_back():
+    preset = PRESETS["balanced"]
+    img = _render_coins(20) # 10px at SHORTEST_SIDE_LENGTH, below the smallest radius of the preset
+    assert _estimate_dominant_coin_radius(img, preset) is None
+    (circles, nbCircles) = get_circles_adaptive(img, preset)
+    (expectedCircles, expectedNbCircles) = get_circles(img, preset = preset)
+    assert nbCircles == expectedNbCircles
+    assert (circles is None and expectedCircles is None) or np.array_equal(circles, expectedCircles)
+
+
+def test_estimate_without_coins():
+    img = np.full(IMAGE_SHAPE + (3,), 200, np.uint8)
+    assert _estimate_dominant_coin_radius(img, PRESETS["balanced"]) is None